@@ -0,0 +1,121 @@
+"""
+Asynchronous facade over the :mod:`db` module.
+
+Every function in :mod:`db` is a blocking pymongo call. Awaiting them directly
+from a slash command handler would stall the gateway event loop for every
+guild until MongoDB answers, so this module exposes the same API as coroutines
+that run the blocking call on a bounded thread pool. Concurrent commands then
+overlap their database latency instead of serializing it.
+
+Usage:
+    from async_db import get_account
+
+    account = await get_account(user_id)
+"""
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+from resources.ledger import LedgerWriter
+from resources.metrics import current_operation, registry
+
+# pymongo's connection pool defaults to 100 sockets, so the thread pool is the
+# real concurrency limit for database work coming from the bot.
+DB_MAX_WORKERS = int(os.getenv('DB_MAX_WORKERS', '16'))
+
+_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix='db')
+
+
+def _timed(func):
+    """Times a :mod:`db` function and labels the MongoDB commands it issues with its name."""
+    histogram = registry.histogram("db_call_seconds", "Time spent in db.py functions", function=func.__name__)
+
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        current_operation.name = func.__name__
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+            current_operation.name = None
+    return call
+
+
+def _offload(func):
+    """Wraps a blocking :mod:`db` function into a coroutine executed on the database pool."""
+    timed = _timed(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(timed, *args, **kwargs))
+    return wrapper
+
+
+create_account = _offload(db.create_account)
+get_account = _offload(db.get_account)
+account_exists = _offload(db.account_exists)
+update_balance = _offload(db.update_balance)
+transfer = _offload(db.transfer)
+get_transactions = _offload(db.get_transactions)
+get_transaction_page = _offload(db.get_transaction_page)
+get_transaction_summary = _offload(db.get_transaction_summary)
+set_upi_id = _offload(db.set_upi_id)
+resolve_upi_id = _offload(db.resolve_upi_id)
+get_leaderboard = _offload(db.get_leaderboard)
+load_leaderboards = _offload(db.load_leaderboards)
+insert_documents = _offload(db.insert_documents)
+update_user_branch = _offload(db.update_user_branch)
+get_branch = _offload(db.get_branch)
+rename_branch = _offload(db.rename_branch)
+sync_branches = _offload(db.sync_branches)
+set_branch_interest_rate = _offload(db.set_branch_interest_rate)
+get_interest_run = _offload(db.get_interest_run)
+accrue_interest = _offload(db.accrue_interest)
+resume_interest_runs = _offload(db.resume_interest_runs)
+toggle_command = _offload(db.toggle_command)
+load_command_settings = _offload(db.load_command_settings)
+refresh_command_settings = _offload(db.refresh_command_settings)
+# Pure in-memory operations stay synchronous, there is nothing to offload
+forget_command_settings = db.forget_command_settings
+leaderboards = db.leaderboards
+account_cache = db.account_cache
+upi_directory = db.upi_directory
+_get_command_status = _offload(db.get_command_status)
+
+
+async def get_command_status(guild_id, command_name):
+    """Returns a command's status from memory, only offloading a query when the guild is not cached yet."""
+    if db.is_command_settings_cached(guild_id):
+        return db.get_command_status(guild_id, command_name)
+    return await _get_command_status(guild_id, command_name)
+
+
+# Audit records are buffered and bulk inserted instead of one round-trip each
+ledger_writer = LedgerWriter(insert_documents)
+
+
+async def log_transaction(user_id, txn_type, amount, receiver_id=None):
+    """Queues a transaction for the batched ledger writer. See :func:`db.log_transaction`."""
+    await ledger_writer.put("transactions", db.transaction_document(user_id, txn_type, amount, receiver_id))
+
+
+async def log_failed_kyc_attempt(user_id, provided_user_id, guild_id, provided_guild_id, reason):
+    """Queues a failed KYC attempt for the batched ledger writer. See :func:`db.log_failed_kyc_attempt`."""
+    await ledger_writer.put(
+        "failed_kyc_attempts",
+        db.failed_kyc_document(user_id, provided_user_id, guild_id, provided_guild_id, reason)
+    )
+
+
+async def close():
+    """Flushes buffered ledger records, stops the database thread pool and closes the storage backend."""
+    await ledger_writer.close()
+    # Waiting for in-flight database calls and closing connections both block, keep them off the event loop
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, functools.partial(_executor.shutdown, wait=True))
+    await loop.run_in_executor(None, db.close)
@@ -0,0 +1,150 @@
+"""
+Stand-ins for the Discord objects the cogs touch.
+
+They implement just enough of ``discord.ApplicationContext``, ``Interaction``,
+``User``, ``Guild`` and ``Asset`` for the command callbacks to run unchanged,
+and record what the bot answered instead of calling the Discord API.
+"""
+import asyncio
+import itertools
+
+import discord
+
+_ids = itertools.count(1)
+
+
+class FakeAsset:
+    """An avatar served by the stub API instead of Discord's CDN."""
+    def __init__(self, base_url, key):
+        self.base_url = base_url
+        self.key = key
+        self.url = f"{base_url}/avatars/{key}.png"
+
+    def replace(self, size=None, format=None):
+        return self
+
+
+class FakeGuild:
+    def __init__(self, guild_id, name):
+        self.id = guild_id
+        self.name = name
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+
+
+class FakeUser:
+    def __init__(self, user_id, name, avatar):
+        self.id = user_id
+        self.name = name
+        self.display_avatar = avatar
+        self.avatar = avatar
+        self.colour = self.color = discord.Colour.default()
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.created_at = discord.utils.utcnow()
+        self.dms = 0
+
+    async def send(self, *args, **kwargs):
+        self.dms += 1
+
+
+class FakeInteractionResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send_message(self, content=None, **kwargs):
+        self._interaction.record(content, kwargs)
+
+    async def edit_message(self, content=None, **kwargs):
+        self._interaction.record(content, kwargs)
+
+    async def defer(self, *args, **kwargs):
+        pass
+
+
+class FakeInteraction:
+    """
+    An interaction that records every answer.
+
+    Attributes:
+        responses (list[tuple[str | None, dict]]): ``(content, kwargs)`` of each answer.
+    """
+    def __init__(self, user, guild=None):
+        self.id = next(_ids)
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id if guild else None
+        self.response = FakeInteractionResponse(self)
+        self.responses = []
+
+    def record(self, content, kwargs):
+        self.responses.append((content, kwargs))
+
+    @property
+    def last_view(self):
+        """The view attached to the latest answer that had one."""
+        for _, kwargs in reversed(self.responses):
+            if kwargs.get("view") is not None:
+                return kwargs["view"]
+        return None
+
+    async def edit_original_response(self, content=None, **kwargs):
+        self.record(content, kwargs)
+
+
+class FakeContext(FakeInteraction):
+    """Application context of one slash command invocation."""
+    def __init__(self, user, guild, channel):
+        super().__init__(user, guild)
+        self.author = user
+        self.channel = channel
+        self.interaction = self
+        self.command = None
+
+    async def respond(self, content=None, **kwargs):
+        # Yield like a real API call would, without the network latency
+        await asyncio.sleep(0)
+        self.record(content, kwargs)
+        return self
+
+    send = followup_send = respond
+
+    async def defer(self, *args, **kwargs):
+        await asyncio.sleep(0)
+
+
+class FakeBot:
+    """The attributes of ``discord.Bot`` the benchmarked cogs read."""
+    def __init__(self, guilds, channels):
+        self.guilds = guilds
+        self._channels = {channel.id: channel for channel in channels}
+        self.loop = asyncio.get_running_loop()
+        self.latency = 0.05
+        self.user = FakeUser(0, "Quantum Bank", None)
+        self._cogs = {}
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_user(self, user_id):
+        return None
+
+    def get_cog(self, name):
+        return self._cogs.get(name)
+
+    def add_cog(self, cog):
+        self._cogs[type(cog).__name__] = cog
+        return cog
+
+    def is_ready(self):
+        return True
+
+    async def wait_until_ready(self):
+        pass
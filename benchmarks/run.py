@@ -0,0 +1,346 @@
+"""
+Offline load test of the bot's commands.
+
+Drives the real ``Account``, ``LeaderboardCog``, ``GeneralCog`` and ``Anime``
+cogs with synthetic contexts, against a local MongoDB and a stub of the HTTP
+APIs, and reports throughput, tail latency and how long the event loop was
+blocked.
+
+Usage:
+    python -m benchmarks.run --concurrency 50 --duration 30
+    python -m benchmarks.run --mix passbook=1,leaderboard=1 --json results.json
+
+Storage:
+    ``--storage memory`` and ``--storage sqlite`` (a temporary file) need
+    nothing else. ``--storage mongo`` needs a MongoDB replica set (transfers use
+    transactions), e.g. ``docker run -p 27017:27017 mongo:7 --replSet rs0``
+    followed by ``rs.initiate()``; only the ``--database`` database is
+    touched, and it is dropped and reseeded on every run.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from benchmarks.fakes import FakeAsset, FakeBot, FakeChannel, FakeContext, FakeGuild, FakeInteraction, FakeUser
+from benchmarks.stub_api import StubAPI
+
+DEFAULT_MIX = "passbook=25,leaderboard=25,upi_payment=15,ping=15,anime=20"
+ANIME_TITLES = 300
+
+
+class LoopBlockingProbe:
+    """
+    Measures how long the event loop was unable to run callbacks.
+
+    A task sleeps for ``interval`` over and over; every oversleep beyond
+    ``threshold`` is time the loop spent blocked in someone else's callback.
+    """
+    def __init__(self, interval=0.005, threshold=0.001):
+        self.interval = interval
+        self.threshold = threshold
+        self.blocked = 0.0
+        self.longest = 0.0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            overshoot = time.perf_counter() - started - self.interval
+            if overshoot > self.threshold:
+                self.blocked += overshoot
+                self.longest = max(self.longest, overshoot)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def parse_mix(mix):
+    """Parses ``name=weight,...`` into a dict."""
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown commands in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+class Benchmark:
+    """
+    Seeded accounts, loaded cogs and the scenarios replayed against them.
+
+    Attributes:
+        users (list[FakeUser]): Users with an account.
+        upi_ids (dict[int, str]): User ID -> UPI ID.
+    """
+    def __init__(self, args, stub_url):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.guilds = [FakeGuild(900000 + i, f"Branch {i}") for i in range(args.guilds)]
+        self.channel = FakeChannel(1)
+        self.users = []
+        self.upi_ids = {}
+        self.branches = {}
+        for i in range(args.accounts):
+            user_id = 1000000 + i
+            self.users.append(FakeUser(user_id, f"user{i}", FakeAsset(stub_url, f"avatar{user_id}")))
+            self.upi_ids[user_id] = f"{user_id}@quantumbank.bnch"
+            self.branches[user_id] = self.guilds[i % len(self.guilds)]
+        self.bot = None
+        self.cogs = {}
+
+    def seed(self):
+        """Replaces the benchmark database with ``--accounts`` funded accounts."""
+        import db
+
+        documents = [{
+            "user_id": str(user.id),
+            "username": user.name,
+            "branch_id": str(self.branches[user.id].id),
+            "branch_name": self.branches[user.id].name,
+            "balance": self.args.balance,
+            "upi_id": self.upi_ids[user.id],
+            "created_at": datetime.now(),
+        } for user in self.users]
+        if db.STORAGE_BACKEND == "mongo":
+            from schema import ensure_indexes
+
+            db.get_storage().require_transactions()
+            db.client.drop_database(db.MONGO_DATABASE)
+            ensure_indexes()
+            for start in range(0, len(documents), 5000):
+                db.db["accounts"].insert_many(documents[start:start + 5000], ordered=False)
+        else:
+            storage = db.get_storage()
+            for document in documents:
+                storage.insert_account(document)
+        return db.load_leaderboards()
+
+    def load_cogs(self):
+        self.bot = FakeBot(self.guilds, [self.channel])
+        for module, name in (("cogs.accounts", "Account"), ("cogs.leaderboard", "LeaderboardCog"),
+                             ("cogs.general", "GeneralCog"), ("cogs.anime", "Anime")):
+            cog_class = getattr(importlib.import_module(module), name)
+            self.cogs[name] = self.bot.add_cog(cog_class(self.bot))
+
+    async def unload_cogs(self):
+        for cog in self.cogs.values():
+            cog.cog_unload()
+        # Let the close() tasks scheduled by cog_unload finish
+        await asyncio.sleep(0.1)
+
+    def context(self, user):
+        """A fresh context for a command the user runs in their home branch."""
+        return FakeContext(user, self.branches[user.id], self.channel)
+
+    def random_user(self):
+        return self.rng.choice(self.users)
+
+    async def run_command(self, cog_name, command_name, ctx, *args):
+        cog = self.cogs[cog_name]
+        command = getattr(cog, command_name)
+        ctx.command = command
+        await command.callback(cog, ctx, *args)
+        return ctx
+
+
+async def passbook(bench):
+    await bench.run_command("Account", "passbook", bench.context(bench.random_user()))
+
+
+async def leaderboard(bench):
+    scope = "global" if bench.rng.random() < 0.2 else "branch"
+    await bench.run_command("LeaderboardCog", "leaderboard", bench.context(bench.random_user()), scope)
+
+
+async def upi_payment(bench):
+    sender, receiver = bench.rng.sample(bench.users, 2)
+    ctx = await bench.run_command(
+        "Account", "upi_payment", bench.context(sender), bench.upi_ids[receiver.id], round(bench.rng.uniform(1, 50), 2)
+    )
+    view = ctx.last_view
+    if view is not None:
+        confirm = next(item for item in view.children if getattr(item, "label", None) == "Confirm Payment")
+        await confirm.callback(FakeInteraction(sender, ctx.guild))
+
+
+async def ping(bench):
+    await bench.run_command("GeneralCog", "ping", bench.context(bench.random_user()))
+
+
+async def anime(bench):
+    # Zipf-like popularity, a few titles are searched far more often than the rest
+    title = f"anime title {int(bench.rng.paretovariate(1.2)) % ANIME_TITLES}"
+    await bench.run_command("Anime", "anime", bench.context(bench.random_user()), title)
+
+
+SCENARIOS = {
+    "passbook": passbook,
+    "leaderboard": leaderboard,
+    "upi_payment": upi_payment,
+    "ping": ping,
+    "anime": anime,
+}
+
+
+async def replay(bench, weights, concurrency, duration, max_commands):
+    """Runs ``concurrency`` workers replaying the command mix, returning per-command latencies and errors."""
+    names = list(weights)
+    relative_weights = list(weights.values())
+    latencies = defaultdict(list)
+    errors = defaultdict(list)
+    deadline = time.perf_counter() + duration
+    issued = 0
+
+    async def worker():
+        nonlocal issued
+        while time.perf_counter() < deadline and (not max_commands or issued < max_commands):
+            issued += 1
+            name = bench.rng.choices(names, relative_weights)[0]
+            started = time.perf_counter()
+            try:
+                await SCENARIOS[name](bench)
+            except Exception as e:
+                errors[name].append(repr(e))
+                continue
+            latencies[name].append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def build_report(latencies, errors, elapsed, probe):
+    commands = {}
+    for name in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies[name])
+        commands[name] = {
+            "count": len(values),
+            "errors": len(errors[name]),
+            "first_error": errors[name][0] if errors[name] else None,
+            "throughput": len(values) / elapsed,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "max_ms": (values[-1] if values else 0.0) * 1000,
+        }
+    completed = sum(command["count"] for command in commands.values())
+    return {
+        "elapsed_s": elapsed,
+        "completed": completed,
+        "throughput": completed / elapsed,
+        "loop_blocked_s": probe.blocked,
+        "loop_blocked_pct": 100 * probe.blocked / elapsed,
+        "longest_block_ms": probe.longest * 1000,
+        "commands": commands,
+    }
+
+
+def print_report(report):
+    print(f"{'command':<12} {'count':>7} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for name, command in report["commands"].items():
+        print(
+            f"{name:<12} {command['count']:>7} {command['throughput']:>8.1f} {command['p50_ms']:>8.1f} "
+            f"{command['p95_ms']:>8.1f} {command['p99_ms']:>8.1f} {command['max_ms']:>8.1f} {command['errors']:>7}"
+        )
+        if command["first_error"]:
+            print(f"  first error: {command['first_error']}")
+    print(
+        f"\n{report['completed']} commands in {report['elapsed_s']:.1f}s ({report['throughput']:.1f}/s), "
+        f"event loop blocked {report['loop_blocked_s']:.2f}s ({report['loop_blocked_pct']:.1f}%), "
+        f"longest block {report['longest_block_ms']:.1f} ms"
+    )
+
+
+async def main(args):
+    weights = parse_mix(args.mix)
+    if args.database == "banking_bot":
+        raise SystemExit("Refusing to benchmark against the production database name")
+
+    stub = StubAPI(latency=args.api_latency / 1000)
+    stub_url = await stub.start()
+    sqlite_dir = tempfile.mkdtemp(prefix="quantumbank-bench-")
+    # Configure the bot's modules before they are imported
+    os.environ.update({
+        "STORAGE_BACKEND": args.storage,
+        "SQLITE_PATH": os.path.join(sqlite_dir, "bench.sqlite3"),
+        "MONGO_URI": args.mongo_uri,
+        "MONGO_DATABASE": args.database,
+        "BASE_URL": stub_url,
+        "FILTER_URL": "/anime?filter[text]=",
+        "INFO_URL": "https://kitsu.example/anime/",
+    })
+
+    bench = Benchmark(args, stub_url)
+    loop = asyncio.get_running_loop()
+    ranked = await loop.run_in_executor(None, bench.seed)
+    print(f"Seeded {ranked} accounts over {len(bench.guilds)} branches")
+    bench.load_cogs()
+
+    import async_db
+
+    probe = LoopBlockingProbe()
+    probe.start()
+    started = time.perf_counter()
+    latencies, errors = await replay(bench, weights, args.concurrency, args.duration, args.commands)
+    elapsed = time.perf_counter() - started
+    await probe.stop()
+
+    await bench.unload_cogs()
+    await async_db.close()
+    await stub.stop()
+    shutil.rmtree(sqlite_dir, ignore_errors=True)
+
+    report = build_report(latencies, errors, elapsed, probe)
+    report["config"] = {key: value for key, value in vars(args).items() if key != "json"}
+    report["stub_requests"] = stub.requests
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20, help="Commands in flight at once")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds to replay commands for")
+    parser.add_argument("--commands", type=int, default=0, help="Stop after this many commands (0: no limit)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Relative command weights, name=weight,...")
+    parser.add_argument("--accounts", type=int, default=5000, help="Accounts to seed")
+    parser.add_argument("--guilds", type=int, default=20, help="Branches to spread the accounts over")
+    parser.add_argument("--balance", type=float, default=1_000_000, help="Starting balance of every account")
+    parser.add_argument("--api-latency", type=float, default=50, help="Stub API response delay in ms")
+    parser.add_argument("--storage", choices=("mongo", "memory", "sqlite"), default="memory", help="Storage backend")
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://127.0.0.1:27017/?replicaSet=rs0"))
+    parser.add_argument("--database", default="banking_bot_bench", help="Database to seed, dropped on every run")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the command mix")
+    parser.add_argument("--json", help="Also write the report to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args(sys.argv[1:])))
@@ -0,0 +1,83 @@
+"""
+Local HTTP server standing in for the anime API and Discord's avatar CDN.
+
+Responses are generated once and served with a configurable delay, so the
+benchmark exercises the real HTTP clients, pools and caches without depending
+on the network.
+"""
+import asyncio
+import io
+
+from aiohttp import web
+
+
+def _avatar_png(size=64):
+    from PIL import Image
+
+    with io.BytesIO() as buffer:
+        Image.new("RGBA", (size, size), (88, 101, 242, 255)).save(buffer, "PNG")
+        return buffer.getvalue()
+
+
+def _anime_document(query):
+    return {
+        "data": [{
+            "id": str(abs(hash(query)) % 100000),
+            "attributes": {
+                "titles": {"en_jp": query.title()},
+                "synopsis": f"Synopsis of {query}. " * 20,
+                "posterImage": {"large": "https://media.example/poster.jpg"},
+                "status": "finished",
+                "subtype": "TV",
+                "episodeCount": 24,
+                "averageRating": "81.2",
+                "ratingRank": 120,
+                "createdAt": "2013-04-07T00:00:00.000Z",
+                "updatedAt": "2024-01-01T00:00:00.000Z",
+            },
+        }]
+    }
+
+
+class StubAPI:
+    """
+    Serves ``/anime?filter[text]=...`` and ``/avatars/<key>.png``.
+
+    Attributes:
+        latency (float): Seconds every response is delayed by.
+        requests (int): Requests served.
+        base_url (str): ``http://host:port`` once started.
+    """
+    def __init__(self, latency=0.05, host="127.0.0.1"):
+        self.latency = latency
+        self.host = host
+        self.requests = 0
+        self.base_url = None
+        self._avatar = _avatar_png()
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/anime", self.anime)
+        app.router.add_get("/avatars/{key}.png", self.avatar)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{self.host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def anime(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return web.json_response(_anime_document(request.query.get("filter[text]", "")))
+
+    async def avatar(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return web.Response(body=self._avatar, content_type="image/png")
@@ -1,13 +1,124 @@
+from resources.startup import STARTUP_MODE, startup_report
+import asyncio
 import discord
 import os
 from cogs.errors import logger
 import sys
-from resources.checks import is_command_enabled
+from resources.checks import command_enabled
+from db import STORAGE_BACKEND, get_storage
+from async_db import load_command_settings, refresh_command_settings, forget_command_settings, load_leaderboards
+from async_db import close as close_db
+from resources.counters import counters
 
-intents = discord.Intents.all()
+startup_report.record('imports', startup_report.elapsed())
 
+INTENTS_PROFILE = os.getenv('INTENTS_PROFILE', 'minimal')
 
-bot = discord.Bot(command_prefix='!', intents=intents)
+
+def intent_settings(profile=INTENTS_PROFILE):
+    """
+    Returns the intents and member cache settings of a profile.
+
+    ``minimal`` subscribes only to what the commands use: guilds, guild and DM
+    messages (random chat relays and KYC replies) and their content, and member
+    join/leave events, which keep the member counters current. Members are
+    still not cached or chunked, slash commands receive the members they need
+    with the interaction. Like message content, the members intent is privileged
+    and must be enabled in the developer portal. ``full`` restores every intent
+    and the complete member cache.
+
+    Parameters:
+        profile (str): ``minimal`` or ``full``.
+
+    Returns:
+        dict: Keyword arguments for the bot constructor.
+    """
+    if profile == 'full':
+        return {'intents': discord.Intents.all()}
+    if profile != 'minimal':
+        raise RuntimeError(f'Unknown INTENTS_PROFILE {profile!r}, expected minimal or full')
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.dm_messages = True
+    intents.message_content = True
+    # Only for on_member_join/on_member_remove, the member cache stays off below
+    intents.members = True
+    return {
+        'intents': intents,
+        'member_cache_flags': discord.MemberCacheFlags.none(),
+        'chunk_guilds_at_startup': False,
+    }
+
+
+def shard_settings():
+    """
+    Reads the optional ``SHARD_COUNT`` and ``SHARD_IDS`` settings.
+
+    Without them Discord's recommended shard count is used and this process runs
+    every shard. ``SHARD_IDS`` (e.g. ``0,1,2``) splits the shards over several
+    processes and requires ``SHARD_COUNT``.
+
+    Each process keeps its own account cache, leaderboards and command settings,
+    so reads are eventually consistent across processes: cached accounts expire
+    after a shorter ``ACCOUNT_CACHE_TTL`` (30 s by default) and the leaderboards
+    and command settings are reloaded every ``SHARED_STATE_REFRESH_INTERVAL``
+    seconds by :class:`cogs.shards.ShardsCog`.
+
+    Returns:
+        dict: Keyword arguments for ``discord.AutoShardedBot``.
+    """
+    settings = {}
+    shard_count = os.getenv('SHARD_COUNT')
+    shard_ids = os.getenv('SHARD_IDS')
+    if shard_count:
+        settings['shard_count'] = int(shard_count)
+    if shard_ids:
+        if not shard_count:
+            raise RuntimeError('SHARD_IDS requires SHARD_COUNT to be set')
+        settings['shard_ids'] = [int(shard_id) for shard_id in shard_ids.split(',')]
+    return settings
+
+
+def bootstrap_database():
+    """
+    Opens the storage backend. For MongoDB, checks that it supports transactions
+    and creates any missing indexes.
+
+    Raises:
+        RuntimeError: If MongoDB is a standalone server, see
+            :meth:`storage.mongo.MongoStorage.require_transactions`.
+    """
+    if STORAGE_BACKEND != 'mongo':
+        # The memory and SQLite backends create their indexes when opened
+        get_storage()
+        return
+    from schema import ensure_indexes
+
+    with startup_report.phase('require_transactions'):
+        get_storage().require_transactions()
+    with startup_report.phase('ensure_indexes'):
+        for index_error in ensure_indexes():
+            print(f'Failed to create index {index_error}')
+
+
+class QuantumBank(discord.AutoShardedBot):
+    database_ready = None
+    startup_reported = False
+
+    async def start(self, *args, **kwargs):
+        """Bootstraps the database in the background while the gateway connects (lazy startup)."""
+        if STARTUP_MODE == 'lazy':
+            self.database_ready = asyncio.get_running_loop().run_in_executor(None, bootstrap_database)
+        await super().start(*args, **kwargs)
+
+    async def close(self):
+        """Flushes buffered database writes before disconnecting."""
+        await close_db()
+        await super().close()
+
+
+bot = QuantumBank(command_prefix='!', **intent_settings(), **shard_settings())
 
 TOKEN = os.getenv("DISCORD_TOKEN")
 
@@ -31,18 +142,72 @@ async def on_ready():
         to show the bot's connection status.
     """
     print(f'Logged in as {bot.user}')
-    print(f'Connected to {len(bot.guilds)} guilds')
+    print(f'Connected to {len(bot.guilds)} guilds over {len(bot.shards)} of {bot.shard_count} shards')
+    counters.load(bot.guilds)
+
+    if bot.database_ready is not None:
+        try:
+            await bot.database_ready
+        except RuntimeError as e:
+            # A misconfigured database would fail every payment, stop instead of running half-broken
+            print(f'Database bootstrap failed: {e}')
+            await bot.close()
+            return
+
+    with startup_report.phase('command_settings'):
+        guilds_with_settings = await load_command_settings()
+    print(f'Loaded command settings for {guilds_with_settings} guilds')
+
+    with startup_report.phase('leaderboards'):
+        ranked_accounts = await load_leaderboards()
+    print(f'Loaded leaderboards with {ranked_accounts} accounts')
 
     channel_id = int(os.getenv('NOTIFICATION_CHANNEL_ID'))
     channel = bot.get_channel(channel_id)
     if channel:
         await channel.send('Bot has been deployed and is now online!')
 
-    total_members = sum(guild.member_count for guild in bot.guilds)
-    total_guilds = len(bot.guilds)
-    await bot.change_presence(activity=discord.Game(name=f'{os.getenv("ACTIVITY")} | {total_members} Users | {total_guilds} Guilds'))
-    for command in bot.application_commands:
-        command.add_check(is_command_enabled())
+    for shard_id in bot.shards:
+        await set_presence(shard_id)
+
+    if not bot.startup_reported:
+        bot.startup_reported = True
+        print(startup_report.format())
+
+async def set_presence(shard_id):
+    """Shows the member and guild totals of this process in a shard's presence."""
+    await bot.change_presence(
+        activity=discord.Game(name=f'{os.getenv("ACTIVITY")} | {counters.members} Users | {counters.guilds} Guilds'),
+        shard_id=shard_id
+    )
+
+@bot.event
+async def on_shard_ready(shard_id):
+    """Restores the presence of a shard that reconnected after the bot was ready."""
+    if bot.is_ready():
+        await set_presence(shard_id)
+
+@bot.event
+async def on_guild_join(guild):
+    """Loads the command settings of a guild the bot was just added to."""
+    counters.add_guild(guild)
+    await refresh_command_settings(guild.id)
+
+@bot.event
+async def on_guild_remove(guild):
+    """Drops the cached command settings of a guild the bot was removed from."""
+    counters.remove_guild(guild)
+    forget_command_settings(guild.id)
+
+@bot.event
+async def on_member_join(member):
+    """Counts a new member."""
+    counters.member_joined(member.guild.id)
+
+@bot.event
+async def on_member_remove(member):
+    """Uncounts a departed member."""
+    counters.member_left(member.guild.id)
 
 @bot.event
 async def on_error(event, *args, **kwargs):
@@ -58,19 +223,30 @@ cogs_list = [
     'anime',
     'errors',
     'helpers',
+    'history',
     'leaderboard',
     'help',
-    'general'
+    'general',
+    'shards',
+    'stats',
+    'interest'
 ]
 
 
 for cog in cogs_list:
     try:
-        bot.load_extension(f'cogs.{cog}')
-        print(f'Loaded cog: {cog}')
+        with startup_report.phase(f'cog {cog}') as phase:
+            bot.load_extension(f'cogs.{cog}')
+        print(f'Loaded cog: {cog} ({phase.seconds * 1000:.1f} ms)')
     except Exception as e:
         print(f'Failed to load cog {cog}: {e}')
 
+# One global check instead of attaching a check to every command on each on_ready
+bot.add_check(command_enabled)
+
+if STARTUP_MODE == 'eager':
+    bootstrap_database()
+
 bot.run(TOKEN)
 
 
@@ -1,15 +1,18 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import asyncio
 from datetime import datetime
-from db import get_account, create_account, set_upi_id, get_transactions, log_transaction, update_balance, log_failed_kyc_attempt
+from async_db import get_account, create_account, set_upi_id, resolve_upi_id, get_transactions, transfer, log_failed_kyc_attempt
 
 from resources.utils import create_embed
+from resources.passbook import PassbookRenderer
+from resources.avatars import avatar_service
+from resources.kyc import KYCSessionManager, KYCState
 
-from PIL import Image, ImageDraw, ImageFont
-import io
+# Seconds between two sweeps of expired KYC sessions
+KYC_SWEEP_INTERVAL = 15
 
-import requests
+import io
 
 class Account(commands.Cog):  
     """
@@ -21,9 +24,19 @@ class Account(commands.Cog):
 
     Attributes:
         bot (commands.Bot): The bot instance to which this cog is attached.
+        passbook_renderer (PassbookRenderer): Renders passbook images off the event loop.
+        kyc_sessions (KYCSessionManager): Pending KYC verifications keyed by user ID.
     """
     def __init__(self, bot):
         self.bot = bot
+        self.passbook_renderer = PassbookRenderer()
+        self.kyc_sessions = KYCSessionManager()
+        self.sweep_kyc_sessions.start()
+
+    def cog_unload(self):
+        self.sweep_kyc_sessions.cancel()
+        self.passbook_renderer.shutdown()
+        self.bot.loop.create_task(avatar_service.close())
 
     @discord.slash_command(description="Initiate KYC verification for account creation.")
     async def create_account(self, ctx):
@@ -34,19 +47,22 @@ class Account(commands.Cog):
         """
         actual_user_id = str(ctx.author.id)
         actual_guild_id = str(ctx.guild.id)
-        username = ctx.author.name
-        guild_name = ctx.guild.name
 
-        existing_account = get_account(actual_user_id)
+        existing_account = await get_account(actual_user_id)
         if existing_account:
             embed = discord.Embed(
                 title="Account Already Exists",
-                description=f"You already have an account at the **'{existing_account['branch_name']}'** branch!",
+                description=f"You already have an account at the **'{existing_account.branch_name}'** branch!",
                 color=discord.Color.red()
             )
             await ctx.respond(embed=embed) 
             return
 
+        session = self.kyc_sessions.start(actual_user_id, actual_guild_id, ctx=ctx, guild_name=ctx.guild.name)
+        if session is None:
+            await ctx.respond("Your KYC verification is already in progress. Please check your DMs.", ephemeral=True)
+            return
+
         welcome_embed = discord.Embed(
             title="Hi 👋 Welcome to the **QUANTUM BANK ⚛️**",
             description="To create an account, you need to verify your identity and residence.\n\n"
@@ -55,137 +71,173 @@ class Account(commands.Cog):
         )
         await ctx.respond(embed=welcome_embed)
 
-        # Wait a moment before sending DMs
-        await asyncio.sleep(2)
+        if not await self.send_kyc_prompt(ctx.author):
+            self.kyc_sessions.complete(actual_user_id)
+            error_embed = discord.Embed(
+                title="KYC Verification Failed",
+                description="I couldn't send you a DM. Please enable DMs from server members and try again.",
+                color=discord.Color.red()
+            )
+            await ctx.respond(embed=error_embed)
 
-        while True:
-            # Send DM for KYC verification
-            try:
-                dm_embed = discord.Embed(
-                    title="KYC Verification Required",
-                    description="Please provide your proof of identity (**Discord User ID**) and Proof of residence (**Guild ID**).\n\n"
-                                "**Format**: '<Your Discord User ID> <Your Guild ID>'\n\n"
-                                "**For Example**: `1234567890 1234567890`\n\n"
-                                "If you don't know how to get your Discord User ID, click [here](https://support.discord.com/hc/en-us/articles/206346498-Where-can-I-find-my-User-Server-Message-ID-)\n\n"
-                                "**NOTE**: You have 2 minutes to respond.",
-                    color=discord.Color.gold()
-                )
-                await ctx.author.send(embed=dm_embed)
+    async def send_kyc_prompt(self, user):
+        """
+        Sends the KYC instructions to the applicant by DM.
 
-            except discord.Forbidden:
-                error_embed = discord.Embed(
-                    title="KYC Verification Failed",
-                    description="I couldn't send you a DM. Please enable DMs from server members and try again.",
+        Returns:
+            bool: False if the user does not accept DMs from the bot.
+        """
+        timeout_minutes = round(self.kyc_sessions.timeout / 60)
+        dm_embed = discord.Embed(
+            title="KYC Verification Required",
+            description="Please provide your proof of identity (**Discord User ID**) and Proof of residence (**Guild ID**).\n\n"
+                        "**Format**: '<Your Discord User ID> <Your Guild ID>'\n\n"
+                        "**For Example**: `1234567890 1234567890`\n\n"
+                        "If you don't know how to get your Discord User ID, click [here](https://support.discord.com/hc/en-us/articles/206346498-Where-can-I-find-my-User-Server-Message-ID-)\n\n"
+                        f"**NOTE**: You have {timeout_minutes} minutes to respond.",
+            color=discord.Color.gold()
+        )
+        try:
+            await user.send(embed=dm_embed)
+        except discord.Forbidden:
+            return False
+        return True
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        """
+        Routes DMs from applicants to their KYC session.
+
+        This is the only listener for KYC replies, whatever the number of
+        pending sessions: a message that is not a DM from an applicant awaiting
+        details is discarded after a dict lookup.
+        """
+        if message.author.bot or message.guild is not None:
+            return
+
+        user_id = str(message.author.id)
+        session = self.kyc_sessions.get(user_id)
+        if session is None:
+            return
+
+        provided_data = message.content.split()
+        if len(provided_data) != 2:
+            if session.state is KYCState.AWAITING_DETAILS:
+                invalid_format_embed = discord.Embed(
+                    title="Invalid Format",
+                    description="Please provide your Discord User ID and Guild ID in the correct format. For example: `1234567890 1234567890`",
                     color=discord.Color.red()
                 )
-                await ctx.respond(embed=error_embed)
-                return
-
-            # Wait for user's response in DM
-            def check(msg):
-                """
-                Checks if the message is sent by the command author and in a DM channel.
+                await message.author.send(embed=invalid_format_embed)
+            return
 
-                This function is used to filter messages based on two conditions:
-                1. The message must be sent by the same user who invoked the command.
-                2. The message must be sent in a direct message (DM) channel.
+        # Ignore further replies while a previous attempt is being verified
+        if self.kyc_sessions.begin_verification(user_id) is None:
+            return
 
-                Parameters:
-                    msg (discord.Message): The message object to check.
+        # Processing Your KYC details in Central Database
+        processing_embed = discord.Embed(
+            title="Processing Your KYC details in Central Database",
+            description="Please wait while we verify your KYC details.",
+            color=discord.Color.gold()
+        )
+        provided_user_id, provided_guild_id = provided_data
+        scheduled = False
+        try:
+            await message.author.send(embed=processing_embed)
+            self.kyc_sessions.verify_later(session, self.finish_kyc, message.author, provided_user_id, provided_guild_id)
+            scheduled = True
+        finally:
+            # Never leave the session verifying without a callback to close it
+            if not scheduled:
+                self.kyc_sessions.retry(user_id)
+
+    async def finish_kyc(self, session, user, provided_user_id, provided_guild_id):
+        """
+        Verifies submitted KYC details once the verification delay has elapsed.
 
-                Returns:
-                    bool: Returns True if the message is from the command author
-                    and is in a DM channel, otherwise returns False.
-                """
-                return msg.author == ctx.author and isinstance(msg.channel, discord.DMChannel)
+        On a mismatch the attempt is logged and the applicant may try again,
+        otherwise the account is created and the session closed.
+        """
+        # The session expired while waiting for this callback
+        if self.kyc_sessions.get(session.user_id) is not session:
+            return
+        ctx = session.context['ctx']
+        guild_name = session.context['guild_name']
 
+        # Validate KYC details
+        if provided_user_id != session.user_id or provided_guild_id != session.guild_id:
             try:
-                dm_response = await self.bot.wait_for('message', check=check, timeout=120)  # Wait for 2 minutes
-                provided_data = dm_response.content.split()
-
-                if len(provided_data) != 2:
-                    invalid_format_embed = discord.Embed(
-                        title="Invalid Format",
-                        description="Please provide your Discord User ID and Guild ID in the correct format. For example: `1234567890 1234567890`",
-                        color=discord.Color.red()
-                    )
-                    await ctx.author.send(embed=invalid_format_embed)
-                    continue
-
-                # Processing Your KYC details in Central Database Please wait for 10 seconds
-                processing_embed = discord.Embed(
-                    title="Processing Your KYC details in Central Database",
-                    description="Please wait while we verify your KYC details.",
-                    color=discord.Color.gold()
-                )
-                await ctx.author.send(embed=processing_embed)
-
-                provided_user_id, provided_guild_id = provided_data
-
-                await asyncio.sleep(10)  # Simulate processing time
-
-                # Validate KYC details
-                if provided_user_id != actual_user_id or provided_guild_id != actual_guild_id:
-                    # Log failed KYC attempt
-                    log_failed_kyc_attempt(user_id=actual_user_id, 
-                                            provided_user_id=provided_user_id,
-                                            guild_id=actual_guild_id,
-                                            provided_guild_id=provided_guild_id,
-                                            reason="KYC details mismatch")
-
-                    kyc_failed_embed = discord.Embed(
-                        title="KYC Verification Failed",
-                        description="The provided details do not match your actual Discord User ID and Guild ID. Please try again.",
-                        color=discord.Color.red()
-                    )
-                    await ctx.author.send(embed=kyc_failed_embed) 
-                    continue
-
-                # Create new account if KYC is successful using create_account function
-                success = create_account(actual_user_id, actual_guild_id, username, guild_name)
-
-                if success:
-                    success_embed = discord.Embed(
-                        title="Account Created",
-                        description=f"Your account has been successfully created at the **'{guild_name}'** branch!",
-                        color=discord.Color.green()
-                    )
-                    await ctx.author.send(embed=success_embed)
-
-                    account_details_embed = discord.Embed(
-                        title="Your Account Details",
-                        description=f"**Username**: {username}\n**User ID**: {actual_user_id}\n**Branch Name**: {guild_name}\n**Branch ID**: {actual_guild_id}\n**Balance**: 0\n**Account Created At**: {datetime.now()}",
-                        color=discord.Color.blue()
-                        )
-                    account_details_embed.set_thumbnail(url=ctx.author.avatar.url)
-                    account_details_embed.set_footer(text="Powered By Quantum Bank ⚛️")
-
-
-                    await ctx.author.send(embed=account_details_embed)
-
-                    public_success_embed = discord.Embed(
-                        title="Account Created",
-                        description=f"{ctx.author.name} has successfully created an account. Check your DMs for the details.",
-                        color=discord.Color.green()
-                    )
-                    await ctx.respond(embed=public_success_embed)
-                    break 
-                error_embed = discord.Embed(
-                    title="Account Creation Failed",
-                    description="An error occurred while creating your account. Please try again later.",
+                # Log failed KYC attempt
+                await log_failed_kyc_attempt(user_id=session.user_id,
+                                             provided_user_id=provided_user_id,
+                                             guild_id=session.guild_id,
+                                             provided_guild_id=provided_guild_id,
+                                             reason="KYC details mismatch")
+
+                kyc_failed_embed = discord.Embed(
+                    title="KYC Verification Failed",
+                    description="The provided details do not match your actual Discord User ID and Guild ID. Please try again.",
                     color=discord.Color.red()
                 )
-                await ctx.author.send(embed=error_embed)
-                break
+                await user.send(embed=kyc_failed_embed)
+            finally:
+                # Even if the DM or the log failed, the applicant may submit again
+                self.kyc_sessions.retry(session.user_id)
+            await self.send_kyc_prompt(user)
+            return
 
-            except asyncio.TimeoutError:
-                timeout_embed = discord.Embed(
-                    title="KYC Verification Timed Out",
-                    description="You took too long to provide your KYC details. Please try again.",
-                    color=discord.Color.red()
-                )
-                await ctx.author.send(embed=timeout_embed)
-                break
+        self.kyc_sessions.complete(session.user_id)
+
+        # Create new account if KYC is successful using create_account function
+        success = await create_account(session.user_id, session.guild_id, user.name, guild_name)
+
+        if not success:
+            error_embed = discord.Embed(
+                title="Account Creation Failed",
+                description="An error occurred while creating your account. Please try again later.",
+                color=discord.Color.red()
+            )
+            await user.send(embed=error_embed)
+            return
+
+        success_embed = discord.Embed(
+            title="Account Created",
+            description=f"Your account has been successfully created at the **'{guild_name}'** branch!",
+            color=discord.Color.green()
+        )
+        await user.send(embed=success_embed)
+
+        account_details_embed = discord.Embed(
+            title="Your Account Details",
+            description=f"**Username**: {user.name}\n**User ID**: {session.user_id}\n**Branch Name**: {guild_name}\n**Branch ID**: {session.guild_id}\n**Balance**: 0\n**Account Created At**: {datetime.now()}",
+            color=discord.Color.blue()
+            )
+        account_details_embed.set_thumbnail(url=user.display_avatar.url)
+        account_details_embed.set_footer(text="Powered By Quantum Bank ⚛️")
+
+        await user.send(embed=account_details_embed)
+
+        public_success_embed = discord.Embed(
+            title="Account Created",
+            description=f"{user.name} has successfully created an account. Check your DMs for the details.",
+            color=discord.Color.green()
+        )
+        await ctx.respond(embed=public_success_embed)
+
+    @tasks.loop(seconds=KYC_SWEEP_INTERVAL)
+    async def sweep_kyc_sessions(self):
+        """Expires KYC sessions whose applicants did not answer in time."""
+        for session in self.kyc_sessions.sweep():
+            timeout_embed = discord.Embed(
+                title="KYC Verification Timed Out",
+                description="You took too long to provide your KYC details. Please try again.",
+                color=discord.Color.red()
+            )
+            try:
+                await session.context['ctx'].author.send(embed=timeout_embed)
+            except discord.HTTPException:
+                pass
 
     @discord.slash_command(description="Generate a UPI ID for your account.")
     async def generate_upi(self, ctx):
@@ -207,19 +259,19 @@ class Account(commands.Cog):
         user_id = str(ctx.author.id)
 
         # Fetch account details from the database
-        account = get_account(user_id)
+        account = await get_account(user_id)
 
         if not account:
             await ctx.respond("You don't have an account! Use `!create_account` to open one.")
             return
 
         # Check if UPI ID already exists
-        if "upi_id" in account and account["upi_id"]:
-            await ctx.respond(f"You already have a UPI ID: `{account['upi_id']}`. You cannot generate another one.")
+        if account.upi_id:
+            await ctx.respond(f"You already have a UPI ID: `{account.upi_id}`. You cannot generate another one.")
             return
 
         # Generate and set UPI ID
-        upi_id = set_upi_id(user_id)
+        upi_id = await set_upi_id(user_id)
 
         embed = create_embed(
             title="UPI ID Generated",
@@ -254,7 +306,7 @@ class Account(commands.Cog):
         sender_id = str(ctx.author.id)
 
         # Fetch account details from the database
-        sender_account = get_account(sender_id)
+        sender_account = await get_account(sender_id, "balance_only")
 
         if not sender_account:
             await ctx.respond("You don't have an account! Use `!create_account` to open one.")
@@ -264,17 +316,21 @@ class Account(commands.Cog):
             await ctx.respond("You must pay a positive amount.")
             return
 
-        if amount > sender_account['balance']:
+        if amount > sender_account.balance:
             await ctx.respond("You do not have enough balance to make this payment.")
             return
 
-        # Check if the provided UPI ID belongs to an existing user
-        receiver_account = get_account(upi_id.split('@')[0])  # Assuming the format is <userID>@<bank>
+        # Resolve the full UPI ID through the unique-indexed directory
+        receiver_id = await resolve_upi_id(upi_id.strip())
 
-        if not receiver_account:
+        if not receiver_id:
             await ctx.respond(f"No account found for the provided UPI ID: {upi_id}.")
             return
 
+        if receiver_id == sender_id:
+            await ctx.respond("You cannot make a payment to yourself.")
+            return
+
         # Create confirmation and decline buttons
         confirm_button = discord.ui.Button(label="Confirm Payment", style=discord.ButtonStyle.green)
         decline_button = discord.ui.Button(label="Decline Payment", style=discord.ButtonStyle.red)
@@ -292,29 +348,29 @@ class Account(commands.Cog):
                 the user's action with the confirm button.
 
             Actions:
-                - Deducts the specified `amount` from the sender's account balance.
-                - Assumes the existence of `sender_account` and `amount` variables.
-                - Updates the balance after deduction.
+                - Atomically debits the sender and credits the receiver using
+                  the current balances in the database, not the snapshot taken
+                  when the buttons were shown.
+                - Writes the ledger entries for both parties in the same transaction.
             """
-            # Deduct amount from sender's balance
-            new_sender_balance = sender_account['balance'] - amount
-
-            # Add amount to receiver's balance
-            new_receiver_balance = receiver_account['balance'] + amount
+            # Debit, credit and ledger entries are applied in one transaction
+            balances = await transfer(sender_id, receiver_id, amount)
 
-            # Log transaction for sender
-            log_transaction(sender_id, 'send_upi_payment', amount, receiver_account['user_id'])
-
-            # Log transaction for receiver as well
-            log_transaction(receiver_account['user_id'], 'received_upi_payment', amount, sender_id)
+            if balances is None:
+                embed = discord.Embed(
+                    title="Payment Failed",
+                    description="You do not have enough balance to make this payment.",
+                    color=discord.Color.red()
+                )
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+                return
 
-            # Update balances in the database
-            update_balance(sender_id, new_sender_balance)  # Update sender's balance
-            update_balance(receiver_account['user_id'], new_receiver_balance)  # Update receiver's balance
+            new_sender_balance, _ = balances
 
             embed = discord.Embed(
                 title="Payment Successful",
-                description=f"You have successfully paid ${amount:.2f} using your UPI ID `{upi_id}`.",
+                description=f"You have successfully paid ${amount:.2f} using your UPI ID `{upi_id}`.\n"
+                            f"Your new balance is ${new_sender_balance:,.2f}.",
                 color=discord.Color.green()
             )
 
@@ -348,98 +404,36 @@ class Account(commands.Cog):
         """Generates and displays a passbook for the user."""
         user_id = str(ctx.author.id)
 
-        # Fetch account details from the database
-        account = get_account(user_id)
+        # Fetch account details and transactions concurrently from the database
+        account, transactions = await asyncio.gather(get_account(user_id), get_transactions(user_id))
 
         if not account:
             await ctx.respond("You don't have an account! Use `/create_account` to open one.")
             return
 
-        # Fetch transactions for the user
-        transactions = get_transactions(user_id)
-
-        # Generate the passbook image
-        passbook_image = self.create_passbook_image(ctx.author.name, account, transactions, ctx.author.avatar.url)
-
-        if passbook_image is None:
-            await ctx.respond("Failed to generate your passbook. Please try again later.")
-            return
-
-        # Send the generated image as an attachment
-        with io.BytesIO() as image_binary:
-            passbook_image.save(image_binary, 'PNG')
-            image_binary.seek(0)  # Move to the start of the BytesIO buffer
-
-            await ctx.respond(file=discord.File(fp=image_binary, filename='passbook.png'))
-
-    @staticmethod
-    def create_passbook_image(username, account, transactions, avatar_url):
-        """
-        Creates a decorative passbook-like image with account information and transaction history.
-        Returns the image object.
-        """
+        # Render the passbook on the renderer's thread pool
         try:
-            # Use a relative path for the background image
-            background_path = "images/Technology-for-more-than-technologys-sake-1024x614.jpg"
-
-            # Load background image from local path
-            background_image = Image.open(background_path)
-
-            # Resize background if necessary
-            background_image = background_image.resize((600, 400))
-
-            # Create a new blank image with the background
-            passbook = Image.new('RGB', (600, 400))
-            passbook.paste(background_image)
-
-            draw = ImageDraw.Draw(passbook)
-
-            # Load custom fonts (make sure to have .ttf files in your project directory)
-            title_font_path = "fonts/arial.ttf"  # Ensure this path is correct and accessible
-            text_font_path = "fonts/arial.ttf"    # Ensure this path is correct and accessible
-
-            title_font = ImageFont.truetype(title_font_path, size=24)  # Larger font for title
-            text_font = ImageFont.truetype(text_font_path, size=18)   # Larger font for text
-
-            # Draw title and account information with white text
-            draw.text((20, 20), f"Passbook for {username}", fill='white', font=title_font)
-            draw.text((20, 60), f"Branch Name: {account['branch_name']}", fill='white', font=text_font)
-            draw.text((20, 90), f"Balance: ${account['balance']:.2f}", fill='white', font=text_font)
-
-            # Load user avatar
-            avatar_image = Image.open(requests.get(avatar_url, stream=True).raw).convert("RGBA")
-
-            # Resize avatar if necessary
-            avatar_image = avatar_image.resize((50, 50))  # Resize avatar to fit nicely on the card
-
-            # Paste user avatar onto the card (position it at (500, 10))
-            passbook.paste(avatar_image, (500, 10), avatar_image)  # Use mask for transparency
-
-            # Draw transaction history title without a background
-            draw.text((20, 130), "Transaction History:", fill='white', font=text_font)
-
-            y_offset = 160
-            for txn in transactions[:5]:  # Limit to last 5 transactions for display
-                txn_info = f"{txn['type'].capitalize()} 💵: ${txn['amount']} on {txn['timestamp']}"
-                draw.text((20, y_offset), txn_info, fill='white', font=text_font)
-                y_offset += 25
-
-            return passbook
-
+            avatar = await avatar_service.get(ctx.author.display_avatar)
+            passbook_png = await self.passbook_renderer.render_async(
+                ctx.author.name, account, transactions, avatar
+            )
         except Exception as e:
             print(f"Error creating passbook: {e}")
-            return None
+            await ctx.respond("Failed to generate your passbook. Please try again later.")
+            return
 
+        # Send the generated image as an attachment
+        await ctx.respond(file=discord.File(fp=io.BytesIO(passbook_png), filename='passbook.png'))
 
     @discord.user_command(name="Show UPI ID")
     async def get_upi_id(self, ctx, user: discord.Member):
         # Fetch account details from the database
-        account = get_account(str(user.id))
+        account = await get_account(str(user.id))
 
-        if account and 'upi_id' in account:
+        if account and account.upi_id:
             embed = discord.Embed(
                 title="UPI ID Information",
-                description=f"{user.name}'s UPI ID: `{account['upi_id']}`",
+                description=f"{user.name}'s UPI ID: `{account.upi_id}`",
                 color=discord.Color.green()
             )
         else:
@@ -1,8 +1,11 @@
 import discord
 from discord.ext import commands
-import requests
+import aiohttp
+import asyncio
 import os
 
+from resources.anime_client import AnimeClient
+
 base_url = os.getenv("BASE_URL")  
 filter_url = os.getenv("FILTER_URL")
 info_url = os.getenv("INFO_URL")
@@ -15,7 +18,8 @@ class AnimeView(discord.ui.View):
     def __init__(self, anime_data):
         super().__init__()
         self.anime_data = anime_data
-        self.add_item(discord.ui.Button(label="More Info", url=info_url + anime_data["id"]))
+        if info_url:
+            self.add_item(discord.ui.Button(label="More Info", url=info_url + anime_data["id"]))
 
     @discord.ui.select(
         placeholder="Select anime information",
@@ -43,13 +47,24 @@ class AnimeView(discord.ui.View):
 class Anime(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Without the API settings the cog still loads, /anime reports it is not configured
+        self.client = AnimeClient(base_url + filter_url, headers=headers) if base_url and filter_url else None
+
+    def cog_unload(self):
+        if self.client is not None:
+            self.bot.loop.create_task(self.client.close())
 
     @discord.slash_command(description="Search for anime information")
     async def anime(self, ctx, name: str):
+        if self.client is None:
+            await ctx.respond("Anime search is not configured on this bot.", ephemeral=True)
+            return
         await ctx.defer()
-        complete_url = base_url + filter_url + name
-        response = requests.get(complete_url)
-        x = response.json()
+        try:
+            x = await self.client.search(name)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            await ctx.respond("The anime service is not responding right now. Please try again later.")
+            return
 
         if not x["data"]:
             await ctx.respond("No anime found with that name.")
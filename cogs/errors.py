@@ -1,44 +1,50 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import logging
 
+from resources.error_reports import (
+    ERROR_DIGEST_INTERVAL, ERROR_REPORTS_PER_MINUTE, ErrorAggregator, TokenBucket, format_digest
+)
+
 logger = logging.getLogger('discord')
 logger.setLevel(logging.ERROR)
 
 class GlobalErrorHandler(commands.Cog):
+    """
+    Answers failed commands and reports the errors to the developers.
+
+    Errors are aggregated by fingerprint and reported as one digest per
+    interval to the debug channel and the owner's DMs, within a fixed budget
+    of outgoing messages.
+
+    Attributes:
+        bot (discord.Bot): The bot instance to which this cog is attached.
+        errors (ErrorAggregator): Errors waiting for the next digest.
+        report_budget (TokenBucket): Limits outgoing report messages.
+        suppressed_reports (int): Report messages skipped because the budget was exhausted.
+    """
     def __init__(self, bot):
         self.bot = bot
         self.debug_channel_id = 823956476887302194
         self.owner_id = 600502738572279838  # Replace with your debug channel ID
+        self.errors = ErrorAggregator()
+        self.report_budget = TokenBucket(ERROR_REPORTS_PER_MINUTE / 60, ERROR_REPORTS_PER_MINUTE)
+        self.suppressed_reports = 0
+        self._owner_channel = None
+        self.send_error_digest.start()
+
+    def cog_unload(self):
+        self.send_error_digest.cancel()
 
     @commands.Cog.listener()
     async def on_application_command_error(self, ctx: discord.ApplicationContext, error: discord.DiscordException):
         """Handles errors globally for all slash commands."""
-        # Log the error to the console
-        print(f"Error occurred: {error}")
-
-        # Format the error message
-        error_message = "**An exception has occurred!**\n"
-        error_message += f"**User:** {ctx.user}\n"
-        error_message += f"**Command:** /{ctx.command.qualified_name}\n"
-        error_message += f"**Error:** {str(error)}\n"
-        error_message += "**Traceback:**\n``````"
-
-        # Send error to debug channel
-        debug_channel = self.bot.get_channel(self.debug_channel_id)
-
-        if debug_channel:
-            embed = discord.Embed(title="Bot Error", description=error_message, color=discord.Color.red())
-            await debug_channel.send(embed=embed)
-
-        # Send error to owner's DM
-        owner = await self.bot.fetch_user(self.owner_id)
-        if owner:
-            try:
-                await owner.send(error_message)
-            except discord.errors.HTTPException:
-                print("Failed to send error message to owner's DM.")
-
+        original = getattr(error, "original", error)
+        command = ctx.command.qualified_name if ctx.command else "unknown"
+        if self.errors.add(command, original):
+            logger.error(f"Error in /{command} by {ctx.user}: {original!r}", exc_info=original)
+        else:
+            logger.error(f"Error in /{command} by {ctx.user}: {original!r} (repeated)")
 
         # Send a user-friendly message to the user
         if isinstance(error, discord.ApplicationCommandInvokeError):
@@ -46,8 +52,52 @@ class GlobalErrorHandler(commands.Cog):
         else:
             await ctx.respond("An unexpected error occurred. Please try again later.")
 
-        # Log the error using the logger
-        logger.error(error_message)
+    async def get_owner_channel(self):
+        """Returns the owner's DM channel, resolved with the API only once."""
+        if self._owner_channel is None:
+            owner = self.bot.get_user(self.owner_id) or await self.bot.fetch_user(self.owner_id)
+            self._owner_channel = owner.dm_channel or await owner.create_dm()
+        return self._owner_channel
+
+    async def send_report(self, destination, **kwargs):
+        """Sends one report message if the budget allows it, returning whether it was sent."""
+        if not self.report_budget.try_acquire():
+            self.suppressed_reports += 1
+            return False
+        try:
+            await destination.send(**kwargs)
+        except discord.HTTPException as e:
+            logger.error(f"Failed to send error digest to {destination}: {e}")
+            return False
+        return True
+
+    @tasks.loop(seconds=ERROR_DIGEST_INTERVAL)
+    async def send_error_digest(self):
+        """Reports the errors of the last interval as one digest."""
+        groups = self.errors.drain()
+        if not groups:
+            return
+
+        sent = False
+        debug_channel = self.bot.get_channel(self.debug_channel_id)
+        if debug_channel:
+            embed = discord.Embed(title="Bot Errors", description=format_digest(groups), color=discord.Color.red())
+            sent = await self.send_report(debug_channel, embed=embed)
+
+        try:
+            owner_channel = await self.get_owner_channel()
+        except discord.HTTPException:
+            owner_channel = None
+        if owner_channel:
+            sent = await self.send_report(owner_channel, content=format_digest(groups, limit=2000)) or sent
+
+        if not sent:
+            # Keep the counts for the next digest rather than losing them
+            self.errors.restore(groups)
+
+    @send_error_digest.before_loop
+    async def before_send_error_digest(self):
+        await self.bot.wait_until_ready()
 
 def setup(bot):
     """
@@ -4,13 +4,15 @@ import time
 import platform
 import asyncio
 
-from db import toggle_command, get_command_status
+from async_db import toggle_command, get_command_status
+from resources.counters import counters
+from resources.matchmaking import MatchmakingQueue
 
 class GeneralCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.active_chats = {}
-        self.waiting_users = []
+        self.matchmaking = MatchmakingQueue()
 
 
     @commands.Cog.listener()
@@ -66,7 +68,8 @@ class GeneralCog(commands.Cog):
         embed = discord.Embed(title=f"Server Info - {guild.name}", color=discord.Color.blue())
         embed.set_thumbnail(url=guild.icon.url if guild.icon else None)
         embed.add_field(name="ID", value=guild.id, inline=True)
-        embed.add_field(name="Owner", value=guild.owner, inline=True)
+        # Members are not cached under the minimal intents profile, mention the owner by ID
+        embed.add_field(name="Owner", value=f"<@{guild.owner_id}>", inline=True)
         embed.add_field(name="Created On", value=guild.created_at.strftime("%Y-%m-%d %H:%M:%S"), inline=False)
         embed.add_field(name="Member Count", value=guild.member_count, inline=True)
         embed.add_field(name="Role Count", value=len(guild.roles), inline=True)
@@ -80,15 +83,20 @@ class GeneralCog(commands.Cog):
         embed.set_thumbnail(url=self.bot.user.avatar.url)
         embed.add_field(name="ID", value=self.bot.user.id, inline=True)
         embed.add_field(name="Created On", value=self.bot.user.created_at.strftime("%Y-%m-%d %H:%M:%S"), inline=True)
-        embed.add_field(name="Servers", value=len(self.bot.guilds), inline=True)
-        embed.add_field(name="Users", value=len(set(self.bot.get_all_members())), inline=True)
+        embed.add_field(name="Servers", value=counters.guilds, inline=True)
+        embed.add_field(name="Users", value=counters.members, inline=True)
         embed.add_field(name="Python Version", value=platform.python_version(), inline=True)
         embed.add_field(name="Pycord Version", value=discord.__version__, inline=True)
 
         await ctx.respond(embed=embed)
 
     @discord.slash_command(description="Connect with a random user for chat")
-    async def random_chat(self, ctx):
+    async def random_chat(
+        self,
+        ctx,
+        scope: discord.Option(str, "Who you can be matched with", choices=["anyone", "this server"], default="anyone"),
+        language: discord.Option(str, "Only match with users who chose the same language", required=False, default=None)
+    ):
         user_id = str(ctx.author.id)
         channel_id = ctx.channel.id
 
@@ -96,36 +104,31 @@ class GeneralCog(commands.Cog):
             await ctx.respond("You are already in an active chat. Use `/end_chat` to disconnect first.", ephemeral=True)
             return
 
-        if self.waiting_users:
-            partner_id = self.waiting_users.pop(0)
-            partner = await self.bot.fetch_user(int(partner_id))
+        guild_id = ctx.guild.id if scope == "this server" and ctx.guild else None
+        match_key = (guild_id, language.casefold().strip() if language else None)
+
+        partner_id, waiter = self.matchmaking.join(user_id, match_key)
+        if partner_id is not None:
             self.active_chats[user_id] = {'partner_id': partner_id, 'channel_id': channel_id}
             self.active_chats[partner_id]['partner_id'] = user_id
+            partner = await self.bot.fetch_user(int(partner_id))
 
             partner_channel = self.bot.get_channel(self.active_chats[partner_id]['channel_id'])
 
             await ctx.respond(f"You've been connected with {partner.name}. Start chatting!", ephemeral=True)
             await partner_channel.send(f"{partner.name}, you've been connected with {ctx.author.name}. Start chatting!")
-        else:
-            self.waiting_users.append(user_id)
-            self.active_chats[user_id] = {'partner_id': None, 'channel_id': channel_id}
-            await ctx.respond("You've been added to the waiting list. We'll connect you when a partner is found!", ephemeral=True)
-
-            try:
-                await asyncio.wait_for(self.wait_for_partner(user_id), timeout=120.0)
-            except asyncio.TimeoutError:
-                if user_id in self.waiting_users:
-                    self.waiting_users.remove(user_id)
-                if user_id in self.active_chats:
-                    del self.active_chats[user_id]
-                await ctx.send(f"{ctx.author.mention}, no chat partner was found try again later. The request has been canceled.")
-
-    async def wait_for_partner(self, user_id):
-        while True:
-            await asyncio.sleep(1)
-            if self.active_chats[user_id]['partner_id'] is not None:
-                return
+            return
 
+        self.active_chats[user_id] = {'partner_id': None, 'channel_id': channel_id}
+        await ctx.respond("You've been added to the waiting list. We'll connect you when a partner is found!", ephemeral=True)
+
+        # The future is resolved by the partner's join, there is no polling while waiting
+        try:
+            await asyncio.wait_for(waiter, timeout=120.0)
+        except asyncio.TimeoutError:
+            self.matchmaking.leave(user_id)
+            self.active_chats.pop(user_id, None)
+            await ctx.send(f"{ctx.author.mention}, no chat partner was found try again later. The request has been canceled.")
 
     @discord.slash_command(description="End the current chat session")
     async def end_chat(self, ctx):
@@ -139,6 +142,7 @@ class GeneralCog(commands.Cog):
                 await ctx.respond(f"Chat session with {partner.name} has ended.", ephemeral=True)
                 del self.active_chats[partner_id]
             else:
+                self.matchmaking.leave(user_id)
                 await ctx.respond("Chat session ended.", ephemeral=True)
             del self.active_chats[user_id]
         else:
@@ -153,9 +157,9 @@ class GeneralCog(commands.Cog):
                 await ctx.respond("Command not found.", ephemeral=True)
                 return
 
-            current_status = get_command_status(ctx.guild.id, command_name)
+            current_status = await get_command_status(ctx.guild.id, command_name)
             new_status = not current_status
-            toggle_command(ctx.guild.id, command_name, new_status)
+            await toggle_command(ctx.guild.id, command_name, new_status)
 
             status_str = "enabled" if new_status else "disabled"
             await ctx.respond(f"Command '{command_name}' has been {status_str} for this server.", ephemeral=True)
@@ -31,6 +31,7 @@ class HelpView(discord.ui.View):
         embed = discord.Embed(title="General Commands", color=discord.Color.blue())
         embed.add_field(name="/help", value="Shows this help message", inline=False)
         embed.add_field(name="/ping", value="Check the bot's latency", inline=False)
+        embed.add_field(name="/shards", value="Check the latency and load of each shard", inline=False)
         # Add more general commands here
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -39,6 +40,8 @@ class HelpView(discord.ui.View):
         embed = discord.Embed(title="Economy Commands", color=discord.Color.green())
         embed.add_field(name="/create_account", value="To create your bank account", inline=False)
         embed.add_field(name="/passbook", value="Check your balance", inline=False)
+        embed.add_field(name="/history", value="Browse your full transaction history.", inline=False)
+        embed.add_field(name="/summary", value="Compare your income and spending over a week or month.", inline=False)
         embed.add_field(name="/generate_upi", value="Enable transfer in your bank account.", inline=False)
         embed.add_field(name="/upi_transfer", value="To transfer money to another user account.", inline=False)
         embed.add_field(name="/change_branch", value="To change home branch of your account.", inline=False)
@@ -1,6 +1,6 @@
 import discord
 from discord.ext import commands
-from db import get_account, update_user_branch  # Import MongoDB functions
+from async_db import get_account, update_user_branch, rename_branch, sync_branches  # Import MongoDB functions
 
 from resources.utils import create_embed
 
@@ -14,7 +14,7 @@ class ConfirmBranchChange(discord.ui.View):
 
     @discord.ui.button(label="Confirm", style=discord.ButtonStyle.green)
     async def confirm(self, button: discord.ui.Button, interaction: discord.Interaction):
-        success = update_user_branch(self.user_id, self.new_branch_id, self.new_branch_name)
+        success = await update_user_branch(self.user_id, self.new_branch_id, self.new_branch_name)
         if success:
             embed = create_embed("Branch Changed", f"Your branch has been updated to **{self.new_branch_name}**.", discord.Color.green())
         else:
@@ -32,6 +32,23 @@ class HelperCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Records every guild as a branch, catching up on renames made while the bot was offline."""
+        renamed = await sync_branches([(str(guild.id), guild.name) for guild in self.bot.guilds])
+        if renamed:
+            print(f'Updated the name of {renamed} branches')
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        await rename_branch(str(guild.id), guild.name)
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before, after):
+        """Propagates a guild rename to its branch and every account in it."""
+        if before.name != after.name:
+            await rename_branch(str(after.id), after.name)
+
     @discord.slash_command(description="Change your branch to the current guild.")   
     async def change_branch(self, ctx):
         """
@@ -56,17 +73,17 @@ class HelperCog(commands.Cog):
         new_branch_name = ctx.guild.name
 
         # Check if the user has an account
-        account = get_account(user_id)
+        account = await get_account(user_id)
         if not account:
             await ctx.respond("You don't have an account! Use `/create_account` to open one.")
             return
 
         # Check if the user is already in this branch
-        if account['branch_name'] == new_branch_name:
+        if account.branch_id == new_branch_id:
             await ctx.respond(f"You are already in the **{new_branch_name}** branch.")
             return
 
-        embed = create_embed("Confirm Branch Change", f"Are you sure you want to change your branch from **{account['branch_name']}** to **{new_branch_name}**?", discord.Color.blue())
+        embed = create_embed("Confirm Branch Change", f"Are you sure you want to change your branch from **{account.branch_name}** to **{new_branch_name}**?", discord.Color.blue())
         view = ConfirmBranchChange(user_id, new_branch_id, new_branch_name)
         await ctx.respond(embed=embed, view=view)
 
@@ -0,0 +1,175 @@
+import discord
+from discord.ext import commands
+from datetime import datetime, timedelta
+from async_db import account_exists, get_transaction_page, get_transaction_summary  # Import MongoDB functions
+
+from resources.utils import create_embed
+
+PAGE_SIZE = 10
+
+TRANSACTION_TYPES = [
+    discord.OptionChoice(name="Sent UPI payments", value="send_upi_payment"),
+    discord.OptionChoice(name="Received UPI payments", value="received_upi_payment"),
+]
+
+
+SUMMARY_PERIODS = [
+    discord.OptionChoice(name="Last 7 days", value=7),
+    discord.OptionChoice(name="Last 30 days", value=30),
+]
+
+# Transaction types that bring money in, every other type is spending
+INCOME_TYPES = {"received_upi_payment"}
+
+
+def format_totals(totals):
+    """One line per transaction type, largest amount first."""
+    return "\n".join(
+        f"**{txn_type.replace('_', ' ').capitalize()}** ${entry['amount']:,.2f} ({entry['count']}×)"
+        for txn_type, entry in sorted(totals.items(), key=lambda item: item[1]["amount"], reverse=True)
+    ) or "Nothing"
+
+
+def parse_date(value):
+    """Parses a ``YYYY-MM-DD`` date, returning None if it is malformed."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+class HistoryView(discord.ui.View):
+    """
+    Newer/Older buttons over a keyset-paginated transaction history.
+
+    The view only remembers the ``(timestamp, _id)`` of the first and last
+    transaction on screen, each button fetches the adjacent page from there.
+    """
+    def __init__(self, user_id, filters):
+        super().__init__(timeout=300)
+        self.user_id = user_id
+        self.filters = filters
+        self.transactions = []
+        self.page = 0
+        self.has_newer = False
+        self.has_older = False
+
+    async def load(self, before=None, after=None):
+        """Fetches a page next to the given cursor and updates the buttons."""
+        transactions, has_more = await get_transaction_page(
+            self.user_id, PAGE_SIZE, before=before, after=after, **self.filters
+        )
+        if after:
+            self.has_newer, self.has_older = has_more, True
+        else:
+            self.has_newer, self.has_older = before is not None, has_more
+        self.transactions = transactions
+        self.newer_page.disabled = not self.has_newer
+        self.older_page.disabled = not self.has_older
+
+    def render(self):
+        """Returns the embed of the current page."""
+        if not self.transactions:
+            return create_embed("Transaction History", "No transactions found.", discord.Color.dark_grey())
+
+        lines = []
+        for txn in self.transactions:
+            counterparty = f" • <@{txn.receiver_id}>" if txn.receiver_id else ""
+            lines.append(
+                f"`{txn.timestamp:%Y-%m-%d %H:%M}` **{txn.type.replace('_', ' ').capitalize()}** "
+                f"${txn.amount:,.2f}{counterparty}"
+            )
+        embed = create_embed("Transaction History", "\n".join(lines), discord.Color.blue())
+        embed.set_footer(text=f"Page {self.page + 1}")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return str(interaction.user.id) == self.user_id
+
+    @discord.ui.button(label="Newer", style=discord.ButtonStyle.grey)
+    async def newer_page(self, button: discord.ui.Button, interaction: discord.Interaction):
+        first = self.transactions[0]
+        await self.load(after=(first.timestamp, first.id))
+        self.page = max(0, self.page - 1)
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(label="Older", style=discord.ButtonStyle.grey)
+    async def older_page(self, button: discord.ui.Button, interaction: discord.Interaction):
+        last = self.transactions[-1]
+        await self.load(before=(last.timestamp, last.id))
+        self.page += 1
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+
+class HistoryCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @discord.slash_command(description="Browse your full transaction history.")
+    async def history(
+        self,
+        ctx,
+        txn_type: discord.Option(str, "Only show this type of transaction", name="type", choices=TRANSACTION_TYPES, required=False, default=None),
+        start_date: discord.Option(str, "Only show transactions on or after this date (YYYY-MM-DD)", required=False, default=None),
+        end_date: discord.Option(str, "Only show transactions on or before this date (YYYY-MM-DD)", required=False, default=None)
+    ):
+        """
+        Shows the user's transactions, newest first, with buttons to page through them.
+
+        Parameters:
+            ctx (discord.ApplicationContext): The context of the interaction.
+            txn_type (str | None): Optional transaction type filter.
+            start_date (str | None): Optional first day of the date range.
+            end_date (str | None): Optional last day of the date range, inclusive.
+        """
+        user_id = str(ctx.author.id)
+
+        start = parse_date(start_date) if start_date else None
+        end = parse_date(end_date) if end_date else None
+        if (start_date and start is None) or (end_date and end is None):
+            await ctx.respond("Dates must be in the `YYYY-MM-DD` format.", ephemeral=True)
+            return
+        if end is not None:
+            # The end date is inclusive, the query bound is exclusive
+            end += timedelta(days=1)
+
+        if not await account_exists(user_id):
+            await ctx.respond("You don't have an account! Use `/create_account` to open one.")
+            return
+
+        view = HistoryView(user_id, {"txn_type": txn_type, "start": start, "end": end})
+        await view.load()
+        await ctx.respond(embed=view.render(), view=view, ephemeral=True)
+
+    @discord.slash_command(description="Compare your income and spending over the last week or month.")
+    async def summary(
+        self,
+        ctx,
+        days: discord.Option(int, "Period to summarize", choices=SUMMARY_PERIODS, required=False, default=7)
+    ):
+        """
+        Shows income and spending by transaction type, read from the daily rollups.
+
+        Parameters:
+            ctx (discord.ApplicationContext): The context of the interaction.
+            days (int): Number of days to summarize, today included.
+        """
+        user_id = str(ctx.author.id)
+        if not await account_exists(user_id):
+            await ctx.respond("You don't have an account! Use `/create_account` to open one.")
+            return
+
+        totals = await get_transaction_summary(user_id, days)
+        income = {txn_type: entry for txn_type, entry in totals.items() if txn_type in INCOME_TYPES}
+        spending = {txn_type: entry for txn_type, entry in totals.items() if txn_type not in INCOME_TYPES}
+        total_income = sum(entry["amount"] for entry in income.values())
+        total_spending = sum(entry["amount"] for entry in spending.values())
+
+        embed = create_embed(f"Summary of the last {days} days", "", discord.Color.blue())
+        embed.add_field(name=f"Income • ${total_income:,.2f}", value=format_totals(income), inline=False)
+        embed.add_field(name=f"Spending • ${total_spending:,.2f}", value=format_totals(spending), inline=False)
+        embed.add_field(name="Net", value=f"${total_income - total_spending:,.2f}", inline=False)
+        await ctx.respond(embed=embed, ephemeral=True)
+
+def setup(bot):
+    bot.add_cog(HistoryCog(bot))
@@ -0,0 +1,94 @@
+import logging
+import os
+from datetime import datetime, time, timezone
+
+import discord
+from discord.ext import commands, tasks
+
+from async_db import accrue_interest, get_interest_run, resume_interest_runs, set_branch_interest_rate
+
+logger = logging.getLogger('discord')
+
+# UTC hour of the daily interest run
+INTEREST_HOUR = int(os.getenv('INTEREST_HOUR', '0'))
+
+
+def current_period():
+    """Interest runs once per UTC day, the date identifies the run."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class InterestCog(commands.Cog):
+    """
+    Applies the daily interest run and resumes it after a restart.
+
+    Only the process serving shard 0 runs the job, the other processes of a
+    sharded deployment leave it alone.
+
+    Attributes:
+        bot (discord.Bot): The bot instance to which this cog is attached.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        if 0 in (bot.shard_ids or [0]):
+            self.daily_interest.start()
+
+    def cog_unload(self):
+        self.daily_interest.cancel()
+
+    @staticmethod
+    def log_run(run):
+        logger.info(
+            f"Interest run {run['period']}: {run['accounts']} accounts in {run['batches']} batches, "
+            f"${run['interest']:,.2f} at {run.get('accounts_per_second', 0):,.0f} accounts/s"
+        )
+
+    async def run_interest(self, period):
+        run = await accrue_interest(period)
+        if run is not None:
+            self.log_run(run)
+        return run
+
+    @tasks.loop(time=time(hour=INTEREST_HOUR, tzinfo=timezone.utc))
+    async def daily_interest(self):
+        await self.run_interest(current_period())
+
+    @daily_interest.before_loop
+    async def before_daily_interest(self):
+        await self.bot.wait_until_ready()
+        if self.bot.database_ready is not None:
+            await self.bot.database_ready
+        # Finish the runs a crash or restart interrupted, also those of earlier days
+        for run in await resume_interest_runs():
+            self.log_run(run)
+
+    @discord.slash_command(name="interest_rate", description="Set this server's interest rate per day (owner only)")
+    @commands.is_owner()
+    async def interest_rate(
+        self,
+        ctx,
+        rate: discord.Option(float, "Daily rate, e.g. 0.0001 for 0.01%, negative for a fee. Leave empty for the default.", required=False, default=None)
+    ):
+        await set_branch_interest_rate(str(ctx.guild.id), rate)
+        description = "the default rate" if rate is None else f"{rate:.4%} per day"
+        await ctx.respond(f"Accounts of this branch now earn {description}, starting with the next run.", ephemeral=True)
+
+    @discord.slash_command(name="interest_status", description="Show today's interest run (owner only)")
+    @commands.is_owner()
+    async def interest_status(self, ctx):
+        period = current_period()
+        run = await get_interest_run(period)
+        if run is None:
+            await ctx.respond(f"No interest run for {period} yet.", ephemeral=True)
+            return
+        embed = discord.Embed(title=f"💹 Interest run {period}", color=discord.Color.green())
+        embed.add_field(name="Status", value=run.get("status", "unknown"), inline=True)
+        embed.add_field(name="Accounts", value=f"{run.get('accounts', 0):,}", inline=True)
+        embed.add_field(name="Batches", value=f"{run.get('batches', 0):,}", inline=True)
+        embed.add_field(name="Interest paid", value=f"${run.get('interest', 0):,.2f}", inline=True)
+        if run.get("accounts_per_second") is not None:
+            embed.add_field(name="Throughput", value=f"{run['accounts_per_second']:,.0f} accounts/s", inline=True)
+        await ctx.respond(embed=embed, ephemeral=True)
+
+def setup(bot):
+    bot.add_cog(InterestCog(bot))
@@ -1,14 +1,90 @@
 import discord
 from discord.ext import commands
-from db import get_leaderboard  # Import MongoDB functions
+from async_db import get_leaderboard, leaderboards  # Import MongoDB functions
+from resources.leaderboards import GLOBAL
+
+PAGE_SIZE = 10
+
+
+def build_leaderboard_embed(title, entries, page, total, caller_rank):
+    """
+    Builds the embed for one page of a leaderboard.
+
+    Parameters:
+        title (str): The leaderboard title.
+        entries (list[dict]): The ranked accounts of the page.
+        page (int): Zero-based page number.
+        total (int): Number of ranked accounts.
+        caller_rank (int | None): Rank of the user who ran the command.
+
+    Returns:
+        discord.Embed: The leaderboard page.
+    """
+    embed = discord.Embed(
+        title=title,
+        description="Top users based on their balance:",
+        color=discord.Color.gold()
+    )
+
+    for entry in entries:
+        embed.add_field(
+            name=f"{entry['rank']}. {entry['username']}",
+            value=f"Balance: ${entry['balance']:,.2f}",
+            inline=False
+        )
+
+    pages = max(1, -(-total // PAGE_SIZE))
+    footer = f"Page {page + 1}/{pages}"
+    if caller_rank is not None:
+        footer += f" • Your rank: #{caller_rank} of {total}"
+    embed.set_footer(text=footer)
+    return embed
+
+
+class LeaderboardView(discord.ui.View):
+    """Previous/Next buttons that page through an in-memory leaderboard."""
+    def __init__(self, title, branch_id, user_id):
+        super().__init__(timeout=120)
+        self.title = title
+        self.branch_id = branch_id
+        self.user_id = user_id
+        self.page = 0
+        self.update_buttons()
+
+    def render(self):
+        """Returns the embed of the current page."""
+        entries = leaderboards.page(self.branch_id, self.page, PAGE_SIZE)
+        total = leaderboards.size(self.branch_id)
+        return build_leaderboard_embed(
+            self.title, entries, self.page, total, leaderboards.rank(self.user_id, self.branch_id)
+        )
+
+    def update_buttons(self):
+        last_page = max(0, (leaderboards.size(self.branch_id) - 1) // PAGE_SIZE)
+        self.page = min(self.page, last_page)
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= last_page
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.grey)
+    async def previous_page(self, button: discord.ui.Button, interaction: discord.Interaction):
+        self.page = max(0, self.page - 1)
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.grey)
+    async def next_page(self, button: discord.ui.Button, interaction: discord.Interaction):
+        self.page += 1
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
 
 class LeaderboardCog(commands.Cog):
     """
-    A cog responsible for managing user accounts and related functionalities.
+    A cog responsible for the balance leaderboards.
 
-    This cog handles various account-related features such as creating an account,
-    viewing account balance, and managing user data. Commands related to the 
-    creation, retrieval, and management of user accounts are included here.
+    Leaderboards are served from rankings kept in memory and updated on every
+    balance and branch change, so reading a page costs the same no matter how
+    many accounts a branch has.
 
     Attributes:
         bot (commands.Bot): The bot instance to which this cog is attached.
@@ -17,29 +93,41 @@ class LeaderboardCog(commands.Cog):
         self.bot = bot
 
     @discord.slash_command(description="View the leaderboard for your branch.")
-    async def leaderboard(self, ctx):
-        """Displays the top users based on their balance in the Your branch."""
-        branch_name = ctx.guild.name  # Get the guild name as the branch name
-        top_users = get_leaderboard(branch_name)
+    async def leaderboard(
+        self,
+        ctx,
+        scope: discord.Option(str, "Rank your branch or every account", choices=["branch", "global"], default="branch")
+    ):
+        """Displays the top users based on their balance in your branch or globally."""
+        user_id = str(ctx.author.id)
+        branch_id = GLOBAL if scope == "global" else str(ctx.guild.id)
+        title = "🏆 Global Leaderboard" if branch_id is GLOBAL else f"🏆 Leaderboard for {ctx.guild.name} Branch"
 
-        if not top_users:
-            await ctx.respond(f"No accounts found in the **'{branch_name}'** branch.")
+        if not leaderboards.loaded:
+            # Rankings are still loading, fall back to the database for the first page
+            if branch_id is GLOBAL:
+                await ctx.respond("The global leaderboard is still loading. Please try again shortly.")
+                return
+            top_users = await get_leaderboard(branch_id, PAGE_SIZE)
+            entries = [
+                {"rank": rank, "username": user.username, "balance": user.balance or 0}
+                for rank, user in enumerate(top_users, start=1)
+            ]
+            if not entries:
+                await ctx.respond(f"No accounts found in the **'{ctx.guild.name}'** branch.")
+                return
+            await ctx.respond(embed=build_leaderboard_embed(title, entries, 0, len(entries), None))
             return
 
-        embed = discord.Embed(
-            title=f"🏆 Leaderboard for {branch_name} Branch",
-            description="Top users based on their balance:",
-            color=discord.Color.gold()
-        )
-
-        for idx, user in enumerate(top_users, start=1):
-            embed.add_field(
-                name=f"{idx}. {user['username']}",
-                value=f"Balance: ${user.get('balance', 0):,.2f}",
-                inline=False
-            )
+        if leaderboards.size(branch_id) == 0:
+            if branch_id is GLOBAL:
+                await ctx.respond("No accounts have been created yet.")
+            else:
+                await ctx.respond(f"No accounts found in the **'{ctx.guild.name}'** branch.")
+            return
 
-        await ctx.respond(embed=embed)
+        view = LeaderboardView(title, branch_id, user_id)
+        await ctx.respond(embed=view.render(), view=view)
 
 def setup(bot):
     bot.add_cog(LeaderboardCog(bot))
@@ -0,0 +1,100 @@
+import logging
+import os
+
+import discord
+from discord.ext import commands, tasks
+
+from async_db import load_command_settings, load_leaderboards
+from resources.telemetry import ShardTelemetry, shard_for_guild
+
+logger = logging.getLogger('discord')
+
+# Seconds between reloads of the state other processes may have changed, when sharded over processes
+SHARED_STATE_REFRESH_INTERVAL = float(os.getenv('SHARED_STATE_REFRESH_INTERVAL', '60'))
+
+
+class ShardsCog(commands.Cog):
+    """
+    Collects per-shard telemetry and reports it with ``/shards``.
+
+    When this process only runs some of the shards (``SHARD_IDS``), it also
+    reloads the leaderboards and command settings periodically, since the
+    other processes write to the same database without telling this one.
+
+    Attributes:
+        bot (discord.AutoShardedBot): The bot instance to which this cog is attached.
+        telemetry (ShardTelemetry): Event rates and connection counts per shard.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.telemetry = ShardTelemetry()
+        if bot.shard_ids is not None:
+            self.refresh_shared_state.start()
+
+    def cog_unload(self):
+        self.refresh_shared_state.cancel()
+
+    @tasks.loop(seconds=SHARED_STATE_REFRESH_INTERVAL)
+    async def refresh_shared_state(self):
+        """Picks up balance, branch and command changes made by the other processes."""
+        try:
+            await load_leaderboards()
+            await load_command_settings()
+        except Exception as e:
+            logger.error(f"Failed to refresh shared state: {e}")
+
+    @refresh_shared_state.before_loop
+    async def before_refresh_shared_state(self):
+        await self.bot.wait_until_ready()
+        if self.bot.database_ready is not None:
+            await self.bot.database_ready
+
+    def shard_of(self, guild_id):
+        """Returns the shard handling a guild, DMs are handled by shard 0."""
+        return shard_for_guild(guild_id, self.bot.shard_count) if guild_id else 0
+
+    @commands.Cog.listener()
+    async def on_shard_connect(self, shard_id):
+        self.telemetry.record_connection(shard_id, "connect")
+
+    @commands.Cog.listener()
+    async def on_shard_disconnect(self, shard_id):
+        self.telemetry.record_connection(shard_id, "disconnect")
+
+    @commands.Cog.listener()
+    async def on_shard_resumed(self, shard_id):
+        self.telemetry.record_connection(shard_id, "resume")
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        self.telemetry.record_event(self.shard_of(message.guild.id if message.guild else None), "message")
+
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction):
+        self.telemetry.record_event(self.shard_of(interaction.guild_id), "interaction")
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.telemetry.record_event(guild.shard_id, "guild_join")
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.telemetry.record_event(guild.shard_id, "guild_remove")
+
+    @discord.slash_command(name="shards", description="Show latency and event rates of each shard")
+    async def shards(self, ctx):
+        embed = discord.Embed(title="🛰️ Shard Status", color=discord.Color.blurple())
+        for shard in self.telemetry.snapshot(self.bot.latencies):
+            connections = shard["connections"]
+            embed.add_field(
+                name=f"Shard {shard['shard_id']}",
+                value=f"Latency: {round(shard['latency'] * 1000, 2)}ms\n"
+                      f"Events: {shard['event_rate']:.2f}/s\n"
+                      f"Reconnects: {connections['disconnect']} (resumed {connections['resume']})",
+                inline=True
+            )
+        embed.set_footer(text=f"{len(self.bot.shards)} of {self.bot.shard_count} shards in this process")
+        await ctx.respond(embed=embed, ephemeral=True)
+
+def setup(bot):
+    bot.add_cog(ShardsCog(bot))
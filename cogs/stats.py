@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+import time
+
+import discord
+from aiohttp import web
+from discord.ext import commands, tasks
+
+from async_db import account_cache, ledger_writer, upi_directory
+from resources.avatars import avatar_service
+from resources.metrics import registry
+
+logger = logging.getLogger('discord')
+
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+# Set to 0 to disable the Prometheus endpoint. With SHARD_IDS each process adds its first shard ID
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+# The lag probe sleeps this long and records how late it wakes up
+LOOP_LAG_INTERVAL = 1.0
+# Interactions can't be answered after 15 minutes, a command still pending by then never reports back
+COMMAND_TIMEOUT = 15 * 60
+
+
+def format_percentiles(histogram):
+    """Formats a histogram's count and p50/p95/p99 in milliseconds."""
+    p = histogram.percentiles()
+    return f"{histogram.count}× • {p['p50'] * 1000:.1f} / {p['p95'] * 1000:.1f} / {p['p99'] * 1000:.1f} ms"
+
+
+class StatsCog(commands.Cog):
+    """
+    Collects command latencies and event loop lag, and exports every metric.
+
+    Metrics are served in the Prometheus text format on ``METRICS_HOST:METRICS_PORT``
+    and summarized for the bot owner by ``/stats``. When the shards are split
+    over processes (``SHARD_IDS``), each process listens on ``METRICS_PORT``
+    plus its lowest shard ID, e.g. 9108 and 9112 for processes starting at
+    shards 0 and 4. A port that is already taken is logged and retried on the
+    next ``on_ready``.
+
+    Attributes:
+        bot (discord.Bot): The bot instance to which this cog is attached.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self._command_started = {}
+        self._runner = None
+        self.loop_lag = registry.histogram("event_loop_lag_seconds", "How late a timer fires on the event loop")
+        self.register_gauges()
+        self.probe_loop_lag.start()
+
+    def cog_unload(self):
+        self.probe_loop_lag.cancel()
+        if self._runner is not None:
+            self.bot.loop.create_task(self._runner.cleanup())
+
+    def register_gauges(self):
+        """Registers the caches and queues whose sizes are read on every scrape."""
+        for name, cache in (("accounts", account_cache), ("upi_directory", upi_directory), ("avatars", avatar_service.cache)):
+            registry.gauge("cache_entries", "Entries held by a cache", lambda cache=cache: len(cache), cache=name)
+            registry.gauge("cache_hit_ratio", "Fraction of lookups answered from a cache", lambda cache=cache: cache.hit_rate, cache=name)
+        registry.gauge("cache_entries", "Entries held by a cache", lambda: len(self.anime_client.cache) if self.anime_client else 0, cache="anime")
+        registry.gauge("cache_hit_ratio", "Fraction of lookups answered from a cache", lambda: self.anime_client.hit_rate if self.anime_client else 0.0, cache="anime")
+        registry.gauge("ledger_queue_depth", "Ledger records waiting to be written", lambda: ledger_writer.depth)
+        registry.gauge("ledger_dropped_records", "Ledger records lost after every retry failed", lambda: ledger_writer.dropped)
+        registry.gauge("ledger_last_flush_seconds", "Duration of the last ledger batch write", lambda: ledger_writer.last_flush_latency)
+        registry.gauge("kyc_sessions", "KYC verifications in progress", lambda: len(self.bot.get_cog("Account").kyc_sessions))
+        registry.gauge("matchmaking_waiting", "Users waiting for a random chat partner", lambda: len(self.bot.get_cog("GeneralCog").matchmaking))
+        registry.gauge("guilds", "Guilds served by this process", lambda: len(self.bot.guilds))
+
+    @property
+    def anime_client(self):
+        """The anime API client, None when the anime cog is not loaded or not configured."""
+        cog = self.bot.get_cog("Anime")
+        return cog.client if cog is not None else None
+
+    @property
+    def metrics_port(self):
+        """The exporter port of this process, 0 when disabled."""
+        if METRICS_PORT and self.bot.shard_ids:
+            return METRICS_PORT + min(self.bot.shard_ids)
+        return METRICS_PORT
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if self.metrics_port and self._runner is None:
+            await self.start_exporter()
+
+    async def start_exporter(self):
+        """Serves ``/metrics`` in the Prometheus text format."""
+        app = web.Application()
+        app.router.add_get("/metrics", self.metrics_endpoint)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, METRICS_HOST, self.metrics_port).start()
+        except OSError as e:
+            logger.error(f"Metrics exporter could not listen on {METRICS_HOST}:{self.metrics_port}: {e}")
+            await runner.cleanup()
+            return
+        self._runner = runner
+
+    async def metrics_endpoint(self, request):
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    @tasks.loop()
+    async def probe_loop_lag(self):
+        """Sleeps a fixed interval and records how much later than due the event loop woke it up."""
+        started = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        self.loop_lag.observe(max(0.0, time.perf_counter() - started - LOOP_LAG_INTERVAL))
+
+    @commands.Cog.listener()
+    async def on_application_command(self, ctx):
+        now = time.perf_counter()
+        self._command_started[ctx.interaction.id] = now
+        # Commands whose completion or error was never dispatched must not pile up,
+        # insertion order is start order so the first entry is the oldest
+        if now - next(iter(self._command_started.values())) > COMMAND_TIMEOUT:
+            self._command_started = {
+                interaction_id: started for interaction_id, started in self._command_started.items()
+                if now - started <= COMMAND_TIMEOUT
+            }
+
+    @commands.Cog.listener()
+    async def on_application_command_completion(self, ctx):
+        self.observe_command(ctx, "ok")
+
+    @commands.Cog.listener()
+    async def on_application_command_error(self, ctx, error):
+        self.observe_command(ctx, "error")
+
+    def observe_command(self, ctx, outcome):
+        # Popped before anything else, so failed commands leave no entry behind
+        started = self._command_started.pop(ctx.interaction.id, None)
+        if started is None or ctx.command is None:
+            return
+        registry.histogram(
+            "command_seconds", "Slash command handling time", command=ctx.command.qualified_name, outcome=outcome
+        ).observe(time.perf_counter() - started)
+
+    @staticmethod
+    def slowest(name, *labels, limit=8):
+        """Returns one summary line for each series of a histogram, highest p95 first."""
+        series = [(dict(series_labels), histogram) for series_labels, histogram in registry.histograms(name).items()]
+        series.sort(key=lambda item: item[1].quantile(0.95), reverse=True)
+        return [
+            f"`{' '.join(series_labels.get(label, '?') for label in labels)}` {format_percentiles(histogram)}"
+            for series_labels, histogram in series[:limit]
+        ]
+
+    @discord.slash_command(name="stats", description="Show latency and resource metrics (owner only)")
+    @commands.is_owner()
+    async def stats(self, ctx):
+        embed = discord.Embed(title="📈 Bot Metrics", description="count • p50 / p95 / p99", color=discord.Color.dark_teal())
+        embed.add_field(name="Slowest commands", value="\n".join(self.slowest("command_seconds", "command")) or "No data yet", inline=False)
+        embed.add_field(name="Slowest db.py calls", value="\n".join(self.slowest("db_call_seconds", "function")) or "No data yet", inline=False)
+        embed.add_field(name="Slowest MongoDB commands", value="\n".join(self.slowest("mongo_command_seconds", "function", "command")) or "No data yet", inline=False)
+        embed.add_field(name="Event loop lag", value=format_percentiles(self.loop_lag), inline=False)
+
+        gauges = registry.read_gauges()
+        embed.add_field(name="Gauges", value="\n".join(
+            f"`{name}{''.join(f' {value}' for _, value in labels)}` {reading:g}"
+            for (name, labels), reading in sorted(gauges.items())
+        )[:1024] or "No data yet", inline=False)
+        await ctx.respond(embed=embed, ephemeral=True)
+
+def setup(bot):
+    bot.add_cog(StatsCog(bot))
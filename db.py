@@ -1,76 +1,416 @@
-from pymongo import MongoClient
 import os
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import string
 import random
+import threading
+import time
 
+from resources.cache import LRUCache
+from resources.leaderboards import Leaderboards
+from resources.startup import STARTUP_MODE, startup_report
+from storage.base import DuplicateKey
+
+# mongo (default, needs a replica set for transactions), memory or sqlite, see the storage package
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo')
 MONGO_URI = os.getenv('MONGO_URI')
+MONGO_DATABASE = os.getenv('MONGO_DATABASE', 'banking_bot')
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'quantumbank.sqlite3')
+ACCOUNT_CACHE_SIZE = int(os.getenv('ACCOUNT_CACHE_SIZE', '10000'))
+# Processes of a multi-process deployment (SHARD_IDS) don't see each other's writes
+# to their in-memory state, cached accounts are only refreshed when they expire
+ACCOUNT_CACHE_TTL = float(os.getenv('ACCOUNT_CACHE_TTL', '30' if os.getenv('SHARD_IDS') else '300'))
+UPI_CACHE_SIZE = int(os.getenv('UPI_CACHE_SIZE', '50000'))
+UPI_ID_MAX_ATTEMPTS = 5
+# Rate applied once per daily run to every branch without its own rate, negative for a fee
+INTEREST_RATE = float(os.getenv('INTEREST_RATE', '0'))
+INTEREST_BATCH_SIZE = int(os.getenv('INTEREST_BATCH_SIZE', '1000'))
 
-client = MongoClient(MONGO_URI)
-db = client.get_database('banking_bot')
+_storage = None
+_storage_lock = threading.Lock()
 
-def create_account(user_id, guild_id, username,guild_name):
-    """Create a new account in the database"""
-    accounts_collection = db["accounts"]    
-    existing_account = accounts_collection.find_one({"user_id": user_id})
 
-    if existing_account:
-        return False # Account already exists
+def create_storage(backend=STORAGE_BACKEND):
+    """
+    Opens a storage backend by name.
+
+    Backends are imported on demand, so e.g. pymongo is only needed for ``mongo``.
+
+    Parameters:
+        backend (str): ``mongo``, ``memory`` or ``sqlite``.
+
+    Returns:
+        storage.base.StorageBackend: The opened backend.
+    """
+    if backend == 'mongo':
+        from storage.mongo import MongoStorage
+        return MongoStorage(MONGO_URI, MONGO_DATABASE)
+    if backend == 'memory':
+        from storage.memory import MemoryStorage
+        return MemoryStorage()
+    if backend == 'sqlite':
+        from storage.sqlite import SQLiteStorage
+        return SQLiteStorage(SQLITE_PATH)
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {backend!r}, expected mongo, memory or sqlite")
+
+
+def get_storage():
+    """Returns the configured storage backend, opening it on first use."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                with startup_report.phase(f"{STORAGE_BACKEND}_storage"):
+                    _storage = create_storage()
+    return _storage
+
+
+def use_storage(backend):
+    """
+    Replaces the storage backend, e.g. with a memory backend in tests.
+
+    Every cache and the leaderboards are reset, they described the old backend.
+    """
+    global _storage, _command_settings, _command_settings_loaded
+    with _storage_lock:
+        _storage = backend
+    account_cache.clear()
+    upi_directory.clear()
+    leaderboards.load([])
+    _command_settings = {}
+    _command_settings_loaded = False
+
+
+def close():
+    """Closes the storage backend if it was opened, the next query opens it again."""
+    global _storage
+    with _storage_lock:
+        storage, _storage = _storage, None
+    if storage is not None:
+        storage.close()
+
+
+def get_client():
+    """Returns the MongoClient of the mongo backend."""
+    return _mongo_storage().client
+
+
+def get_database():
+    """Returns the MongoDB database of the mongo backend."""
+    return _mongo_storage().db
+
+
+def _mongo_storage():
+    storage = get_storage()
+    if storage.name != 'mongo':
+        raise RuntimeError(f"MongoDB is not used with STORAGE_BACKEND={storage.name}")
+    return storage
+
+
+class _Deferred:
+    """Forwards attribute and item access to the object returned by ``factory``."""
+    __slots__ = ("_factory",)
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+    def __getitem__(self, name):
+        return self._factory()[name]
+
+
+# Importing db does not connect, the backend is opened by the first query.
+# client and db expose the MongoDB objects for tooling such as schema.py.
+client = _Deferred(get_client)
+db = _Deferred(get_database)
+
+if STARTUP_MODE == 'eager':
+    get_storage()
+
+# In-memory rankings kept in step with every balance and branch change below
+leaderboards = Leaderboards()
+
+class Account:
+    """
+    Compact, typed view of an account document.
+
+    Only the fields requested through a projection are decoded, the others
+    are None.
+    """
+    __slots__ = ("user_id", "username", "branch_id", "branch_name", "balance", "upi_id", "created_at")
+
+    def __init__(self, user_id=None, username=None, branch_id=None, branch_name=None, balance=None,
+                 upi_id=None, created_at=None):
+        self.user_id = user_id
+        self.username = username
+        self.branch_id = branch_id
+        self.branch_name = branch_name
+        self.balance = balance
+        self.upi_id = upi_id
+        self.created_at = created_at
+
+    @classmethod
+    def from_document(cls, document):
+        """Builds an account from a (possibly projected) account document."""
+        return cls(**{field: document.get(field) for field in cls.__slots__})
+
+    def replace(self, **changes):
+        """Returns a copy of the account with the given fields changed."""
+        return Account(**{field: changes.get(field, getattr(self, field)) for field in self.__slots__})
+
+    def __repr__(self):
+        return f"<Account user_id={self.user_id!r} branch_id={self.branch_id!r} balance={self.balance!r}>"
+
+class Transaction:
+    """Compact, typed view of a ledger entry."""
+    __slots__ = ("id", "user_id", "type", "amount", "receiver_id", "timestamp")
+
+    def __init__(self, id=None, user_id=None, type=None, amount=None, receiver_id=None, timestamp=None):
+        self.id = id
+        self.user_id = user_id
+        self.type = type
+        self.amount = amount
+        self.receiver_id = receiver_id
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_document(cls, document):
+        """Builds a transaction from a ledger document."""
+        return cls(
+            document.get("_id"), document.get("user_id"), document.get("type"),
+            document.get("amount"), document.get("receiver_id"), document.get("timestamp")
+        )
 
-    accounts_collection.insert_one({
+    def __repr__(self):
+        return f"<Transaction type={self.type!r} amount={self.amount!r} timestamp={self.timestamp!r}>"
+
+# Named projections for get_account: each command fetches only the fields it reads
+ACCOUNT_PROJECTIONS = {
+    "exists": ("user_id",),
+    "balance_only": ("user_id", "balance"),
+    "profile": Account.__slots__,
+}
+
+# user_id -> Account with every profile field. Filled by profile reads and
+# kept coherent by every write below; cached accounts are shared, never mutate them.
+account_cache = LRUCache(ACCOUNT_CACHE_SIZE, ttl=ACCOUNT_CACHE_TTL)
+
+def _update_cached_account(user_id, **changes):
+    """Writes changed fields through to a cached account, if it is cached."""
+    account_cache.update(user_id, lambda account: account.replace(**changes))
+
+def create_account(user_id, guild_id, username,guild_name):
+    """Create a new account in the database"""
+    account = {
         "user_id": user_id,
         "username": username,
         "branch_id": guild_id,
         "branch_name": guild_name,
         "balance": 0,
         "created_at": datetime.now()
-    })
+    }
+    if not get_storage().insert_account(account):
+        return False # Account already exists
+    account_cache.set(user_id, Account.from_document(account))
+    leaderboards.upsert(user_id, balance=0, branch_id=guild_id, username=username)
     return True
 
-def get_account(user_id):
-    """Fetches the account of the user ID."""
-    accounts_collection = db["accounts"]
-    return accounts_collection.find_one({"user_id": user_id})
+def get_account(user_id, projection="profile"):
+    """
+    Fetches the account of the user ID.
+
+    Parameters:
+        user_id (str): The user whose account is fetched.
+        projection (str): One of :data:`ACCOUNT_PROJECTIONS`, selecting which fields are
+            transferred and decoded.
+
+    Returns:
+        Account | None: The account, or None if the user has no account.
+    """
+    # A cached account carries every profile field, so it answers any projection
+    account = account_cache.get(user_id)
+    if account is not None:
+        return account
+
+    if projection != "profile":
+        document = get_storage().find_account(user_id, ACCOUNT_PROJECTIONS[projection])
+        return Account.from_document(document) if document else None
+
+    # A write landing while the account is read cancels the reservation, the
+    # snapshot read before it is then returned but not cached
+    token = account_cache.reserve(user_id)
+    try:
+        document = get_storage().find_account(user_id, ACCOUNT_PROJECTIONS[projection])
+        if not document:
+            return None
+        account = Account.from_document(document)
+        account_cache.fill(user_id, account, token)
+        return account
+    finally:
+        account_cache.release(user_id, token)
+
+def account_exists(user_id):
+    """Returns True if the user has an account."""
+    return get_account(user_id, "exists") is not None
 
 def update_balance(user_id, new_balance):
     """Updates the balance of the user ID."""
-    accounts_collection = db["accounts"]
-    accounts_collection.update_one({"user_id": user_id}, {"$set": {"balance": new_balance}})
+    get_storage().set_balance(user_id, new_balance)
+    _update_cached_account(user_id, balance=new_balance)
+    leaderboards.upsert(user_id, balance=new_balance)
 
 
-def log_failed_kyc_attempt(user_id, provided_user_id, guild_id, provided_guild_id, reason):
-    """Logs failed KYC attempts in database"""
-    failed_kyc_collection = db["failed_kyc_attempts"]
-    failed_kyc_collection.insert_one({
+def failed_kyc_document(user_id, provided_user_id, guild_id, provided_guild_id, reason):
+    """Builds the document recorded for a failed KYC attempt."""
+    return {
         "User_Id": user_id,
         "Provided_User_Id": provided_user_id,
         "Branch_Id": guild_id,
         "Provided_Branch_Id": provided_guild_id,
         "reason": reason,
         "timestamp": datetime.now()
+    }
+
+def log_failed_kyc_attempt(user_id, provided_user_id, guild_id, provided_guild_id, reason):
+    """Logs failed KYC attempts in database"""
+    insert_documents({
+        "failed_kyc_attempts": [failed_kyc_document(user_id, provided_user_id, guild_id, provided_guild_id, reason)]
     })
 
-def log_transaction(user_id, txn_type, amount, receiver_id=None):
-    """Logs a transaction in the database."""
-    transactions_collection = db["transactions"]
-    transaction = {
+def transaction_document(user_id, txn_type, amount, receiver_id=None):
+    """Builds the ledger document recorded for a transaction."""
+    return {
         "user_id": user_id,
         "type": txn_type,
         "amount": amount,
         "receiver_id": receiver_id,
         "timestamp": datetime.utcnow()
     }
-    transactions_collection.insert_one(transaction)
+
+def log_transaction(user_id, txn_type, amount, receiver_id=None):
+    """Logs a transaction in the database."""
+    insert_documents({"transactions": [transaction_document(user_id, txn_type, amount, receiver_id)]})
+
+def insert_documents(batch):
+    """
+    Bulk inserts append-only records.
+
+    Documents keep the ``_id`` they were given on the first attempt and are
+    skipped if already stored, which makes retrying a partially applied batch safe.
+
+    Parameters:
+        batch (dict[str, list[dict]]): Collection name -> documents to insert.
+    """
+    get_storage().insert_documents(batch)
+
+def transfer(sender_id, receiver_id, amount, sender_txn_type='send_upi_payment', receiver_txn_type='received_upi_payment'):
+    """
+    Atomically moves money from one account to another.
+
+    The debit only applies while the sender's balance covers the amount, so
+    concurrent payments can never overdraw an account or lose an update. The
+    credit and both ledger entries are applied atomically with it, so either
+    everything is applied or nothing is.
+
+    Parameters:
+        sender_id (str): The user ID of the account being debited.
+        receiver_id (str): The user ID of the account being credited.
+        amount (float): The amount to move, must be positive.
+        sender_txn_type (str): The ledger type recorded for the sender.
+        receiver_txn_type (str): The ledger type recorded for the receiver.
+
+    Returns:
+        tuple[float, float] | None: The new sender and receiver balances, or
+        None if the sender has insufficient funds or the receiver does not exist.
+    """
+    balances = get_storage().transfer(
+        sender_id, receiver_id, amount,
+        transaction_document(sender_id, sender_txn_type, amount, receiver_id),
+        transaction_document(receiver_id, receiver_txn_type, amount, sender_id)
+    )
+    if balances is None:
+        return None
+    new_sender_balance, new_receiver_balance = balances
+
+    _update_cached_account(sender_id, balance=new_sender_balance)
+    _update_cached_account(receiver_id, balance=new_receiver_balance)
+    leaderboards.upsert(sender_id, balance=new_sender_balance)
+    leaderboards.upsert(receiver_id, balance=new_receiver_balance)
+    return new_sender_balance, new_receiver_balance
 
 def get_transactions(user_id):
     """
     Fetches the last transactions for a user.
     Returns a list of transactions.
     """
-    transactions_collection = db["transactions"]
-    return list(transactions_collection.find({"user_id": user_id}).sort("timestamp", -1).limit(10))
+    return [Transaction.from_document(document) for document in get_storage().recent_transactions(user_id, 10)]
+
+def get_transaction_page(user_id, limit=10, before=None, after=None, txn_type=None, start=None, end=None):
+    """
+    Fetches one page of a user's transactions, newest first, using keyset pagination.
+
+    Pages are addressed by the ``(timestamp, _id)`` of the first or last
+    transaction already shown rather than by an offset, so fetching a page costs
+    one index seek however deep the user has scrolled.
+
+    Parameters:
+        user_id (str): The user whose history is listed.
+        limit (int): Transactions per page.
+        before (tuple[datetime, Any] | None): ``(timestamp, _id)`` cursor, return transactions older than it.
+        after (tuple[datetime, Any] | None): ``(timestamp, _id)`` cursor, return transactions newer than it.
+        txn_type (str | None): Only include transactions of this type.
+        start (datetime | None): Only include transactions at or after this time.
+        end (datetime | None): Only include transactions before this time.
+
+    Returns:
+        tuple[list[Transaction], bool]: The page, newest first, and whether more transactions
+        exist beyond it in the direction that was paged.
+    """
+    documents, has_more = get_storage().transaction_page(
+        user_id, limit, before=before, after=after, txn_type=txn_type, start=start, end=end
+    )
+    return [Transaction.from_document(document) for document in documents], has_more
+
+def get_transaction_summary(user_id, days=7):
+    """
+    Totals a user's transactions by type over the last days, from the daily rollups.
+
+    Reads at most one rollup per day instead of the transactions themselves.
+
+    Parameters:
+        user_id (str): The user.
+        days (int): Number of days, today included.
+
+    Returns:
+        dict[str, dict]: Transaction type -> ``{"count": int, "amount": float}``.
+    """
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    summary = {}
+    for rollup in get_storage().daily_rollups(user_id, today - timedelta(days=days - 1)):
+        for txn_type, totals in rollup["types"].items():
+            entry = summary.setdefault(txn_type, {"count": 0, "amount": 0})
+            entry["count"] += totals["count"]
+            entry["amount"] += totals["amount"]
+    return summary
+
+def rebuild_daily_rollups(start=None):
+    """
+    Recomputes the daily transaction rollups from the ledger, e.g. for history
+    written before rollups existed.
+
+    Transactions logged while a day is being rebuilt may be missed by it, run
+    this while the bot is stopped or only for days that are over.
+
+    Parameters:
+        start (datetime | None): First day to rebuild, None for the whole history.
+
+    Returns:
+        int: The number of user-days written.
+    """
+    return get_storage().rebuild_daily_rollups(start)
 
 def generate_upi_id(user_id):
     """Generates a unique UPI ID for the user."""
@@ -78,18 +418,92 @@ def generate_upi_id(user_id):
     random_suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=4))
     return f"{user_id}@{bank_name}.{random_suffix}"
 
+# upi_id -> user_id. UPI IDs never change once assigned, so entries only leave by eviction.
+upi_directory = LRUCache(UPI_CACHE_SIZE)
+
 def set_upi_id(user_id):
-    """Sets the UPI ID for the user in the database."""
-    upi_id = generate_upi_id(user_id)
-    accounts_collection = db["accounts"]
+    """
+    Assigns a UPI ID to the user, retrying with a new suffix on the rare collision.
+
+    The ID is only written if the account has none yet, so two concurrent
+    requests cannot overwrite each other.
+
+    Returns:
+        str | None: The user's UPI ID (the existing one if it was already set),
+        or None if the user has no account.
+    """
+    storage = get_storage()
+
+    for _ in range(UPI_ID_MAX_ATTEMPTS):
+        upi_id = generate_upi_id(user_id)
+        try:
+            assigned = storage.assign_upi_id(user_id, upi_id)
+        except DuplicateKey:
+            continue
+        if not assigned:
+            existing = storage.find_account(user_id, ("upi_id",))
+            return existing.get("upi_id") if existing else None
+        _update_cached_account(user_id, upi_id=upi_id)
+        upi_directory.set(upi_id, user_id)
+        return upi_id
+    raise RuntimeError(f"Could not generate a unique UPI ID for {user_id} after {UPI_ID_MAX_ATTEMPTS} attempts")
 
-    accounts_collection.update_one({"user_id": user_id}, {"$set": {"upi_id": upi_id}})
+def resolve_upi_id(upi_id):
+    """
+    Resolves a full UPI ID to the user ID owning it.
 
-    return upi_id
+    Returns:
+        str | None: The owner's user ID, or None if no account has this UPI ID.
+    """
+    user_id = upi_directory.get(upi_id)
+    if user_id is not None:
+        return user_id
+    user_id = get_storage().find_upi_owner(upi_id)
+    if user_id is None:
+        return None
+    upi_directory.set(upi_id, user_id)
+    return user_id
 
-def get_leaderboard(branch_name):
+def backfill_upi_ids(batch_size=1000):
+    """
+    Assigns UPI IDs to every account that has none, in bulk writes.
+
+    Accounts whose generated ID collided are retried with a new suffix in the
+    next round.
+
+    Returns:
+        int: The number of accounts that received a UPI ID.
+    """
+    storage = get_storage()
+    assigned = 0
+    for _ in range(UPI_ID_MAX_ATTEMPTS):
+        pending = storage.accounts_without_upi_id()
+        if not pending:
+            break
+        for start in range(0, len(pending), batch_size):
+            # Collided accounts still have no UPI ID and are picked up by the next round
+            assigned += storage.assign_upi_ids(
+                [(user_id, generate_upi_id(user_id)) for user_id in pending[start:start + batch_size]]
+            )
+    # Assigned IDs bypassed the write-through paths
+    account_cache.clear()
+    return assigned
+
+def get_leaderboard(branch_id, limit=10):
     """Fetches the leaderboard based on balances for a specific branch."""
-    return list(db.accounts.find({"branch_name": branch_name}).sort("balance", -1).limit(10))
+    return [Account.from_document(document) for document in get_storage().top_accounts(branch_id, limit)]
+
+def load_leaderboards():
+    """
+    Fills the in-memory leaderboards from every account with one projected scan.
+
+    Returns:
+        int: The number of ranked accounts.
+    """
+    # Changes written while the scan runs are replayed over it
+    with leaderboards.loading():
+        leaderboards.load(get_storage().iter_accounts(("user_id", "username", "branch_id", "balance")))
+    return leaderboards.size()
 
 def update_user_branch(user_id, branch_id, branch_name):
     """
@@ -106,28 +520,171 @@ def update_user_branch(user_id, branch_id, branch_name):
         branch_name (str): The name of the new branch to be assigned to the user.
 
     Returns:
-        pymongo.results.UpdateResult: The result of the update operation,
-        which provides details about the update, such as the number of modified documents.
+        bool: True if the account was moved to another branch.
     """
-    result = db.accounts.update_one(
-        {"user_id": user_id},
-        {"$set": {"branch_id": branch_id, "branch_name": branch_name}}
-    )
-    return result.modified_count > 0
+    modified = get_storage().set_account_branch(user_id, branch_id, branch_name)
+    if modified:
+        _update_cached_account(user_id, branch_id=branch_id, branch_name=branch_name)
+        leaderboards.upsert(user_id, branch_id=branch_id)
+    return modified
+
+def get_branch(branch_id):
+    """Fetches the branch record of a guild, or None if it was never recorded."""
+    return get_storage().find_branch(branch_id)
+
+def rename_branch(branch_id, name):
+    """
+    Records a guild's new name and propagates it to every account of the branch.
+
+    Accounts are matched by ``branch_id``, so the rename is one bulk update
+    however many accounts the branch has.
+
+    Returns:
+        int: The number of accounts whose branch name changed.
+    """
+    renamed = get_storage().rename_branch(branch_id, name)
+    if renamed:
+        # Renames are rare, dropping cached accounts is cheaper than tracking them by branch
+        account_cache.clear()
+    return renamed
+
+def sync_branches(guilds):
+    """
+    Records every guild the bot is in as a branch and propagates renames missed while offline.
+
+    Parameters:
+        guilds (Iterable[tuple[str, str]]): ``(branch_id, name)`` of each guild.
+
+    Returns:
+        int: The number of branches whose name changed.
+    """
+    known = get_storage().branch_names()
+    renamed = 0
+    for branch_id, name in guilds:
+        if known.get(branch_id) != name:
+            rename_branch(branch_id, name)
+            renamed += 1
+    return renamed
+
+def set_branch_interest_rate(branch_id, rate):
+    """Sets a branch's interest rate per run, or None to use ``INTEREST_RATE``."""
+    get_storage().set_branch_interest_rate(branch_id, rate)
+
+def get_interest_run(period):
+    """Returns the checkpoint of a period's interest run, or None if it never started."""
+    return get_storage().interest_run(period)
+
+def resume_interest_runs():
+    """
+    Finishes every interest run a crash or restart interrupted, oldest period first.
+
+    Returns:
+        list[dict]: The checkpoints of the finished runs.
+    """
+    return [accrue_interest(period) for period in get_storage().unfinished_interest_runs()]
+
+def accrue_interest(period, batch_size=INTEREST_BATCH_SIZE, default_rate=INTEREST_RATE):
+    """
+    Applies one period's interest to every account, batch by batch.
+
+    Each batch is a single server-side update over a range of storage keys,
+    committed together with one summary record in the ``interest_ledger`` and
+    the run's checkpoint. Calling this again for an unfinished period resumes
+    after the last committed batch with the rates the run started with, and a
+    completed period is never applied twice.
+
+    Parameters:
+        period (str): Identifies the run, e.g. the UTC date.
+        batch_size (int): Accounts per batch.
+        default_rate (float): Rate of branches without their own rate.
+
+    Returns:
+        dict | None: The run's checkpoint with ``accounts``, ``interest``, ``batches``
+        and ``accounts_per_second``, or None if no rate is configured.
+    """
+    storage = get_storage()
+    run = storage.interest_run(period)
+    if run is not None and run.get("status") == "completed":
+        return run
+
+    if run is None:
+        rates = storage.branch_interest_rates()
+        if not default_rate and not any(rates.values()):
+            return None
+        storage.save_interest_run(period, {
+            "status": "running", "after": None, "accounts": 0, "interest": 0.0, "batches": 0,
+            "rates": rates, "default_rate": default_rate, "started_at": datetime.utcnow(),
+        })
+    else:
+        # A resumed run keeps its rates, every account of a period is charged the same
+        rates, default_rate = run["rates"], run["default_rate"]
+
+    after = run["after"] if run is not None else None
+    processed = 0
+    started = time.perf_counter()
+    while True:
+        batch = storage.accrue_interest_batch(period, after, batch_size, rates, default_rate)
+        if batch is None:
+            break
+        after, accounts, _ = batch
+        processed += accounts
+        # Balances changed on the server, cached copies are stale
+        account_cache.clear()
+    elapsed = time.perf_counter() - started
+
+    storage.save_interest_run(period, {
+        "status": "completed",
+        "completed_at": datetime.utcnow(),
+        "accounts_per_second": processed / elapsed if elapsed else 0.0,
+    })
+    load_leaderboards()
+    return storage.interest_run(period)
+
+# guild_id -> {command_name: enabled}. Filled by load_command_settings() and
+# kept coherent by toggle_command(), so command checks never hit the database.
+_command_settings = {}
+_command_settings_loaded = False
+
+def load_command_settings():
+    """
+    Loads the command settings of every guild into memory with one query.
+
+    Returns:
+        int: The number of guilds with stored settings.
+    """
+    global _command_settings, _command_settings_loaded
+    settings = get_storage().all_command_settings()
+    # Swap the whole mapping so concurrent readers never see a partial load
+    _command_settings = settings
+    _command_settings_loaded = True
+    return len(settings)
+
+def refresh_command_settings(guild_id):
+    """Reloads the command settings of a single guild, e.g. after the bot joins it."""
+    guild_commands = get_storage().guild_command_settings(guild_id)
+    _command_settings[guild_id] = guild_commands or {}
+    return _command_settings[guild_id]
+
+def forget_command_settings(guild_id):
+    """Drops the cached command settings of a guild the bot has left."""
+    _command_settings.pop(guild_id, None)
+
+def is_command_settings_cached(guild_id):
+    """Returns True if get_command_status can answer for the guild without a database query."""
+    return _command_settings_loaded or guild_id in _command_settings
 
 def toggle_command(guild_id, command_name, status):
     """Toggle a command's status for a specific guild"""
-    commands_collection = db["guild_commands"]
-    commands_collection.update_one(
-        {"guild_id": guild_id},
-        {"$set": {command_name: status}},
-        upsert=True
-    )
+    get_storage().set_command_status(guild_id, command_name, status)
+    # Write-through so the next check sees the new status immediately
+    _command_settings.setdefault(guild_id, {})[command_name] = status
 
 def get_command_status(guild_id, command_name):
     """Get the status of a command for a specific guild"""
-    commands_collection = db["guild_commands"]
-    guild_commands = commands_collection.find_one({"guild_id": guild_id})
-    return guild_commands.get(command_name, True) if guild_commands else True
-
-
+    guild_commands = _command_settings.get(guild_id)
+    if guild_commands is None:
+        # Guilds missing from a full load have no stored settings
+        if _command_settings_loaded:
+            return True
+        guild_commands = refresh_command_settings(guild_id)
+    return guild_commands.get(command_name, True)
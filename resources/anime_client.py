@@ -0,0 +1,156 @@
+"""
+Asynchronous client for the anime search API used by ``/anime``.
+
+Searches go through one keep-alive connection pool and are cached by their
+normalized query. Fresh entries are served directly, stale entries are served
+immediately while a background refresh runs (stale-while-revalidate), and
+concurrent identical searches share a single request.
+"""
+import asyncio
+import os
+import time
+from urllib.parse import quote
+
+import aiohttp
+
+from resources.cache import LRUCache
+
+ANIME_CACHE_SIZE = int(os.getenv('ANIME_CACHE_SIZE', '512'))
+ANIME_CACHE_TTL = float(os.getenv('ANIME_CACHE_TTL', '900'))
+ANIME_CACHE_STALE_TTL = float(os.getenv('ANIME_CACHE_STALE_TTL', '3600'))
+ANIME_TIMEOUT = float(os.getenv('ANIME_TIMEOUT', '10'))
+ANIME_MAX_CONNECTIONS = int(os.getenv('ANIME_MAX_CONNECTIONS', '20'))
+
+
+def normalize_query(query):
+    """Normalizes a search so that case and whitespace variations share a cache entry."""
+    return ' '.join(query.casefold().split())
+
+
+class AnimeClient:
+    """
+    Cached, deduplicating client for the anime search endpoint.
+
+    Attributes:
+        search_url (str): The search endpoint, the quoted query is appended to it.
+        ttl (float): Seconds a response is served without revalidation.
+        stale_ttl (float): Extra seconds a response may be served while it is refreshed.
+        cache (LRUCache): ``(fetched_at, response)`` tuples keyed by normalized query.
+    """
+    def __init__(self, search_url, headers=None, cache_size=ANIME_CACHE_SIZE, ttl=ANIME_CACHE_TTL,
+                 stale_ttl=ANIME_CACHE_STALE_TTL, timeout=ANIME_TIMEOUT, max_connections=ANIME_MAX_CONNECTIONS):
+        self.search_url = search_url
+        # aiohttp rejects None header values, unset environment variables are skipped
+        self.headers = {key: value for key, value in (headers or {}).items() if value is not None}
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.cache = LRUCache(cache_size, ttl=ttl + stale_ttl)
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._max_connections = max_connections
+        self._session = None
+        self._inflight = {}
+        self._refreshes = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def _get_session(self):
+        """Returns the pooled HTTP session, creating it on first use inside the running loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._max_connections, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers, timeout=self._timeout)
+        return self._session
+
+    async def search(self, query):
+        """
+        Searches for anime by name.
+
+        Parameters:
+            query (str): The name to search for.
+
+        Returns:
+            dict: The decoded JSON response of the search endpoint.
+
+        Raises:
+            aiohttp.ClientError: If the API cannot be reached and nothing is cached.
+            asyncio.TimeoutError: If the API does not answer in time and nothing is cached.
+        """
+        key = normalize_query(query)
+        entry = self.cache.get(key)
+        if entry is not None:
+            fetched_at, response = entry
+            if time.monotonic() - fetched_at < self.ttl:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                self._revalidate(key)
+            return response
+
+        self.misses += 1
+        return await self._fetch_shared(key)
+
+    def _revalidate(self, key):
+        """Starts a background refresh of a stale entry unless one is already running."""
+        if key in self._inflight:
+            return
+        task = asyncio.ensure_future(self._fetch_shared(key))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task):
+        """Forgets a finished background refresh and swallows its error."""
+        self._refreshes.discard(task)
+        # A failed refresh keeps serving the stale entry, the error is already counted
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch_shared(self, key):
+        """Fetches ``key``, joining an identical request that is already in flight."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shield the shared request so one cancelled caller does not cancel it for the others
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key):
+        """Requests ``key`` from the API and caches the response."""
+        try:
+            async with self._get_session().get(self.search_url + quote(key)) as response:
+                response.raise_for_status()
+                # The API answers with application/vnd.api+json
+                data = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.errors += 1
+            raise
+        self.cache.set(key, (time.monotonic(), data))
+        return data
+
+    @property
+    def hit_rate(self):
+        """Fraction of searches answered from the cache, stale answers included."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / lookups if lookups else 0.0
+
+    def stats(self):
+        """Returns the client counters as a dict."""
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_rate": self.hit_rate,
+            "cache_size": len(self.cache),
+        }
+
+    async def close(self):
+        """Closes the HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,106 @@
+"""
+Asynchronous avatar fetching with a bounded cache.
+
+Avatars are downloaded through one pooled HTTP session, decoded and resized
+off the event loop and cached by avatar hash, so repeated renders for the same
+user never touch the CDN. Concurrent requests for an avatar that is already
+being downloaded share that download.
+"""
+import asyncio
+import io
+import os
+
+import aiohttp
+
+from resources.cache import LRUCache
+
+AVATAR_SIZE = (50, 50)
+# Smallest CDN size that is still at least as large as AVATAR_SIZE
+AVATAR_CDN_SIZE = 64
+
+AVATAR_CACHE_SIZE = int(os.getenv('AVATAR_CACHE_SIZE', '1024'))
+AVATAR_CACHE_TTL = float(os.getenv('AVATAR_CACHE_TTL', '3600'))
+AVATAR_TIMEOUT = float(os.getenv('AVATAR_TIMEOUT', '5'))
+
+
+def _decode_avatar(data, size):
+    """Decodes avatar bytes into an RGBA image of the given size."""
+    # Pillow is imported by the first avatar rather than at startup
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as avatar:
+        return avatar.convert("RGBA").resize(size)
+
+
+class AvatarService:
+    """
+    Fetches, decodes and caches user avatars.
+
+    Cached images are shared between renders and must be treated as read-only.
+
+    Attributes:
+        size (tuple[int, int]): The size avatars are resized to.
+        cache (LRUCache): Decoded avatars keyed by avatar hash and size.
+    """
+    def __init__(self, size=AVATAR_SIZE, cache_size=AVATAR_CACHE_SIZE, ttl=AVATAR_CACHE_TTL, timeout=AVATAR_TIMEOUT):
+        self.size = size
+        self.cache = LRUCache(cache_size, ttl=ttl)
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+        self._inflight = {}
+
+    def _get_session(self):
+        """Returns the shared HTTP session, creating it on first use inside the running loop."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self._timeout)
+        return self._session
+
+    async def get(self, asset):
+        """
+        Returns the decoded avatar for a :class:`discord.Asset`.
+
+        Parameters:
+            asset (discord.Asset): The avatar asset, e.g. ``user.display_avatar``.
+
+        Returns:
+            PIL.Image.Image | None: The resized RGBA avatar, or None if it could not be fetched.
+        """
+        url = asset.replace(size=AVATAR_CDN_SIZE, format='png').url
+        return await self.get_by_key(asset.key, url)
+
+    async def get_by_key(self, key, url):
+        """Returns the avatar cached under ``key``, downloading it from ``url`` on a miss."""
+        cache_key = (key, self.size)
+        avatar = self.cache.get(cache_key)
+        if avatar is not None:
+            return avatar
+
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(cache_key, url))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        # Shield the shared download so one cancelled caller does not cancel it for the others
+        return await asyncio.shield(task)
+
+    async def _load(self, cache_key, url):
+        """Downloads and decodes an avatar, caching it on success."""
+        try:
+            async with self._get_session().get(url) as response:
+                response.raise_for_status()
+                data = await response.read()
+            avatar = await asyncio.to_thread(_decode_avatar, data, self.size)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            return None
+        self.cache.set(cache_key, avatar)
+        return avatar
+
+    async def close(self):
+        """Closes the HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+# Shared by every cog that renders avatars
+avatar_service = AvatarService()
@@ -0,0 +1,162 @@
+"""
+A small thread-safe LRU cache with optional time-to-live.
+
+Used wherever the bot keeps hot data in memory (avatars, API responses,
+accounts). Database helpers run on worker threads, so every operation takes
+a lock; the critical sections are a handful of dict operations.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Least-recently-used cache bounded by entry count and, optionally, age.
+
+    Attributes:
+        maxsize (int): Maximum number of entries kept before evicting the oldest.
+        ttl (float | None): Seconds an entry stays valid, or None to never expire.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that found nothing or an expired entry.
+        evictions (int): Entries dropped to make room for new ones.
+        expirations (int): Entries dropped because they outlived the TTL.
+    """
+    def __init__(self, maxsize, ttl=None, clock=time.monotonic):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._reservations = {}  # key -> token of the read-through fill allowed to store it
+        self._tokens = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Returns the cached value for ``key`` and marks it as recently used."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Stores ``value`` under ``key``, evicting the least recently used entry if full."""
+        with self._lock:
+            self._reservations.pop(key, None)
+            self._store(key, value)
+
+    def _store(self, key, value):
+        """Stores an entry and evicts beyond ``maxsize``. The lock must be held."""
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def reserve(self, key):
+        """
+        Starts a read-through fill of ``key``, call before reading the value from its source.
+
+        Any write to the key until :meth:`fill` (``set``, ``update``, ``pop`` or
+        ``clear``) cancels the reservation, so a value read before that write
+        can never overwrite the newer one.
+
+        Returns:
+            int: The token to pass to :meth:`fill` and :meth:`release`.
+        """
+        with self._lock:
+            self._tokens += 1
+            self._reservations[key] = self._tokens
+            return self._tokens
+
+    def fill(self, key, value, token):
+        """
+        Stores a value read after :meth:`reserve` unless a write or a newer fill came in between.
+
+        Returns:
+            bool: True if the value was stored.
+        """
+        with self._lock:
+            if self._reservations.get(key) != token:
+                return False
+            del self._reservations[key]
+            self._store(key, value)
+            return True
+
+    def release(self, key, token):
+        """Abandons a reservation, e.g. when the read failed."""
+        with self._lock:
+            if self._reservations.get(key) == token:
+                del self._reservations[key]
+
+    def update(self, key, func):
+        """
+        Replaces a cached value with ``func(value)`` without refreshing its TTL.
+
+        Does nothing if the key is not cached, which keeps write paths from
+        filling the cache with entries nobody asked for.
+        """
+        with self._lock:
+            # A fill in flight read the value before this write
+            self._reservations.pop(key, None)
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                self._data[key] = (expires_at, func(value))
+
+    def pop(self, key, default=None):
+        """Removes ``key`` from the cache and returns its value."""
+        with self._lock:
+            self._reservations.pop(key, None)
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        """Removes every entry, keeping the counters."""
+        with self._lock:
+            self._data.clear()
+            self._reservations.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and (entry[0] is None or entry[0] > self._clock())
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups answered from the cache, 0.0 before the first lookup."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Returns the cache counters as a dict, e.g. for logging or metrics."""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hit_rate,
+        }
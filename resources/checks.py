@@ -1,7 +1,9 @@
 from discord.ext import commands
-from db import get_command_status
+from async_db import get_command_status
+
+async def command_enabled(ctx):
+    """Global check: whether the invoked command is enabled in the guild."""
+    return await get_command_status(ctx.guild.id, ctx.command.name)
 
 def is_command_enabled():
-    async def predicate(ctx):
-        return get_command_status(ctx.guild.id, ctx.command.name)
-    return commands.check(predicate)
+    return commands.check(command_enabled)
@@ -0,0 +1,53 @@
+"""
+Guild and member totals maintained from gateway events.
+
+Counting members by walking every cached member costs O(total members) and
+requires the member cache in the first place. These counters are built once
+from the guild list on ready and then adjusted by the join/leave events, so
+reading them is O(1) whatever intents the bot runs with.
+"""
+
+
+class GuildCounters:
+    """
+    Guild count and summed member count of the guilds this process serves.
+
+    Attributes:
+        members (int): Total members over every guild. A user in several guilds
+            is counted once per guild.
+    """
+    def __init__(self):
+        self._member_counts = {}  # guild_id -> member_count
+        self.members = 0
+
+    @property
+    def guilds(self):
+        """Number of guilds counted."""
+        return len(self._member_counts)
+
+    def load(self, guilds):
+        """Recounts from scratch, e.g. on ready."""
+        self._member_counts = {guild.id: guild.member_count or 0 for guild in guilds}
+        self.members = sum(self._member_counts.values())
+
+    def add_guild(self, guild):
+        if guild.id in self._member_counts:
+            self.remove_guild(guild)
+        self._member_counts[guild.id] = guild.member_count or 0
+        self.members += self._member_counts[guild.id]
+
+    def remove_guild(self, guild):
+        self.members -= self._member_counts.pop(guild.id, 0)
+
+    def member_joined(self, guild_id):
+        if guild_id in self._member_counts:
+            self._member_counts[guild_id] += 1
+            self.members += 1
+
+    def member_left(self, guild_id):
+        if self._member_counts.get(guild_id):
+            self._member_counts[guild_id] -= 1
+            self.members -= 1
+
+
+counters = GuildCounters()
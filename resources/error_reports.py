@@ -0,0 +1,146 @@
+"""
+Aggregation of command errors into periodic digests.
+
+Reporting every failure as it happens turns an outage into a flood of Discord
+messages that competes with real traffic for the rate limit. Errors are instead
+grouped by fingerprint (command and exception type), counted, and reported as
+one digest per interval that keeps the first full traceback of each group.
+Outgoing reports additionally draw from a token bucket, so no error storm can
+exceed a fixed message budget.
+"""
+import os
+import time
+import traceback
+
+ERROR_DIGEST_INTERVAL = float(os.getenv('ERROR_DIGEST_INTERVAL', '60'))
+# Outgoing report messages allowed per minute, bursts up to the same amount
+ERROR_REPORTS_PER_MINUTE = float(os.getenv('ERROR_REPORTS_PER_MINUTE', '4'))
+
+
+def fingerprint(command, error):
+    """Returns the grouping key of an error: the command name and exception type."""
+    return command, f"{type(error).__module__}.{type(error).__qualname__}"
+
+
+class ErrorGroup:
+    """
+    Occurrences of one fingerprint within a digest interval.
+
+    Attributes:
+        command (str): The failing command.
+        error_type (str): Qualified name of the exception type.
+        count (int): Occurrences so far.
+        message (str): ``str()`` of the first occurrence.
+        traceback (str): Full traceback of the first occurrence.
+        first_seen (float): Wall clock time of the first occurrence.
+        last_seen (float): Wall clock time of the latest occurrence.
+    """
+    __slots__ = ("command", "error_type", "count", "message", "traceback", "first_seen", "last_seen")
+
+    def __init__(self, command, error_type, message, traceback, seen):
+        self.command = command
+        self.error_type = error_type
+        self.count = 0
+        self.message = message
+        self.traceback = traceback
+        self.first_seen = seen
+        self.last_seen = seen
+
+
+class ErrorAggregator:
+    """
+    Groups errors by fingerprint until they are drained into a digest.
+
+    Attributes:
+        total (int): Errors recorded since creation.
+    """
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._groups = {}
+        self.total = 0
+
+    def add(self, command, error):
+        """
+        Records an error.
+
+        The traceback is only formatted for the first occurrence of a fingerprint.
+
+        Returns:
+            bool: True if this is the first occurrence of its fingerprint since the last drain.
+        """
+        now = self._clock()
+        key = fingerprint(command, error)
+        group = self._groups.get(key)
+        first = group is None
+        if first:
+            formatted = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+            group = self._groups[key] = ErrorGroup(key[0], key[1], str(error), formatted, now)
+        group.count += 1
+        group.last_seen = now
+        self.total += 1
+        return first
+
+    def drain(self):
+        """Returns the pending groups, most frequent first, and starts a new interval."""
+        groups = sorted(self._groups.values(), key=lambda group: group.count, reverse=True)
+        self._groups = {}
+        return groups
+
+    def restore(self, groups):
+        """Puts drained groups back, e.g. when their digest could not be sent."""
+        for group in groups:
+            key = (group.command, group.error_type)
+            pending = self._groups.get(key)
+            if pending is None:
+                self._groups[key] = group
+            else:
+                group.count += pending.count
+                group.last_seen = max(group.last_seen, pending.last_seen)
+                self._groups[key] = group
+
+    def __len__(self):
+        return len(self._groups)
+
+
+class TokenBucket:
+    """
+    Allows ``rate`` actions per second on average and bursts of up to ``capacity``.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): Most tokens the bucket holds.
+    """
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def try_acquire(self, tokens=1):
+        """Takes tokens if available, returning whether the action may proceed."""
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens < tokens:
+            return False
+        self._tokens -= tokens
+        return True
+
+
+def format_digest(groups, limit=4000):
+    """
+    Formats drained groups as a digest message of at most ``limit`` characters.
+
+    Every group gets a one line summary, then the traceback of the most frequent
+    group is appended as far as space allows.
+    """
+    total = sum(group.count for group in groups)
+    lines = [f"**{total} errors in {len(groups)} groups**"]
+    for group in groups:
+        lines.append(f"`{group.count}x` **/{group.command}** `{group.error_type}`: {group.message[:200]}")
+    digest = "\n".join(lines)
+    room = limit - len(digest) - len("\n```py\n\n```")
+    if groups and room > 0:
+        digest += f"\n```py\n{groups[0].traceback[-room:]}\n```"
+    return digest[:limit]
@@ -0,0 +1,157 @@
+"""
+Registry of in-progress KYC verifications.
+
+Instead of one ``wait_for`` per applicant, which pycord evaluates against every
+incoming message, pending verifications live in a dict keyed by user ID. A
+single DM listener looks the sender up in O(1), expired sessions are swept
+periodically and the simulated verification delay is a scheduled callback
+rather than a sleeping coroutine.
+"""
+import asyncio
+import enum
+import os
+import time
+
+KYC_TIMEOUT = float(os.getenv('KYC_TIMEOUT', '120'))
+KYC_VERIFICATION_DELAY = float(os.getenv('KYC_VERIFICATION_DELAY', '10'))
+
+
+class KYCState(enum.Enum):
+    """Lifecycle of a KYC session."""
+    AWAITING_DETAILS = "awaiting_details"
+    VERIFYING = "verifying"
+    COMPLETED = "completed"
+    EXPIRED = "expired"
+
+
+class KYCSession:
+    """
+    A single applicant's verification.
+
+    Attributes:
+        user_id (str): The applicant's Discord user ID.
+        guild_id (str): The guild the account will be opened in.
+        state (KYCState): Where the session is in its lifecycle.
+        expires_at (float): Clock time after which the session expires, awaiting details or stuck in verification.
+        attempts (int): Number of details submitted so far.
+        context (dict): Caller data, e.g. the command context to answer on completion.
+    """
+    __slots__ = ("user_id", "guild_id", "state", "expires_at", "attempts", "context")
+
+    def __init__(self, user_id, guild_id, expires_at, context):
+        self.user_id = user_id
+        self.guild_id = guild_id
+        self.state = KYCState.AWAITING_DETAILS
+        self.expires_at = expires_at
+        self.attempts = 0
+        self.context = context
+
+
+class KYCSessionManager:
+    """
+    Tracks KYC sessions and drives their state machine.
+
+    ``AWAITING_DETAILS`` -> ``VERIFYING`` (details received) -> either
+    ``COMPLETED`` or back to ``AWAITING_DETAILS`` for another attempt. Sessions
+    past their deadline become ``EXPIRED`` when swept; a verifying session gets
+    the verification delay plus the timeout, so one whose callback failed
+    does not block the applicant forever.
+
+    Attributes:
+        timeout (float): Seconds an applicant has to submit details.
+        verification_delay (float): Seconds between receiving details and verifying them.
+    """
+    def __init__(self, timeout=KYC_TIMEOUT, verification_delay=KYC_VERIFICATION_DELAY, clock=time.monotonic):
+        self.timeout = timeout
+        self.verification_delay = verification_delay
+        self._clock = clock
+        self._sessions = {}
+        self._tasks = set()
+
+    def start(self, user_id, guild_id, **context):
+        """
+        Opens a session for an applicant.
+
+        Returns:
+            KYCSession | None: The new session, or None if the user already has one.
+        """
+        if user_id in self._sessions:
+            return None
+        session = KYCSession(user_id, guild_id, self._clock() + self.timeout, context)
+        self._sessions[user_id] = session
+        return session
+
+    def get(self, user_id):
+        """Returns the user's active session, or None."""
+        return self._sessions.get(user_id)
+
+    def __contains__(self, user_id):
+        return user_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def begin_verification(self, user_id):
+        """
+        Moves a session awaiting details into verification.
+
+        Returns:
+            KYCSession | None: The session, or None if it is not awaiting details.
+        """
+        session = self._sessions.get(user_id)
+        if session is None or session.state is not KYCState.AWAITING_DETAILS:
+            return None
+        session.state = KYCState.VERIFYING
+        session.attempts += 1
+        session.expires_at = self._clock() + self.verification_delay + self.timeout
+        return session
+
+    def retry(self, user_id):
+        """Sends a session back to awaiting details with a fresh deadline after a failed attempt."""
+        session = self._sessions.get(user_id)
+        if session is not None:
+            session.state = KYCState.AWAITING_DETAILS
+            session.expires_at = self._clock() + self.timeout
+        return session
+
+    def complete(self, user_id):
+        """Closes a session, returning it."""
+        session = self._sessions.pop(user_id, None)
+        if session is not None:
+            session.state = KYCState.COMPLETED
+        return session
+
+    def sweep(self):
+        """
+        Removes sessions whose deadline has passed.
+
+        Sessions being verified are normally closed by their scheduled callback
+        long before their deadline.
+
+        Returns:
+            list[KYCSession]: The expired sessions.
+        """
+        now = self._clock()
+        expired = [
+            session for session in self._sessions.values()
+            if session.state in (KYCState.AWAITING_DETAILS, KYCState.VERIFYING) and session.expires_at <= now
+        ]
+        for session in expired:
+            del self._sessions[session.user_id]
+            session.state = KYCState.EXPIRED
+        return expired
+
+    def verify_later(self, session, callback, *args):
+        """
+        Schedules ``callback(session, *args)`` after the verification delay.
+
+        The delay is a timer handle on the event loop, nothing is parked while waiting.
+        """
+        loop = asyncio.get_running_loop()
+        loop.call_later(self.verification_delay, self._run, callback, session, args)
+
+    def _run(self, callback, session, args):
+        task = asyncio.ensure_future(callback(session, *args))
+        # Keep a reference until the task finishes so it is not garbage collected
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
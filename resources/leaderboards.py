@@ -0,0 +1,182 @@
+"""
+Incrementally maintained balance leaderboards.
+
+Every account is kept in a sorted ranking for its branch and in a global
+ranking. Balance, branch and account changes update the rankings in place, so
+reading a page or looking up a rank never depends on sorting the whole branch.
+"""
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Key of the ranking that spans every branch
+GLOBAL = None
+
+
+class Leaderboards:
+    """
+    Per-branch and global rankings of accounts by balance.
+
+    Rankings are lists of ``(-balance, user_id)`` kept sorted, so the richest
+    account comes first and ties are broken by user ID. Database helpers run on
+    worker threads, so every operation takes a lock.
+
+    Attributes:
+        loaded (bool): Whether the rankings have been filled by :meth:`load`.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._accounts = {}  # user_id -> [balance, branch_id, username]
+        self._rankings = defaultdict(list)
+        self._loads = 0
+        # Changes recorded while a load is in progress, replayed over its snapshot
+        self._pending = []
+        self.loaded = False
+
+    @contextmanager
+    def loading(self):
+        """
+        Records every change made until the block exits.
+
+        Wrap both reading the accounts from storage and :meth:`load` in it: a
+        change that lands after the scan read an account is then replayed over
+        the loaded snapshot instead of being lost.
+        """
+        with self._lock:
+            self._loads += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._loads -= 1
+                if not self._loads:
+                    self._pending.clear()
+
+    def load(self, accounts):
+        """
+        Replaces the rankings with the given accounts, then replays the changes
+        recorded since :meth:`loading` began.
+
+        Parameters:
+            accounts (Iterable[dict]): Account documents with ``user_id``, ``username``,
+            ``branch_id`` and ``balance``.
+        """
+        with self.loading():
+            self._load(accounts)
+
+    def _load(self, accounts):
+        entries = {}
+        rankings = defaultdict(list)
+        for account in accounts:
+            user_id = account["user_id"]
+            balance = account.get("balance", 0)
+            entries[user_id] = [balance, account.get("branch_id"), account.get("username")]
+            rankings[account.get("branch_id")].append((-balance, user_id))
+            rankings[GLOBAL].append((-balance, user_id))
+        for ranking in rankings.values():
+            ranking.sort()
+        with self._lock:
+            self._accounts = entries
+            self._rankings = rankings
+            self.loaded = True
+            # Changes are absolute values, replaying one the scan already saw is harmless
+            for operation, args in self._pending:
+                operation(*args)
+
+    def _unlink(self, user_id, balance, branch_id):
+        for key in (branch_id, GLOBAL):
+            ranking = self._rankings[key]
+            index = bisect_left(ranking, (-balance, user_id))
+            if index < len(ranking) and ranking[index] == (-balance, user_id):
+                del ranking[index]
+
+    def _link(self, user_id, balance, branch_id):
+        insort(self._rankings[branch_id], (-balance, user_id))
+        insort(self._rankings[GLOBAL], (-balance, user_id))
+
+    def upsert(self, user_id, balance=None, branch_id=None, username=None):
+        """
+        Records a new balance, branch or username for an account.
+
+        Fields left as None keep their current value. Unknown accounts are only
+        added when both balance and branch are given. Before the first load,
+        changes are only kept while a load is in progress.
+        """
+        with self._lock:
+            if self._loads:
+                self._pending.append((self._upsert, (user_id, balance, branch_id, username)))
+            if self.loaded:
+                self._upsert(user_id, balance, branch_id, username)
+
+    def _upsert(self, user_id, balance, branch_id, username):
+        """Applies an upsert. The lock must be held."""
+        entry = self._accounts.get(user_id)
+        if entry is None:
+            if balance is None or branch_id is None:
+                return
+            self._accounts[user_id] = [balance, branch_id, username]
+            self._link(user_id, balance, branch_id)
+            return
+
+        old_balance, old_branch_id, _ = entry
+        new_balance = old_balance if balance is None else balance
+        new_branch_id = old_branch_id if branch_id is None else branch_id
+        if username is not None:
+            entry[2] = username
+        if (new_balance, new_branch_id) != (old_balance, old_branch_id):
+            self._unlink(user_id, old_balance, old_branch_id)
+            self._link(user_id, new_balance, new_branch_id)
+            entry[0] = new_balance
+            entry[1] = new_branch_id
+
+    def remove(self, user_id):
+        """Drops an account from every ranking."""
+        with self._lock:
+            if self._loads:
+                self._pending.append((self._remove, (user_id,)))
+            self._remove(user_id)
+
+    def _remove(self, user_id):
+        """Applies a removal. The lock must be held."""
+        entry = self._accounts.pop(user_id, None)
+        if entry is not None:
+            self._unlink(user_id, entry[0], entry[1])
+
+    def page(self, branch_id=GLOBAL, page=0, per_page=10):
+        """
+        Returns one page of a ranking.
+
+        Parameters:
+            branch_id (str | None): The branch to rank, or ``GLOBAL`` for every account.
+            page (int): Zero-based page number.
+            per_page (int): Accounts per page.
+
+        Returns:
+            list[dict]: ``rank``, ``user_id``, ``username`` and ``balance`` for each account.
+        """
+        start = page * per_page
+        with self._lock:
+            ranking = self._rankings.get(branch_id, [])
+            return [
+                {
+                    "rank": start + offset + 1,
+                    "user_id": user_id,
+                    "username": self._accounts[user_id][2],
+                    "balance": -negative_balance,
+                }
+                for offset, (negative_balance, user_id) in enumerate(ranking[start:start + per_page])
+            ]
+
+    def rank(self, user_id, branch_id=GLOBAL):
+        """Returns the 1-based rank of an account in a ranking, or None if it is not ranked there."""
+        with self._lock:
+            entry = self._accounts.get(user_id)
+            if entry is None or (branch_id is not GLOBAL and entry[1] != branch_id):
+                return None
+            return bisect_left(self._rankings[branch_id], (-entry[0], user_id)) + 1
+
+    def size(self, branch_id=GLOBAL):
+        """Returns the number of ranked accounts in a ranking."""
+        with self._lock:
+            return len(self._rankings.get(branch_id, []))
@@ -0,0 +1,168 @@
+"""
+Buffered, batched writer for append-only audit records.
+
+Transaction and KYC logs never need to be read back by the command that wrote
+them, so instead of one ``insert_one`` round-trip per event they are queued and
+written with one unordered bulk insert per collection whenever the batch is
+full or the flush interval has passed. The queue is bounded: when the database
+falls behind, producers wait instead of growing memory without limit.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+
+logger = logging.getLogger('discord')
+
+LEDGER_BATCH_SIZE = int(os.getenv('LEDGER_BATCH_SIZE', '500'))
+LEDGER_FLUSH_INTERVAL = float(os.getenv('LEDGER_FLUSH_INTERVAL', '1.0'))
+LEDGER_QUEUE_SIZE = int(os.getenv('LEDGER_QUEUE_SIZE', '10000'))
+LEDGER_MAX_RETRIES = 3
+
+
+class LedgerWriter:
+    """
+    Queues ``(collection, document)`` records and writes them in batches.
+
+    Attributes:
+        write_batch (Callable): Coroutine function taking ``{collection: [documents]}``
+            that persists one batch.
+        batch_size (int): Records that trigger a flush as soon as they are queued.
+        flush_interval (float): Longest time in seconds a record waits in the queue.
+        flushes (int): Batches written.
+        written (int): Records written.
+        dropped (int): Records lost after every retry failed.
+        last_flush_latency (float): Seconds the last batch took to write.
+        max_flush_latency (float): Slowest batch write so far, in seconds.
+    """
+    def __init__(self, write_batch, batch_size=LEDGER_BATCH_SIZE, flush_interval=LEDGER_FLUSH_INTERVAL,
+                 max_queue_size=LEDGER_QUEUE_SIZE):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self._queue = None
+        self._task = None
+        # Records taken off the queue but not written yet, kept here so close() can't lose them
+        self._pending = []
+        self._flush_lock = None
+        self.flushes = 0
+        self.written = 0
+        self.dropped = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+
+    def _ensure_started(self):
+        """Creates the queue and the flushing task on first use inside the running loop."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._flush_lock = asyncio.Lock()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def put(self, collection, document):
+        """
+        Queues a record for writing.
+
+        Waits while the queue is full, which pushes back on the producer when
+        the database cannot keep up.
+        """
+        self._ensure_started()
+        await self._queue.put((collection, document))
+
+    @property
+    def depth(self):
+        """Number of records waiting to be written."""
+        return len(self._pending) + (self._queue.qsize() if self._queue is not None else 0)
+
+    @property
+    def saturated(self):
+        """True when the queue is full and producers are being held back."""
+        return self._queue is not None and self._queue.full()
+
+    async def _run(self):
+        while True:
+            # Wait for the first record, then give the batch until the deadline to fill up
+            self._pending.append(await self._queue.get())
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    self._pending.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            async with self._flush_lock:
+                records, self._pending = self._pending, []
+                # flush() may have written them while this task waited for the lock
+                if records:
+                    await self._write(records)
+
+    async def _write_all(self):
+        """Writes the pending and queued records in batches. The flush lock must be held."""
+        records, self._pending = self._pending, []
+        while not self._queue.empty():
+            records.append(self._queue.get_nowait())
+        for start in range(0, len(records), self.batch_size):
+            await self._write(records[start:start + self.batch_size])
+
+    async def _write(self, records):
+        """Writes one batch, retrying with backoff before giving up on it."""
+        batch = defaultdict(list)
+        for collection, document in records:
+            batch[collection].append(document)
+
+        for attempt in range(1, LEDGER_MAX_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                await self.write_batch(dict(batch))
+            except Exception as e:
+                if attempt == LEDGER_MAX_RETRIES:
+                    self.dropped += len(records)
+                    logger.error(f"Dropped {len(records)} ledger records after {attempt} attempts: {e}")
+                    return
+                await asyncio.sleep(0.5 * attempt)
+                continue
+            latency = time.perf_counter() - started
+            self.flushes += 1
+            self.written += len(records)
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+            return
+
+    async def flush(self):
+        """Writes every queued record now."""
+        if self._queue is None:
+            return
+        async with self._flush_lock:
+            await self._write_all()
+
+    async def close(self):
+        """Stops the flushing task and writes whatever is still queued."""
+        if self._queue is None:
+            return
+        # Holding the lock guarantees the task is not halfway through a write when cancelled
+        async with self._flush_lock:
+            if self._task is not None:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+                self._task = None
+            await self._write_all()
+
+    def stats(self):
+        """Returns the writer counters as a dict."""
+        return {
+            "depth": self.depth,
+            "max_queue_size": self.max_queue_size,
+            "saturated": self.saturated,
+            "flushes": self.flushes,
+            "written": self.written,
+            "dropped": self.dropped,
+            "last_flush_latency": self.last_flush_latency,
+            "max_flush_latency": self.max_flush_latency,
+        }
@@ -0,0 +1,73 @@
+"""
+Event-driven matchmaking for ``/random_chat``.
+
+Waiting users are kept in insertion-ordered buckets (one per guild/language
+combination) together with a future that is resolved the moment a partner
+arrives. Joining, matching and leaving are all O(1), and a waiting user costs
+nothing until their future is resolved.
+"""
+import asyncio
+from collections import OrderedDict
+
+
+class MatchmakingQueue:
+    """
+    First-come first-served pairing of users that share a bucket key.
+
+    The key is any hashable describing who may be matched together, e.g.
+    ``(guild_id, language)`` or ``(None, None)`` to match with anyone.
+    """
+    def __init__(self):
+        self._buckets = {}  # key -> OrderedDict[user_id, Future]
+        self._waiting = {}  # user_id -> key
+
+    def join(self, user_id, key=None):
+        """
+        Pairs the user with the longest waiting user of the same bucket, or queues them.
+
+        Returns:
+            tuple[str | None, asyncio.Future | None]: ``(partner_id, None)`` if a
+            partner was waiting, whose future now resolves to ``user_id``;
+            otherwise ``(None, future)`` which resolves to the partner's ID, or
+            to None if the user leaves the queue.
+        """
+        bucket = self._buckets.get(key)
+        while bucket:
+            partner_id, partner_future = bucket.popitem(last=False)
+            del self._waiting[partner_id]
+            # A waiter that timed out has its future cancelled, skip it
+            if not partner_future.done():
+                if not bucket:
+                    del self._buckets[key]
+                partner_future.set_result(user_id)
+                return partner_id, None
+        self._buckets.pop(key, None)
+
+        future = asyncio.get_running_loop().create_future()
+        self._buckets.setdefault(key, OrderedDict())[user_id] = future
+        self._waiting[user_id] = key
+        return None, future
+
+    def leave(self, user_id):
+        """
+        Removes a waiting user from the queue, resolving their future to None.
+
+        Returns:
+            bool: True if the user was waiting.
+        """
+        if user_id not in self._waiting:
+            return False
+        key = self._waiting.pop(user_id)
+        bucket = self._buckets[key]
+        future = bucket.pop(user_id)
+        if not bucket:
+            del self._buckets[key]
+        if not future.done():
+            future.set_result(None)
+        return True
+
+    def __contains__(self, user_id):
+        return user_id in self._waiting
+
+    def __len__(self):
+        return len(self._waiting)
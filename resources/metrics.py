@@ -0,0 +1,179 @@
+"""
+In-process metrics with Prometheus text export.
+
+Latencies are kept in fixed-bucket histograms: recording is O(buckets) with no
+per-sample storage, and p50/p95/p99 are estimated from the buckets the same way
+Prometheus' ``histogram_quantile`` does. Gauges are callbacks read at scrape
+time, so caches and queues don't need to push their sizes anywhere.
+"""
+import bisect
+import math
+import threading
+
+METRICS_PREFIX = "quantumbank_"
+
+# Seconds, from sub-millisecond cache hits to slow Discord API calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Name of the db.py function running on the current thread, set by async_db
+current_operation = threading.local()
+
+
+class Histogram:
+    """
+    Thread-safe fixed-bucket latency histogram.
+
+    Attributes:
+        buckets (tuple[float, ...]): Upper bounds of the finite buckets, ascending.
+        count (int): Observations recorded.
+        sum (float): Sum of all observations.
+        max (float): Largest observation.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def cumulative_counts(self):
+        """Returns ``(upper_bound, observations <= upper_bound)`` pairs ending with +Inf."""
+        with self._lock:
+            counts = list(self._counts)
+        cumulative, total = [], 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def quantile(self, q):
+        """
+        Estimates the ``q`` quantile (0 <= q <= 1) by interpolating inside its bucket.
+
+        Returns:
+            float: The estimate in seconds, 0.0 without observations.
+        """
+        cumulative = self.cumulative_counts()
+        total = cumulative[-1][1]
+        if total == 0:
+            return 0.0
+        rank = q * total
+        lower_bound, lower_count = 0.0, 0
+        for bound, count in cumulative:
+            if count >= rank:
+                if math.isinf(bound):
+                    # Beyond the last bucket the largest observation is the best estimate
+                    return self.max
+                if count == lower_count:
+                    return bound
+                return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+            lower_bound, lower_count = bound, count
+        return self.max
+
+    def percentiles(self):
+        """Returns the p50, p95 and p99 estimates as a dict."""
+        return {"p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99)}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Named, labelled histograms and gauges.
+
+    Metric names are given without the ``quantumbank_`` prefix, which is added
+    on export.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # name -> (help, {labels: Histogram})
+        self._gauges = {}  # name -> (help, {labels: callable})
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS, **labels):
+        """Returns the histogram with the given name and labels, creating it on first use."""
+        key = tuple(sorted(labels.items()))
+        series = self._histograms.get(name)
+        histogram = series[1].get(key) if series else None
+        if histogram is None:
+            with self._lock:
+                _, series = self._histograms.setdefault(name, (help, {}))
+                histogram = series.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def histograms(self, name):
+        """Returns ``{labels dict items tuple: Histogram}`` of a histogram name."""
+        with self._lock:
+            return dict(self._histograms.get(name, (None, {}))[1])
+
+    def gauge(self, name, help, read, **labels):
+        """Registers a callback whose return value is exported as a gauge."""
+        with self._lock:
+            _, series = self._gauges.setdefault(name, (help, {}))
+            series[tuple(sorted(labels.items()))] = read
+
+    def read_gauges(self):
+        """Returns ``{(name, labels): value}`` for every gauge, skipping those whose callback fails."""
+        with self._lock:
+            gauges = [(name, labels, read) for name, (_, series) in self._gauges.items() for labels, read in series.items()]
+        values = {}
+        for name, labels, read in gauges:
+            try:
+                values[(name, labels)] = float(read())
+            except Exception:
+                continue
+        return values
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            histograms = [(name, help, dict(series)) for name, (help, series) in self._histograms.items()]
+            gauge_help = {name: help for name, (help, _) in self._gauges.items()}
+
+        for name, help, series in histograms:
+            full_name = METRICS_PREFIX + name
+            lines.append(f"# HELP {full_name} {help}")
+            lines.append(f"# TYPE {full_name} histogram")
+            for labels, histogram in series.items():
+                for bound, count in histogram.cumulative_counts():
+                    bucket_labels = _format_labels(labels + (("le", _format_value(bound)),))
+                    lines.append(f"{full_name}_bucket{bucket_labels} {count}")
+                lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+
+        rendered = set()
+        for (name, labels), value in self.read_gauges().items():
+            full_name = METRICS_PREFIX + name
+            if name not in rendered:
+                rendered.add(name)
+                lines.append(f"# HELP {full_name} {gauge_help[name]}")
+                lines.append(f"# TYPE {full_name} gauge")
+            lines.append(f"{full_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
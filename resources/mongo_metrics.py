@@ -0,0 +1,31 @@
+"""
+MongoDB command timings through pymongo's command monitoring.
+
+pymongo reports every command it sends together with its server round-trip
+duration. The listener attributes each one to the :mod:`db` function running
+on the calling thread (see ``resources.metrics.current_operation``), so the
+metrics show which bot operation issued which queries and how long they took.
+"""
+from pymongo import monitoring
+
+from resources.metrics import current_operation, registry
+
+
+class MongoCommandTimings(monitoring.CommandListener):
+    """Records ``mongo_command_seconds{function, command, outcome}`` for every command."""
+
+    def _observe(self, event, outcome):
+        function = getattr(current_operation, "name", None) or "other"
+        registry.histogram(
+            "mongo_command_seconds", "MongoDB command round-trip time by db.py function",
+            function=function, command=event.command_name, outcome=outcome
+        ).observe(event.duration_micros / 1_000_000)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._observe(event, "ok")
+
+    def failed(self, event):
+        self._observe(event, "error")
@@ -0,0 +1,116 @@
+"""
+Passbook image rendering off the event loop.
+
+Decoding the background JPEG, loading fonts, drawing and PNG encoding are all
+CPU bound. The renderer loads its assets once, renders on a small thread pool
+and hands back encoded bytes, so a burst of ``/passbook`` commands never
+freezes the bot.
+"""
+import asyncio
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BACKGROUND_PATH = "images/Technology-for-more-than-technologys-sake-1024x614.jpg"
+FONT_PATH = "fonts/arial.ttf"
+PASSBOOK_SIZE = (600, 400)
+AVATAR_POSITION = (500, 10)
+MAX_TRANSACTIONS = 5
+
+PASSBOOK_WORKERS = int(os.getenv('PASSBOOK_WORKERS', '2'))
+
+
+class PassbookRenderer:
+    """
+    Renders passbook cards as PNG bytes.
+
+    The background is decoded and resized and the fonts are loaded the first
+    time a passbook is rendered, then every render only copies the prepared
+    background and draws the account details on top of it.
+
+    Attributes:
+        background_path (str): Path of the background image.
+        font_path (str): Path of the TrueType font used for all text.
+    """
+    def __init__(self, background_path=BACKGROUND_PATH, font_path=FONT_PATH, max_workers=PASSBOOK_WORKERS):
+        self.background_path = background_path
+        self.font_path = font_path
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='passbook')
+        self._assets_lock = threading.Lock()
+        self._background = None
+        self._title_font = None
+        self._text_font = None
+
+    def _load_font(self, size):
+        """Loads the configured font, falling back to Pillow's bundled font if it is missing."""
+        from PIL import ImageFont
+        try:
+            return ImageFont.truetype(self.font_path, size=size)
+        except OSError:
+            return ImageFont.load_default(size=size)
+
+    def _load_assets(self):
+        """Decodes the background and loads the fonts exactly once."""
+        # Pillow is imported by the first render rather than at startup
+        from PIL import Image
+        with self._assets_lock:
+            if self._background is not None:
+                return
+            with Image.open(self.background_path) as background:
+                # Let the JPEG decoder downscale while decoding instead of after
+                background.draft('RGB', PASSBOOK_SIZE)
+                self._background = background.convert('RGB').resize(PASSBOOK_SIZE)
+            self._title_font = self._load_font(24)
+            self._text_font = self._load_font(18)
+
+    def render(self, username, account, transactions, avatar=None):
+        """
+        Renders a passbook synchronously.
+
+        Parameters:
+            username (str): The name shown in the title.
+            account (db.Account): The account, needs ``branch_name`` and ``balance``.
+            transactions (list[db.Transaction]): Most recent transactions first.
+            avatar (PIL.Image.Image | None): The user's prepared RGBA avatar, if available.
+
+        Returns:
+            bytes: The passbook encoded as PNG.
+        """
+        from PIL import ImageDraw
+
+        self._load_assets()
+        passbook = self._background.copy()
+        draw = ImageDraw.Draw(passbook)
+
+        # Draw title and account information with white text
+        draw.text((20, 20), f"Passbook for {username}", fill='white', font=self._title_font)
+        draw.text((20, 60), f"Branch Name: {account.branch_name}", fill='white', font=self._text_font)
+        draw.text((20, 90), f"Balance: ${account.balance:.2f}", fill='white', font=self._text_font)
+
+        if avatar is not None:
+            passbook.paste(avatar, AVATAR_POSITION, avatar)  # Use mask for transparency
+
+        draw.text((20, 130), "Transaction History:", fill='white', font=self._text_font)
+
+        y_offset = 160
+        for txn in transactions[:MAX_TRANSACTIONS]:
+            txn_info = f"{txn.type.capitalize()} 💵: ${txn.amount} on {txn.timestamp}"
+            draw.text((20, y_offset), txn_info, fill='white', font=self._text_font)
+            y_offset += 25
+
+        with io.BytesIO() as image_binary:
+            # The card is mostly a photo, heavier zlib levels cost far more CPU than they save
+            passbook.save(image_binary, 'PNG', compress_level=1)
+            return image_binary.getvalue()
+
+    async def render_async(self, username, account, transactions, avatar=None):
+        """Renders a passbook on the renderer's thread pool. See :meth:`render`."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self.render, username, account, transactions, avatar
+        )
+
+    def shutdown(self):
+        """Stops the rendering thread pool."""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,78 @@
+"""
+Startup timing.
+
+Records how long each startup phase (imports, MongoDB connection, index
+bootstrap, every cog) took so slow restarts can be traced to their cause, and
+prints them as one report once the bot is ready.
+
+``STARTUP_MODE=lazy`` (the default) defers the MongoDB connection and heavy
+libraries until they are first used, ``eager`` sets everything up before
+connecting to Discord.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+STARTUP_MODE = os.getenv('STARTUP_MODE', 'lazy')
+
+
+class StartupPhase:
+    """A timed startup step, ``seconds`` is set once the step has finished."""
+    __slots__ = ("name", "seconds")
+
+    def __init__(self, name, seconds=None):
+        self.name = name
+        self.seconds = seconds
+
+
+class StartupReport:
+    """
+    Durations of the startup phases, in the order they finished.
+
+    Phases may be recorded from worker threads, e.g. the MongoDB connection.
+
+    Attributes:
+        started (float): Clock time the report was created, i.e. process start.
+        phases (list[StartupPhase]): The finished phases.
+    """
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.started = clock()
+        self.phases = []
+
+    def elapsed(self):
+        """Seconds since the report was created."""
+        return self._clock() - self.started
+
+    def record(self, name, seconds):
+        """Adds a phase measured by the caller."""
+        phase = StartupPhase(name, seconds)
+        with self._lock:
+            self.phases.append(phase)
+        return phase
+
+    @contextmanager
+    def phase(self, name):
+        """Times the body of the ``with`` block as a phase, yielding its :class:`StartupPhase`."""
+        phase = StartupPhase(name)
+        started = self._clock()
+        try:
+            yield phase
+        finally:
+            phase.seconds = self._clock() - started
+            with self._lock:
+                self.phases.append(phase)
+
+    def format(self):
+        """Returns the report as printable lines, slowest phases first."""
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase.seconds, reverse=True)
+        width = max((len(phase.name) for phase in phases), default=0)
+        lines = [f"Startup report ({STARTUP_MODE} mode), ready after {self.elapsed() * 1000:.0f} ms:"]
+        lines += [f"  {phase.name:<{width}}  {phase.seconds * 1000:8.1f} ms" for phase in phases]
+        return "\n".join(lines)
+
+
+startup_report = StartupReport()
@@ -0,0 +1,98 @@
+"""
+Per-shard gateway telemetry.
+
+Counts events per shard in one-second buckets over a sliding window, so the
+current event rate of every shard can be reported without keeping the events
+themselves.
+"""
+import time
+from collections import defaultdict
+
+TELEMETRY_WINDOW = 60
+
+
+def shard_for_guild(guild_id, shard_count):
+    """Returns the shard that receives a guild's events, following Discord's sharding formula."""
+    return (guild_id >> 22) % shard_count if shard_count else 0
+
+
+class EventRate:
+    """
+    Events per second over a sliding window.
+
+    Attributes:
+        window (int): Length of the window in seconds.
+        total (int): Events recorded since creation.
+    """
+    __slots__ = ("window", "total", "_counts", "_seconds", "_clock")
+
+    def __init__(self, window=TELEMETRY_WINDOW, clock=time.monotonic):
+        self.window = window
+        self.total = 0
+        self._counts = [0] * window
+        self._seconds = [-1] * window
+        self._clock = clock
+
+    def record(self, count=1):
+        second = int(self._clock())
+        slot = second % self.window
+        if self._seconds[slot] != second:
+            self._seconds[slot] = second
+            self._counts[slot] = 0
+        self._counts[slot] += count
+        self.total += count
+
+    def rate(self):
+        """Returns the average events per second over the window."""
+        oldest = int(self._clock()) - self.window
+        recent = sum(count for count, second in zip(self._counts, self._seconds) if second > oldest)
+        return recent / self.window
+
+
+class ShardTelemetry:
+    """
+    Event rates and connection history for every shard of this process.
+
+    Attributes:
+        events (dict[int, dict[str, EventRate]]): shard ID -> event name -> rate.
+        connections (dict[int, dict[str, int]]): shard ID -> connect/disconnect/resume counts.
+    """
+    def __init__(self, window=TELEMETRY_WINDOW, clock=time.monotonic):
+        self._window = window
+        self._clock = clock
+        self.events = defaultdict(dict)
+        self.connections = defaultdict(lambda: {"connect": 0, "disconnect": 0, "resume": 0})
+
+    def record_event(self, shard_id, event):
+        rates = self.events[shard_id]
+        rate = rates.get(event)
+        if rate is None:
+            rate = rates[event] = EventRate(self._window, self._clock)
+        rate.record()
+
+    def record_connection(self, shard_id, kind):
+        self.connections[shard_id][kind] += 1
+
+    def snapshot(self, latencies):
+        """
+        Summarizes every shard.
+
+        Parameters:
+            latencies (Iterable[tuple[int, float]]): ``(shard_id, seconds)`` as given by
+                ``AutoShardedBot.latencies``.
+
+        Returns:
+            list[dict]: Per shard ``shard_id``, ``latency``, ``event_rate`` (events/s),
+            ``events`` (per-event rates) and ``connections``.
+        """
+        shards = []
+        for shard_id, latency in sorted(latencies):
+            rates = self.events.get(shard_id, {})
+            shards.append({
+                "shard_id": shard_id,
+                "latency": latency,
+                "event_rate": sum(rate.rate() for rate in rates.values()),
+                "events": {event: rate.rate() for event, rate in rates.items()},
+                "connections": dict(self.connections[shard_id]),
+            })
+        return shards
@@ -0,0 +1,213 @@
+"""
+Index bootstrap and schema report for the ``banking_bot`` database.
+
+Every hot query in :mod:`db` filters on a handful of fields, and without
+indexes each of them turns into a collection scan. :func:`ensure_indexes` is
+idempotent and runs at startup; the command line interface reports missing
+indexes and the query plans MongoDB picks for each :mod:`db` query.
+
+Usage:
+    python schema.py ensure     # Create any missing index
+    python schema.py report     # List indexes that are missing or differ
+    python schema.py explain    # Show the winning plan for each db.py query
+    python schema.py backfill-upi  # Assign UPI IDs to accounts that have none
+    python schema.py backfill-rollups [--since YYYY-MM-DD]  # Rebuild daily transaction rollups
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from db import backfill_upi_ids, db, rebuild_daily_rollups
+
+# Collection name -> indexes it must carry. Index names are fixed so that
+# re-running the bootstrap is a no-op instead of creating duplicates.
+INDEXES = {
+    "accounts": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        IndexModel([("branch_id", ASCENDING), ("balance", DESCENDING)], name="branch_id_balance"),
+        # Accounts without a UPI ID must not collide on a null key
+        IndexModel(
+            [("upi_id", ASCENDING)],
+            name="upi_id_unique",
+            unique=True,
+            partialFilterExpression={"upi_id": {"$type": "string"}}
+        ),
+    ],
+    "transactions": [
+        IndexModel(
+            [("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="user_id_timestamp_id"
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("type", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="user_id_type_timestamp_id"
+        ),
+    ],
+    # One document per user and day, upserted as transactions are written and the $merge target of the backfill
+    "daily_rollups": [
+        IndexModel([("user_id", ASCENDING), ("day", ASCENDING)], name="user_id_day_unique", unique=True),
+    ],
+    "branches": [
+        IndexModel([("branch_id", ASCENDING)], name="branch_id_unique", unique=True),
+    ],
+    "guild_commands": [
+        IndexModel([("guild_id", ASCENDING)], name="guild_id_unique", unique=True),
+    ],
+}
+
+# Query name (the db.py function issuing it) -> (collection, filter, sort).
+QUERIES = {
+    "get_account": ("accounts", {"user_id": "0"}, None),
+    "resolve_upi_id": ("accounts", {"upi_id": "0@quantumbank.0000"}, None),
+    "get_transactions": ("transactions", {"user_id": "0"}, [("timestamp", DESCENDING)]),
+    "get_transaction_page": (
+        "transactions", {"user_id": "0", "type": "send_upi_payment"}, [("timestamp", DESCENDING), ("_id", DESCENDING)]
+    ),
+    "get_transaction_summary": ("daily_rollups", {"user_id": "0", "day": {"$gte": datetime(2024, 1, 1)}}, [("day", ASCENDING)]),
+    "get_leaderboard": ("accounts", {"branch_id": "0"}, [("balance", DESCENDING)]),
+    "get_command_status": ("guild_commands", {"guild_id": 0}, None),
+}
+
+# Options that make two indexes on the same keys different from each other.
+_INDEX_OPTIONS = ("unique", "partialFilterExpression", "sparse", "expireAfterSeconds")
+
+
+def _describe(spec):
+    """Returns the key pattern and relevant options of an index document."""
+    return list(spec["key"].items()), {opt: spec[opt] for opt in _INDEX_OPTIONS if opt in spec}
+
+
+def ensure_indexes(database=db):
+    """
+    Creates every index in :data:`INDEXES` that does not exist yet.
+
+    Existing indexes with the same name and definition are left untouched,
+    so this is safe to run on every startup.
+
+    Returns:
+        list[str]: Human readable errors, one per index that could not be built
+        (for example a unique index over duplicated data). Empty on success.
+    """
+    errors = []
+    for collection_name, models in INDEXES.items():
+        collection = database[collection_name]
+        for model in models:
+            try:
+                collection.create_indexes([model])
+            except OperationFailure as e:
+                errors.append(f"{collection_name}.{model.document['name']}: {e.details.get('errmsg', e)}")
+    return errors
+
+
+def missing_indexes(database=db):
+    """
+    Compares the live indexes with :data:`INDEXES`.
+
+    Returns:
+        list[tuple[str, str, str]]: ``(collection, index name, problem)`` for each
+        index that is absent or whose definition differs from the expected one.
+    """
+    problems = []
+    for collection_name, models in INDEXES.items():
+        live = {spec["name"]: _describe(spec) for spec in database[collection_name].list_indexes()}
+        for model in models:
+            name = model.document["name"]
+            if name not in live:
+                problems.append((collection_name, name, "missing"))
+            elif live[name] != _describe(model.document):
+                problems.append((collection_name, name, "definition differs"))
+    return problems
+
+
+def _plan_stages(plan):
+    """Flattens a winning plan into its stage names, outermost first."""
+    stages = [plan["stage"]]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def explain_queries(database=db):
+    """
+    Runs ``explain()`` for every query in :data:`QUERIES`.
+
+    Returns:
+        dict[str, dict]: Query name -> winning plan stages, the index used (if any)
+        and the number of documents examined.
+    """
+    report = {}
+    for name, (collection_name, query, sort) in QUERIES.items():
+        cursor = database[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = cursor.explain()
+        plan = explanation["queryPlanner"]["winningPlan"]
+        # Sharded and newer servers nest the plan one level deeper
+        plan = plan.get("queryPlan", plan)
+        stats = explanation.get("executionStats", {})
+        report[name] = {
+            "stages": _plan_stages(plan),
+            "index": _find_index_name(plan),
+            "docs_examined": stats.get("totalDocsExamined"),
+        }
+    return report
+
+
+def _find_index_name(plan):
+    """Returns the name of the index scanned by a plan, or None for a collection scan."""
+    if "indexName" in plan:
+        return plan["indexName"]
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            name = _find_index_name(child)
+            if name:
+                return name
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage indexes of the banking_bot database.")
+    parser.add_argument("command", choices=["ensure", "report", "explain", "backfill-upi", "backfill-rollups"])
+    parser.add_argument("--since", type=lambda value: datetime.strptime(value, "%Y-%m-%d"), default=None,
+                        help="First day to rebuild with backfill-rollups (YYYY-MM-DD), default the whole history")
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill-upi":
+        print(f"Assigned UPI IDs to {backfill_upi_ids()} accounts.")
+        return 0
+
+    if args.command == "backfill-rollups":
+        print(f"Rebuilt {rebuild_daily_rollups(args.since)} daily rollups.")
+        return 0
+
+    if args.command == "ensure":
+        errors = ensure_indexes()
+        for error in errors:
+            print(f"Failed to create index {error}")
+        print("Indexes are up to date." if not errors else f"{len(errors)} index(es) could not be created.")
+        return 1 if errors else 0
+
+    if args.command == "report":
+        problems = missing_indexes()
+        for collection_name, name, problem in problems:
+            print(f"{collection_name}.{name}: {problem}")
+        if not problems:
+            print("All indexes are present.")
+        return 1 if problems else 0
+
+    exit_code = 0
+    for name, result in explain_queries().items():
+        scan = " -> ".join(result["stages"])
+        print(f"{name}: {scan} (index: {result['index'] or 'none'}, docs examined: {result['docs_examined']})")
+        if "COLLSCAN" in result["stages"]:
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
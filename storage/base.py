@@ -0,0 +1,226 @@
+"""
+Storage interface behind :mod:`db`.
+
+:mod:`db` owns the caches, leaderboards and validation; a backend only
+persists and queries documents. Documents are plain dicts with the same field
+names in every backend, transactions carry their backend-specific ID in
+``_id``. Backends are used from the database thread pool and must be thread
+safe.
+"""
+from datetime import datetime
+
+
+def rollup_day(timestamp):
+    """Returns the UTC midnight starting the day a transaction counts toward."""
+    return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+
+class DuplicateKey(Exception):
+    """Raised when a write would break a unique index, e.g. a UPI ID already in use."""
+
+
+class StorageBackend:
+    """
+    Persistence operations required by :mod:`db`.
+
+    Every method is blocking. Subclasses implement all of them.
+    """
+    name = None
+
+    # Accounts
+
+    def insert_account(self, document):
+        """Inserts an account, returning False if the user already has one."""
+        raise NotImplementedError
+
+    def find_account(self, user_id, fields):
+        """Returns the given fields of a user's account as a dict, or None."""
+        raise NotImplementedError
+
+    def iter_accounts(self, fields):
+        """Yields the given fields of every account."""
+        raise NotImplementedError
+
+    def set_balance(self, user_id, balance):
+        raise NotImplementedError
+
+    def set_account_branch(self, user_id, branch_id, branch_name):
+        """Moves an account to a branch, returning True if it changed."""
+        raise NotImplementedError
+
+    def top_accounts(self, branch_id, limit):
+        """Returns ``user_id``, ``username`` and ``balance`` of a branch's richest accounts, richest first."""
+        raise NotImplementedError
+
+    def transfer(self, sender_id, receiver_id, amount, sender_record, receiver_record):
+        """
+        Atomically debits the sender if their balance covers ``amount``, credits the
+        receiver and appends both ledger records, counting them in the daily rollups.
+
+        Returns:
+            tuple[float, float] | None: The new balances, or None if nothing was applied
+            because the sender's balance is too low or the receiver does not exist.
+        """
+        raise NotImplementedError
+
+    # UPI IDs
+
+    def assign_upi_id(self, user_id, upi_id):
+        """
+        Sets the UPI ID of an account that has none.
+
+        Returns:
+            bool: False if the account does not exist or already has a UPI ID.
+
+        Raises:
+            DuplicateKey: If another account already has this UPI ID.
+        """
+        raise NotImplementedError
+
+    def find_upi_owner(self, upi_id):
+        """Returns the user ID owning a UPI ID, or None."""
+        raise NotImplementedError
+
+    def accounts_without_upi_id(self):
+        """Returns the user IDs of accounts without a UPI ID."""
+        raise NotImplementedError
+
+    def assign_upi_ids(self, assignments):
+        """
+        Assigns ``(user_id, upi_id)`` pairs to accounts that have no UPI ID, skipping collisions.
+
+        Returns:
+            int: The number of accounts that received a UPI ID.
+        """
+        raise NotImplementedError
+
+    # Ledger
+
+    def insert_documents(self, batch):
+        """
+        Appends records, ``{collection: [documents]}``.
+
+        Documents are given an ``_id`` in place on their first attempt; documents
+        whose ``_id`` is already stored are skipped, so retrying a batch is safe.
+        Transactions are added to their user's daily rollup in the same write,
+        only when they are newly stored.
+        """
+        raise NotImplementedError
+
+    def recent_transactions(self, user_id, limit):
+        """Returns a user's latest transactions, newest first."""
+        raise NotImplementedError
+
+    def transaction_page(self, user_id, limit, before=None, after=None, txn_type=None, start=None, end=None):
+        """
+        Returns one keyset page of transactions, see :func:`db.get_transaction_page`.
+
+        Returns:
+            tuple[list[dict], bool]: The page newest first, and whether more transactions
+            exist beyond it in the paged direction.
+        """
+        raise NotImplementedError
+
+    def daily_rollups(self, user_id, start, end=None):
+        """
+        Returns a user's per-day transaction aggregates, oldest first.
+
+        Parameters:
+            user_id (str): The user.
+            start (datetime): First day, inclusive.
+            end (datetime | None): Last day, exclusive, or None for up to now.
+
+        Returns:
+            list[dict]: ``{"day": datetime, "types": {type: {"count": int, "amount": float}}}``.
+        """
+        raise NotImplementedError
+
+    def rebuild_daily_rollups(self, start=None):
+        """
+        Recomputes the daily rollups of every user from the transactions.
+
+        Parameters:
+            start (datetime | None): First day to rebuild, None for the whole history.
+
+        Returns:
+            int: The number of rollups (user-days) written.
+        """
+        raise NotImplementedError
+
+    # Branches
+
+    def find_branch(self, branch_id):
+        raise NotImplementedError
+
+    def branch_names(self):
+        """Returns ``{branch_id: name}`` of every recorded branch."""
+        raise NotImplementedError
+
+    def rename_branch(self, branch_id, name):
+        """
+        Records a branch's name and copies it to the branch's accounts.
+
+        Returns:
+            int: The number of accounts whose branch name changed.
+        """
+        raise NotImplementedError
+
+    # Interest
+
+    def branch_interest_rates(self):
+        """Returns ``{branch_id: rate}`` of branches with their own interest rate."""
+        raise NotImplementedError
+
+    def set_branch_interest_rate(self, branch_id, rate):
+        """Sets a branch's interest rate, None to fall back to the default rate."""
+        raise NotImplementedError
+
+    def interest_run(self, period):
+        """Returns the checkpoint of a period's interest run, or None if it never started."""
+        raise NotImplementedError
+
+    def unfinished_interest_runs(self):
+        """Returns the periods of interest runs that started but never completed, oldest first."""
+        raise NotImplementedError
+
+    def save_interest_run(self, period, fields):
+        """Creates or updates fields of a period's interest run checkpoint."""
+        raise NotImplementedError
+
+    def accrue_interest_batch(self, period, after, limit, rates, default_rate):
+        """
+        Applies interest to the next ``limit`` accounts in storage key order after ``after``.
+
+        Positive balances are multiplied by ``1 + rate`` of their branch (or the
+        default rate) and rounded to cents. In one atomic step, one summary record
+        is appended to the ``interest_ledger`` and the run's checkpoint advances
+        past the batch, so a crashed run resumes without applying a batch twice.
+
+        Parameters:
+            period (str): The run being processed.
+            after: Storage key of the last processed account, None to start at the beginning.
+            limit (int): Accounts per batch.
+            rates (dict[str, float]): Per-branch rates.
+            default_rate (float): Rate of every other branch.
+
+        Returns:
+            tuple | None: ``(last_key, accounts, interest)`` of the batch, or None when
+            no accounts are left.
+        """
+        raise NotImplementedError
+
+    # Command settings
+
+    def all_command_settings(self):
+        """Returns ``{guild_id: {command: enabled}}`` of every guild with stored settings."""
+        raise NotImplementedError
+
+    def guild_command_settings(self, guild_id):
+        """Returns ``{command: enabled}`` of a guild, or None if it has no stored settings."""
+        raise NotImplementedError
+
+    def set_command_status(self, guild_id, command_name, status):
+        raise NotImplementedError
+
+    def close(self):
+        """Releases connections and files."""
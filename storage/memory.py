@@ -0,0 +1,297 @@
+"""
+In-process storage backend.
+
+Everything lives in dicts guarded by one lock, with the same indexes the
+MongoDB schema declares: unique user IDs and UPI IDs, accounts by branch, and
+each user's transactions ordered by ``(timestamp, _id)``. Nothing is
+persisted, which makes it suitable for tests, benchmarks and throwaway shards.
+"""
+import copy
+import heapq
+import itertools
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime
+
+from storage.base import DuplicateKey, StorageBackend, rollup_day
+
+
+def _project(document, fields):
+    return {field: document.get(field) for field in fields if field in document}
+
+
+class MemoryStorage(StorageBackend):
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._accounts = {}  # user_id -> document
+        self._account_order = []  # user_ids in insertion order, the key order of interest batches
+        self._upi_owners = {}  # upi_id -> user_id
+        self._branch_members = defaultdict(set)  # branch_id -> {user_id}
+        self._transactions = {}  # _id -> document
+        self._transaction_keys = defaultdict(list)  # user_id -> sorted [(timestamp, _id)]
+        self._rollups = defaultdict(dict)  # user_id -> {day: {type: {"count", "amount"}}}
+        self._records = defaultdict(dict)  # other collections: name -> {_id: document}
+        self._branches = {}  # branch_id -> document
+        self._command_settings = {}  # guild_id -> {command: enabled}
+        self._interest_runs = {}  # period -> checkpoint
+
+    def insert_account(self, document):
+        with self._lock:
+            if document["user_id"] in self._accounts:
+                return False
+            upi_id = document.get("upi_id")
+            if upi_id is not None and upi_id in self._upi_owners:
+                raise DuplicateKey(upi_id)
+            account = dict(document)
+            self._accounts[account["user_id"]] = account
+            self._account_order.append(account["user_id"])
+            self._branch_members[account.get("branch_id")].add(account["user_id"])
+            if upi_id is not None:
+                self._upi_owners[upi_id] = account["user_id"]
+            return True
+
+    def find_account(self, user_id, fields):
+        with self._lock:
+            account = self._accounts.get(user_id)
+            return _project(account, fields) if account is not None else None
+
+    def iter_accounts(self, fields):
+        with self._lock:
+            return [_project(account, fields) for account in self._accounts.values()]
+
+    def set_balance(self, user_id, balance):
+        with self._lock:
+            account = self._accounts.get(user_id)
+            if account is not None:
+                account["balance"] = balance
+
+    def set_account_branch(self, user_id, branch_id, branch_name):
+        with self._lock:
+            account = self._accounts.get(user_id)
+            if account is None or (account.get("branch_id"), account.get("branch_name")) == (branch_id, branch_name):
+                return False
+            self._branch_members[account.get("branch_id")].discard(user_id)
+            self._branch_members[branch_id].add(user_id)
+            account["branch_id"] = branch_id
+            account["branch_name"] = branch_name
+            return True
+
+    def top_accounts(self, branch_id, limit):
+        with self._lock:
+            members = (self._accounts[user_id] for user_id in self._branch_members.get(branch_id, ()))
+            top = heapq.nlargest(limit, members, key=lambda account: account.get("balance") or 0)
+            return [_project(account, ("user_id", "username", "balance")) for account in top]
+
+    def transfer(self, sender_id, receiver_id, amount, sender_record, receiver_record):
+        with self._lock:
+            sender = self._accounts.get(sender_id)
+            receiver = self._accounts.get(receiver_id)
+            if sender is None or receiver is None or sender["balance"] < amount:
+                return None
+            sender["balance"] -= amount
+            receiver["balance"] += amount
+            self._insert_transaction(sender_record)
+            self._insert_transaction(receiver_record)
+            return sender["balance"], receiver["balance"]
+
+    def assign_upi_id(self, user_id, upi_id):
+        with self._lock:
+            account = self._accounts.get(user_id)
+            if account is None or isinstance(account.get("upi_id"), str):
+                return False
+            if upi_id in self._upi_owners:
+                raise DuplicateKey(upi_id)
+            account["upi_id"] = upi_id
+            self._upi_owners[upi_id] = user_id
+            return True
+
+    def find_upi_owner(self, upi_id):
+        with self._lock:
+            return self._upi_owners.get(upi_id)
+
+    def accounts_without_upi_id(self):
+        with self._lock:
+            return [user_id for user_id, account in self._accounts.items() if not isinstance(account.get("upi_id"), str)]
+
+    def assign_upi_ids(self, assignments):
+        assigned = 0
+        for user_id, upi_id in assignments:
+            try:
+                assigned += self.assign_upi_id(user_id, upi_id)
+            except DuplicateKey:
+                continue
+        return assigned
+
+    def _insert_transaction(self, document):
+        """Stores a transaction, indexes it and counts it in its rollup. The lock must be held."""
+        if "_id" not in document:
+            document["_id"] = next(self._ids)
+        elif document["_id"] in self._transactions:
+            return
+        self._transactions[document["_id"]] = copy.copy(document)
+        insort(self._transaction_keys[document["user_id"]], (document["timestamp"], document["_id"]))
+        self._add_to_rollup(document)
+
+    def _add_to_rollup(self, document):
+        day = self._rollups[document["user_id"]].setdefault(rollup_day(document["timestamp"]), {})
+        totals = day.setdefault(document.get("type"), {"count": 0, "amount": 0})
+        totals["count"] += 1
+        totals["amount"] += document.get("amount") or 0
+
+    def insert_documents(self, batch):
+        with self._lock:
+            for collection_name, documents in batch.items():
+                for document in documents:
+                    if collection_name == "transactions":
+                        self._insert_transaction(document)
+                        continue
+                    if "_id" not in document:
+                        document["_id"] = next(self._ids)
+                    self._records[collection_name].setdefault(document["_id"], copy.copy(document))
+
+    def recent_transactions(self, user_id, limit):
+        with self._lock:
+            keys = self._transaction_keys.get(user_id, [])
+            return [copy.copy(self._transactions[_id]) for _, _id in reversed(keys[-limit:])]
+
+    def transaction_page(self, user_id, limit, before=None, after=None, txn_type=None, start=None, end=None):
+        with self._lock:
+            keys = self._transaction_keys.get(user_id, [])
+            # Narrow the sorted keys to the requested window with binary searches
+            low, high = 0, len(keys)
+            if start:
+                low = bisect_left(keys, (start,))
+            if end:
+                high = bisect_left(keys, (end,))
+            if before:
+                high = min(high, bisect_left(keys, tuple(before)))
+            elif after:
+                low = max(low, bisect_right(keys, tuple(after)))
+
+            positions = range(low, high) if after else range(high - 1, low - 1, -1)
+            page = []
+            for position in positions:
+                document = self._transactions[keys[position][1]]
+                if txn_type and document.get("type") != txn_type:
+                    continue
+                page.append(copy.copy(document))
+                if len(page) > limit:
+                    break
+
+        has_more = len(page) > limit
+        page = page[:limit]
+        if after:
+            page.reverse()
+        return page, has_more
+
+    def daily_rollups(self, user_id, start, end=None):
+        with self._lock:
+            days = self._rollups.get(user_id, {})
+            return [
+                {"day": day, "types": copy.deepcopy(days[day])}
+                for day in sorted(days) if day >= start and (end is None or day < end)
+            ]
+
+    def rebuild_daily_rollups(self, start=None):
+        start = rollup_day(start) if start is not None else None
+        with self._lock:
+            for days in self._rollups.values():
+                for day in [day for day in days if start is None or day >= start]:
+                    del days[day]
+            written = set()
+            for document in self._transactions.values():
+                if start is None or document["timestamp"] >= start:
+                    self._add_to_rollup(document)
+                    written.add((document["user_id"], rollup_day(document["timestamp"])))
+            return len(written)
+
+    def find_branch(self, branch_id):
+        with self._lock:
+            branch = self._branches.get(branch_id)
+            return dict(branch) if branch is not None else None
+
+    def branch_names(self):
+        with self._lock:
+            return {branch_id: branch.get("name") for branch_id, branch in self._branches.items()}
+
+    def rename_branch(self, branch_id, name):
+        with self._lock:
+            branch = self._branches.setdefault(branch_id, {"branch_id": branch_id})
+            branch.update(name=name, updated_at=datetime.utcnow())
+            renamed = 0
+            for user_id in self._branch_members.get(branch_id, ()):
+                account = self._accounts[user_id]
+                if account.get("branch_name") != name:
+                    account["branch_name"] = name
+                    renamed += 1
+            return renamed
+
+    def branch_interest_rates(self):
+        with self._lock:
+            return {
+                branch_id: branch["interest_rate"] for branch_id, branch in self._branches.items()
+                if branch.get("interest_rate") is not None
+            }
+
+    def set_branch_interest_rate(self, branch_id, rate):
+        with self._lock:
+            self._branches.setdefault(branch_id, {"branch_id": branch_id})["interest_rate"] = rate
+
+    def interest_run(self, period):
+        with self._lock:
+            run = self._interest_runs.get(period)
+            return copy.deepcopy(run) if run is not None else None
+
+    def unfinished_interest_runs(self):
+        with self._lock:
+            return sorted(period for period, run in self._interest_runs.items() if run.get("status") == "running")
+
+    def save_interest_run(self, period, fields):
+        with self._lock:
+            self._interest_runs.setdefault(period, {"period": period}).update(copy.deepcopy(fields))
+
+    def accrue_interest_batch(self, period, after, limit, rates, default_rate):
+        with self._lock:
+            # Keys are positions in the insertion order, accounts are never removed
+            start = 0 if after is None else after
+            user_ids = self._account_order[start:start + limit]
+            if not user_ids:
+                return None
+            interest, updated = 0.0, 0
+            for user_id in user_ids:
+                account = self._accounts[user_id]
+                balance = account.get("balance") or 0
+                if balance <= 0:
+                    continue
+                new_balance = round(balance * (1 + rates.get(account.get("branch_id"), default_rate)), 2)
+                interest += new_balance - balance
+                account["balance"] = new_balance
+                updated += 1
+            last_key = start + len(user_ids)
+            self.insert_documents({"interest_ledger": [{
+                "period": period, "first_key": start, "last_key": last_key, "accounts": len(user_ids),
+                "updated": updated, "interest": round(interest, 2), "timestamp": datetime.utcnow(),
+            }]})
+            run = self._interest_runs.setdefault(period, {"period": period})
+            run["after"] = last_key
+            run["accounts"] = run.get("accounts", 0) + len(user_ids)
+            run["interest"] = round(run.get("interest", 0.0) + interest, 2)
+            run["batches"] = run.get("batches", 0) + 1
+            return last_key, len(user_ids), round(interest, 2)
+
+    def all_command_settings(self):
+        with self._lock:
+            return {guild_id: dict(settings) for guild_id, settings in self._command_settings.items()}
+
+    def guild_command_settings(self, guild_id):
+        with self._lock:
+            settings = self._command_settings.get(guild_id)
+            return dict(settings) if settings is not None else None
+
+    def set_command_status(self, guild_id, command_name, status):
+        with self._lock:
+            self._command_settings.setdefault(guild_id, {})[command_name] = status
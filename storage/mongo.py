@@ -0,0 +1,413 @@
+"""
+MongoDB storage backend, the production default.
+
+Indexes are managed by :mod:`schema`. Transfers, transaction ledger flushes
+with their daily rollups and interest batches run in multi-document
+transactions and therefore need a replica set or a sharded cluster; a
+single-node replica set (``mongod --replSet rs0`` then ``rs.initiate()``) is
+enough. :meth:`MongoStorage.require_transactions` checks this at startup.
+"""
+from datetime import datetime
+
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from resources.mongo_metrics import MongoCommandTimings
+from storage.base import DuplicateKey, StorageBackend, rollup_day
+
+# Matches accounts whose UPI ID is missing or null
+_WITHOUT_UPI_ID = {"upi_id": {"$not": {"$type": "string"}}}
+
+
+class _TransferAborted(Exception):
+    """Raised inside a transfer transaction to roll it back."""
+
+
+def _projection(fields):
+    return {"_id": 0, **{field: 1 for field in fields}}
+
+
+def _rollup_updates(transactions):
+    """One upsert per user-day adding the transactions' counts and sums per type."""
+    increments = {}
+    for document in transactions:
+        key = (document["user_id"], rollup_day(document["timestamp"]))
+        inc = increments.setdefault(key, {})
+        prefix = f"types.{document.get('type')}"
+        inc[f"{prefix}.count"] = inc.get(f"{prefix}.count", 0) + 1
+        inc[f"{prefix}.amount"] = inc.get(f"{prefix}.amount", 0) + (document.get("amount") or 0)
+    return [
+        UpdateOne({"user_id": user_id, "day": day}, {"$inc": inc}, upsert=True)
+        for (user_id, day), inc in increments.items()
+    ]
+
+
+class MongoStorage(StorageBackend):
+    """
+    Stores every collection in one MongoDB database.
+
+    Attributes:
+        client (pymongo.MongoClient): The connection pool.
+        db (pymongo.database.Database): The bot's database.
+    """
+    name = "mongo"
+
+    def __init__(self, uri, database_name):
+        self.client = MongoClient(uri, event_listeners=[MongoCommandTimings()])
+        self.db = self.client.get_database(database_name)
+
+    def require_transactions(self):
+        """
+        Fails fast when the server cannot run multi-document transactions.
+
+        Raises:
+            RuntimeError: If MONGO_URI points at a standalone mongod.
+        """
+        hello = self.client.admin.command("hello")
+        # Replica set members report their set name, mongos routers identify as isdbgrid
+        if "setName" not in hello and hello.get("msg") != "isdbgrid":
+            raise RuntimeError(
+                "MongoDB at MONGO_URI is a standalone server, but transfers, ledger flushes and interest runs "
+                "need multi-document transactions. Run it as a replica set (a single node is enough: start "
+                "mongod with --replSet rs0 and run rs.initiate()) or use STORAGE_BACKEND=sqlite."
+            )
+
+    def insert_account(self, document):
+        # The unique user_id index rejects duplicates, no existence check round-trip needed
+        try:
+            self.db["accounts"].insert_one(dict(document))
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def find_account(self, user_id, fields):
+        return self.db["accounts"].find_one({"user_id": user_id}, _projection(fields))
+
+    def iter_accounts(self, fields):
+        return self.db["accounts"].find({}, _projection(fields))
+
+    def set_balance(self, user_id, balance):
+        self.db["accounts"].update_one({"user_id": user_id}, {"$set": {"balance": balance}})
+
+    def set_account_branch(self, user_id, branch_id, branch_name):
+        result = self.db["accounts"].update_one(
+            {"user_id": user_id},
+            {"$set": {"branch_id": branch_id, "branch_name": branch_name}}
+        )
+        return result.modified_count > 0
+
+    def top_accounts(self, branch_id, limit):
+        cursor = self.db["accounts"].find(
+            {"branch_id": branch_id}, {"_id": 0, "user_id": 1, "username": 1, "balance": 1}
+        ).sort("balance", -1).limit(limit)
+        return list(cursor)
+
+    def transfer(self, sender_id, receiver_id, amount, sender_record, receiver_record):
+        """
+        The debit is guarded by a ``balance >= amount`` filter and applied with
+        ``$inc``, so concurrent payments can never overdraw an account or lose an
+        update. The credit and both ledger entries are written in the same
+        multi-document transaction, so either everything is applied or nothing is.
+        """
+        accounts_collection = self.db["accounts"]
+        transactions_collection = self.db["transactions"]
+
+        def apply_transfer(session):
+            sender = accounts_collection.find_one_and_update(
+                {"user_id": sender_id, "balance": {"$gte": amount}},
+                {"$inc": {"balance": -amount}},
+                projection={"_id": 0, "balance": 1},
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+            if sender is None:
+                raise _TransferAborted()
+
+            receiver = accounts_collection.find_one_and_update(
+                {"user_id": receiver_id},
+                {"$inc": {"balance": amount}},
+                projection={"_id": 0, "balance": 1},
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+            if receiver is None:
+                raise _TransferAborted()
+
+            transactions_collection.insert_many([sender_record, receiver_record], session=session)
+            self.db["daily_rollups"].bulk_write(_rollup_updates([sender_record, receiver_record]), session=session)
+            return sender["balance"], receiver["balance"]
+
+        with self.client.start_session() as session:
+            try:
+                return session.with_transaction(apply_transfer)
+            except _TransferAborted:
+                return None
+
+    def assign_upi_id(self, user_id, upi_id):
+        try:
+            result = self.db["accounts"].update_one(
+                {"user_id": user_id, **_WITHOUT_UPI_ID}, {"$set": {"upi_id": upi_id}}
+            )
+        except DuplicateKeyError as e:
+            raise DuplicateKey(upi_id) from e
+        return result.matched_count > 0
+
+    def find_upi_owner(self, upi_id):
+        document = self.db["accounts"].find_one({"upi_id": upi_id}, {"_id": 0, "user_id": 1})
+        return document["user_id"] if document else None
+
+    def accounts_without_upi_id(self):
+        return [
+            document["user_id"]
+            for document in self.db["accounts"].find(_WITHOUT_UPI_ID, {"_id": 0, "user_id": 1})
+        ]
+
+    def assign_upi_ids(self, assignments):
+        operations = [
+            UpdateOne({"user_id": user_id, **_WITHOUT_UPI_ID}, {"$set": {"upi_id": upi_id}})
+            for user_id, upi_id in assignments
+        ]
+        if not operations:
+            return 0
+        try:
+            return self.db["accounts"].bulk_write(operations, ordered=False).modified_count
+        except BulkWriteError as e:
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+            # Collided accounts keep no UPI ID and are picked up by the next round
+            return e.details["nModified"]
+
+    def insert_documents(self, batch):
+        """
+        One unordered ``insert_many`` per collection. Documents already carrying an
+        ``_id`` from a previous, partially applied attempt are rejected by MongoDB as
+        duplicates, which is ignored.
+
+        Transactions and their rollup increments are written in one multi-document
+        transaction instead, after dropping the ones a previous attempt already stored.
+        """
+        for collection_name, documents in batch.items():
+            if collection_name == "transactions":
+                self._insert_transactions(documents)
+                continue
+            try:
+                self.db[collection_name].insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]) or e.details.get("writeConcernErrors"):
+                    raise
+
+    def _insert_transactions(self, documents):
+        transactions_collection = self.db["transactions"]
+
+        def apply_batch(session):
+            ids = [document["_id"] for document in documents if "_id" in document]
+            stored = {
+                document["_id"] for document in
+                transactions_collection.find({"_id": {"$in": ids}}, {"_id": 1}, session=session)
+            } if ids else set()
+            new = [document for document in documents if document.get("_id") not in stored]
+            if new:
+                transactions_collection.insert_many(new, session=session)
+                self.db["daily_rollups"].bulk_write(_rollup_updates(new), session=session)
+
+        with self.client.start_session() as session:
+            session.with_transaction(apply_batch)
+
+    def recent_transactions(self, user_id, limit):
+        return list(self.db["transactions"].find({"user_id": user_id}).sort("timestamp", -1).limit(limit))
+
+    def transaction_page(self, user_id, limit, before=None, after=None, txn_type=None, start=None, end=None):
+        conditions = [{"user_id": user_id}]
+        if txn_type:
+            conditions.append({"type": txn_type})
+        if start or end:
+            time_range = {}
+            if start:
+                time_range["$gte"] = start
+            if end:
+                time_range["$lt"] = end
+            conditions.append({"timestamp": time_range})
+
+        direction = -1
+        if before:
+            timestamp, object_id = before
+            conditions.append({"$or": [
+                {"timestamp": {"$lt": timestamp}},
+                {"timestamp": timestamp, "_id": {"$lt": object_id}}
+            ]})
+        elif after:
+            timestamp, object_id = after
+            conditions.append({"$or": [
+                {"timestamp": {"$gt": timestamp}},
+                {"timestamp": timestamp, "_id": {"$gt": object_id}}
+            ]})
+            # Walk forward in time from the cursor, then flip back to newest first
+            direction = 1
+
+        query = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+        documents = list(
+            self.db["transactions"].find(query)
+            .sort([("timestamp", direction), ("_id", direction)])
+            .limit(limit + 1)
+        )
+        has_more = len(documents) > limit
+        documents = documents[:limit]
+        if direction == 1:
+            documents.reverse()
+        return documents, has_more
+
+    def daily_rollups(self, user_id, start, end=None):
+        day_range = {"$gte": start}
+        if end is not None:
+            day_range["$lt"] = end
+        return list(
+            self.db["daily_rollups"].find({"user_id": user_id, "day": day_range}, {"_id": 0, "day": 1, "types": 1})
+            .sort("day", 1)
+        )
+
+    def rebuild_daily_rollups(self, start=None):
+        """
+        Groups the transactions by user, day and type on the server and
+        ``$merge``s the result over the existing rollups, replacing each rebuilt
+        user-day. Every written rollup is stamped with the rebuild's
+        ``rebuilt_at``, which counts them afterwards. Needs MongoDB 5.0 for
+        ``$dateTrunc`` and the unique ``(user_id, day)`` index from :mod:`schema`
+        for ``$merge``.
+        """
+        # BSON dates have millisecond precision, the stamp must survive the round-trip unchanged
+        now = datetime.utcnow()
+        rebuilt_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        pipeline = [{"$match": {"timestamp": {"$gte": rollup_day(start)}}}] if start is not None else []
+        pipeline += [
+            {"$group": {
+                "_id": {
+                    "user_id": "$user_id",
+                    "day": {"$dateTrunc": {"date": "$timestamp", "unit": "day"}},
+                    "type": "$type",
+                },
+                "count": {"$sum": 1},
+                "amount": {"$sum": "$amount"},
+            }},
+            {"$group": {
+                "_id": {"user_id": "$_id.user_id", "day": "$_id.day"},
+                "types": {"$push": {"k": "$_id.type", "v": {"count": "$count", "amount": "$amount"}}},
+            }},
+            {"$project": {
+                "_id": 0, "user_id": "$_id.user_id", "day": "$_id.day", "types": {"$arrayToObject": "$types"},
+                "rebuilt_at": {"$literal": rebuilt_at},
+            }},
+            {"$merge": {"into": "daily_rollups", "on": ["user_id", "day"], "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ]
+        self.db["transactions"].aggregate(pipeline, allowDiskUse=True)
+        return self.db["daily_rollups"].count_documents({"rebuilt_at": rebuilt_at})
+
+    def find_branch(self, branch_id):
+        return self.db["branches"].find_one({"branch_id": branch_id}, {"_id": 0})
+
+    def branch_names(self):
+        return {branch["branch_id"]: branch.get("name") for branch in self.db["branches"].find({}, {"_id": 0})}
+
+    def rename_branch(self, branch_id, name):
+        self.db["branches"].update_one(
+            {"branch_id": branch_id},
+            {"$set": {"name": name, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        # Accounts are matched by branch_id, one update_many however many accounts the branch has
+        result = self.db["accounts"].update_many(
+            {"branch_id": branch_id, "branch_name": {"$ne": name}},
+            {"$set": {"branch_name": name}}
+        )
+        return result.modified_count
+
+    def branch_interest_rates(self):
+        return {
+            branch["branch_id"]: branch["interest_rate"]
+            for branch in self.db["branches"].find({"interest_rate": {"$ne": None}}, {"_id": 0, "branch_id": 1, "interest_rate": 1})
+        }
+
+    def set_branch_interest_rate(self, branch_id, rate):
+        self.db["branches"].update_one({"branch_id": branch_id}, {"$set": {"interest_rate": rate}}, upsert=True)
+
+    def interest_run(self, period):
+        run = self.db["interest_runs"].find_one({"_id": period})
+        if run is not None:
+            run["period"] = run.pop("_id")
+        return run
+
+    def unfinished_interest_runs(self):
+        return [run["_id"] for run in self.db["interest_runs"].find({"status": "running"}, {"_id": 1}).sort("_id", 1)]
+
+    def save_interest_run(self, period, fields):
+        self.db["interest_runs"].update_one({"_id": period}, {"$set": fields}, upsert=True)
+
+    def accrue_interest_batch(self, period, after, limit, rates, default_rate):
+        """
+        The batch is the ``_id`` range up to the ``limit``-th account past the
+        checkpoint. One pipeline ``update_many`` picks each account's rate with a
+        ``$switch`` on its branch, so the balances never leave the server. The
+        update, the ledger summary and the checkpoint share one transaction.
+        """
+        accounts_collection = self.db["accounts"]
+        factor = {"$switch": {
+            "branches": [{"case": {"$eq": ["$branch_id", branch_id]}, "then": 1 + rate} for branch_id, rate in rates.items()],
+            "default": 1 + default_rate,
+        }} if rates else 1 + default_rate
+
+        def total(key_range, session):
+            result = list(accounts_collection.aggregate(
+                [{"$match": key_range}, {"$group": {"_id": None, "balance": {"$sum": "$balance"}}}], session=session
+            ))
+            return result[0]["balance"] if result else 0
+
+        def apply_batch(session):
+            after_filter = {"_id": {"$gt": after}} if after is not None else {}
+            ids = [
+                document["_id"] for document in
+                accounts_collection.find(after_filter, {"_id": 1}, session=session).sort("_id", 1).limit(limit)
+            ]
+            if not ids:
+                return None
+            key_range = {"_id": {**after_filter.get("_id", {}), "$lte": ids[-1]}}
+
+            before = total(key_range, session)
+            result = accounts_collection.update_many(
+                {**key_range, "balance": {"$gt": 0}},
+                [{"$set": {"balance": {"$round": [{"$multiply": ["$balance", factor]}, 2]}}}],
+                session=session
+            )
+            interest = round(total(key_range, session) - before, 2)
+
+            self.db["interest_ledger"].insert_one({
+                "period": period, "first_key": after, "last_key": ids[-1], "accounts": len(ids),
+                "updated": result.modified_count, "interest": interest, "timestamp": datetime.utcnow(),
+            }, session=session)
+            self.db["interest_runs"].update_one(
+                {"_id": period},
+                {"$set": {"after": ids[-1]}, "$inc": {"accounts": len(ids), "interest": interest, "batches": 1}},
+                upsert=True,
+                session=session
+            )
+            return ids[-1], len(ids), interest
+
+        with self.client.start_session() as session:
+            return session.with_transaction(apply_batch)
+
+    def all_command_settings(self):
+        settings = {}
+        for guild_commands in self.db["guild_commands"].find({}, {"_id": 0}):
+            settings[guild_commands.pop("guild_id")] = guild_commands
+        return settings
+
+    def guild_command_settings(self, guild_id):
+        return self.db["guild_commands"].find_one({"guild_id": guild_id}, {"_id": 0, "guild_id": 0})
+
+    def set_command_status(self, guild_id, command_name, status):
+        self.db["guild_commands"].update_one(
+            {"guild_id": guild_id},
+            {"$set": {command_name: status}},
+            upsert=True
+        )
+
+    def close(self):
+        self.client.close()
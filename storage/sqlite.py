@@ -0,0 +1,486 @@
+"""
+SQLite storage backend for small single-node deployments.
+
+The database runs in WAL mode, so readers on the database thread pool never
+wait for the single writer, and each thread keeps its own connection. Tables
+and indexes mirror the MongoDB schema, with ``(timestamp, id)`` ordered
+transaction indexes for keyset pagination.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from storage.base import DuplicateKey, StorageBackend, rollup_day
+
+ACCOUNT_FIELDS = ("user_id", "username", "branch_id", "branch_name", "balance", "upi_id", "created_at")
+TRANSACTION_FIELDS = ("_id", "user_id", "type", "amount", "receiver_id", "timestamp")
+
+# Columns without a declared type keep Python's int/str as given, like MongoDB does
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    user_id TEXT PRIMARY KEY,
+    username TEXT,
+    branch_id,
+    branch_name TEXT,
+    balance REAL NOT NULL DEFAULT 0,
+    upi_id TEXT UNIQUE,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS accounts_branch_id_balance ON accounts (branch_id, balance DESC);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    type TEXT,
+    amount REAL,
+    receiver_id TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_user_id_timestamp_id ON transactions (user_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS transactions_user_id_type_timestamp_id ON transactions (user_id, type, timestamp DESC, id DESC);
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    PRIMARY KEY (user_id, day, type)
+);
+CREATE TABLE IF NOT EXISTS records (
+    collection TEXT NOT NULL,
+    id INTEGER PRIMARY KEY,
+    document TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS branches (
+    branch_id PRIMARY KEY,
+    name TEXT,
+    updated_at TEXT,
+    interest_rate REAL
+);
+CREATE TABLE IF NOT EXISTS interest_runs (
+    period TEXT PRIMARY KEY,
+    document TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS guild_commands (
+    guild_id NOT NULL,
+    command TEXT NOT NULL,
+    enabled INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, command)
+);
+"""
+
+
+def _to_text(value):
+    """Datetimes are stored as fixed-width ISO text, which sorts chronologically."""
+    return value.isoformat(sep=" ", timespec="microseconds") if isinstance(value, datetime) else value
+
+
+def _from_text(value):
+    return datetime.fromisoformat(value) if value else value
+
+
+def _account(row, fields):
+    document = dict(zip(fields, row))
+    if "created_at" in document:
+        document["created_at"] = _from_text(document["created_at"])
+    return document
+
+
+def _transaction_document(row):
+    document = dict(zip(TRANSACTION_FIELDS, row))
+    document["timestamp"] = _from_text(document["timestamp"])
+    return document
+
+
+def _run_document(text):
+    document = json.loads(text)
+    for field in ("started_at", "completed_at"):
+        if document.get(field):
+            document[field] = _from_text(document[field])
+    return document
+
+
+def _columns(fields):
+    unknown = set(fields) - set(ACCOUNT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown account fields: {', '.join(sorted(unknown))}")
+    return ", ".join(fields)
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    Stores everything in one SQLite file.
+
+    Attributes:
+        path (str): The database file.
+    """
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._connection.executescript(SCHEMA)
+
+    @property
+    def _connection(self):
+        """The calling thread's connection, opened on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode, multi-statement writes open their own transactions
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _write(self):
+        """Returns a context manager running a write transaction on this thread's connection."""
+        return _WriteTransaction(self._connection)
+
+    def insert_account(self, document):
+        values = [_to_text(document.get(field)) for field in ACCOUNT_FIELDS]
+        try:
+            with self._write() as connection:
+                connection.execute(
+                    f"INSERT INTO accounts ({', '.join(ACCOUNT_FIELDS)}) VALUES ({', '.join('?' * len(ACCOUNT_FIELDS))})",
+                    values
+                )
+        except sqlite3.IntegrityError as e:
+            if "accounts.upi_id" in str(e):
+                raise DuplicateKey(document.get("upi_id")) from e
+            return False
+        return True
+
+    def find_account(self, user_id, fields):
+        row = self._connection.execute(
+            f"SELECT {_columns(fields)} FROM accounts WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return _account(row, fields) if row else None
+
+    def iter_accounts(self, fields):
+        cursor = self._connection.execute(f"SELECT {_columns(fields)} FROM accounts")
+        return [_account(row, fields) for row in cursor]
+
+    def set_balance(self, user_id, balance):
+        self._connection.execute("UPDATE accounts SET balance = ? WHERE user_id = ?", (balance, user_id))
+
+    def set_account_branch(self, user_id, branch_id, branch_name):
+        cursor = self._connection.execute(
+            "UPDATE accounts SET branch_id = ?, branch_name = ? "
+            "WHERE user_id = ? AND (branch_id IS NOT ? OR branch_name IS NOT ?)",
+            (branch_id, branch_name, user_id, branch_id, branch_name)
+        )
+        return cursor.rowcount > 0
+
+    def top_accounts(self, branch_id, limit):
+        fields = ("user_id", "username", "balance")
+        cursor = self._connection.execute(
+            "SELECT user_id, username, balance FROM accounts WHERE branch_id = ? ORDER BY balance DESC LIMIT ?",
+            (branch_id, limit)
+        )
+        return [_account(row, fields) for row in cursor]
+
+    def transfer(self, sender_id, receiver_id, amount, sender_record, receiver_record):
+        with self._write() as transaction:
+            # The balance guard makes the debit a no-op instead of an overdraft
+            debited = transaction.execute(
+                "UPDATE accounts SET balance = balance - ? WHERE user_id = ? AND balance >= ?",
+                (amount, sender_id, amount)
+            ).rowcount
+            credited = debited and transaction.execute(
+                "UPDATE accounts SET balance = balance + ? WHERE user_id = ?", (amount, receiver_id)
+            ).rowcount
+            if not credited:
+                transaction.rollback_requested = True
+                return None
+            self._insert_transactions(transaction, [sender_record, receiver_record])
+            balances = dict(transaction.execute(
+                "SELECT user_id, balance FROM accounts WHERE user_id IN (?, ?)", (sender_id, receiver_id)
+            ).fetchall())
+        return balances[sender_id], balances[receiver_id]
+
+    def assign_upi_id(self, user_id, upi_id):
+        try:
+            cursor = self._connection.execute(
+                "UPDATE accounts SET upi_id = ? WHERE user_id = ? AND upi_id IS NULL", (upi_id, user_id)
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKey(upi_id) from e
+        return cursor.rowcount > 0
+
+    def find_upi_owner(self, upi_id):
+        row = self._connection.execute("SELECT user_id FROM accounts WHERE upi_id = ?", (upi_id,)).fetchone()
+        return row[0] if row else None
+
+    def accounts_without_upi_id(self):
+        return [row[0] for row in self._connection.execute("SELECT user_id FROM accounts WHERE upi_id IS NULL")]
+
+    def assign_upi_ids(self, assignments):
+        assigned = 0
+        with self._write() as connection:
+            for user_id, upi_id in assignments:
+                # OR IGNORE skips collisions, which keep no UPI ID for the next round
+                assigned += connection.execute(
+                    "UPDATE OR IGNORE accounts SET upi_id = ? WHERE user_id = ? AND upi_id IS NULL", (upi_id, user_id)
+                ).rowcount
+        return assigned
+
+    @staticmethod
+    def _insert_transactions(connection, documents):
+        for document in documents:
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO transactions (id, user_id, type, amount, receiver_id, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (document.get("_id"), document["user_id"], document.get("type"), document.get("amount"),
+                 document.get("receiver_id"), _to_text(document["timestamp"]))
+            )
+            document.setdefault("_id", cursor.lastrowid)
+            if cursor.rowcount:
+                # Only newly stored transactions count, a retried batch adds nothing twice
+                connection.execute(
+                    "INSERT INTO daily_rollups (user_id, day, type, count, amount) VALUES (?, ?, ?, 1, ?) "
+                    "ON CONFLICT (user_id, day, type) DO UPDATE SET "
+                    "count = count + 1, amount = amount + excluded.amount",
+                    (document["user_id"], _to_text(rollup_day(document["timestamp"])), document.get("type"),
+                     document.get("amount") or 0)
+                )
+
+    def insert_documents(self, batch):
+        with self._write() as connection:
+            self._insert_documents(connection, batch)
+
+    def _insert_documents(self, connection, batch):
+        """Writes a batch inside an open write transaction."""
+        for collection_name, documents in batch.items():
+            if collection_name == "transactions":
+                self._insert_transactions(connection, documents)
+                continue
+            for document in documents:
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO records (id, collection, document) VALUES (?, ?, ?)",
+                    (document.get("_id"), collection_name,
+                     json.dumps({k: v for k, v in document.items() if k != "_id"}, default=str))
+                )
+                document.setdefault("_id", cursor.lastrowid)
+
+    def recent_transactions(self, user_id, limit):
+        cursor = self._connection.execute(
+            f"SELECT {', '.join(('id',) + TRANSACTION_FIELDS[1:])} FROM transactions "
+            "WHERE user_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (user_id, limit)
+        )
+        return [_transaction_document(row) for row in cursor]
+
+    def transaction_page(self, user_id, limit, before=None, after=None, txn_type=None, start=None, end=None):
+        conditions, parameters = ["user_id = ?"], [user_id]
+        if txn_type:
+            conditions.append("type = ?")
+            parameters.append(txn_type)
+        if start:
+            conditions.append("timestamp >= ?")
+            parameters.append(_to_text(start))
+        if end:
+            conditions.append("timestamp < ?")
+            parameters.append(_to_text(end))
+
+        order = "DESC"
+        if before:
+            conditions.append("(timestamp, id) < (?, ?)")
+            parameters += [_to_text(before[0]), before[1]]
+        elif after:
+            conditions.append("(timestamp, id) > (?, ?)")
+            parameters += [_to_text(after[0]), after[1]]
+            # Walk forward in time from the cursor, then flip back to newest first
+            order = "ASC"
+
+        cursor = self._connection.execute(
+            f"SELECT {', '.join(('id',) + TRANSACTION_FIELDS[1:])} FROM transactions WHERE {' AND '.join(conditions)} "
+            f"ORDER BY timestamp {order}, id {order} LIMIT ?",
+            parameters + [limit + 1]
+        )
+        documents = [_transaction_document(row) for row in cursor]
+        has_more = len(documents) > limit
+        documents = documents[:limit]
+        if after:
+            documents.reverse()
+        return documents, has_more
+
+    def daily_rollups(self, user_id, start, end=None):
+        conditions, parameters = ["user_id = ?", "day >= ?"], [user_id, _to_text(start)]
+        if end is not None:
+            conditions.append("day < ?")
+            parameters.append(_to_text(end))
+        rollups = {}
+        for day, txn_type, count, amount in self._connection.execute(
+            f"SELECT day, type, count, amount FROM daily_rollups WHERE {' AND '.join(conditions)} ORDER BY day",
+            parameters
+        ):
+            rollups.setdefault(day, {})[txn_type] = {"count": count, "amount": amount}
+        return [{"day": _from_text(day), "types": types} for day, types in rollups.items()]
+
+    def rebuild_daily_rollups(self, start=None):
+        # Whole days are rebuilt, a start in the middle of a day would drop its first hours
+        start_text = _to_text(rollup_day(start)) if start is not None else ""
+        with self._write() as connection:
+            connection.execute("DELETE FROM daily_rollups WHERE day >= ?", (start_text,))
+            # Timestamps are ISO text, the first ten characters are the day
+            connection.execute(
+                "INSERT INTO daily_rollups (user_id, day, type, count, amount) "
+                "SELECT user_id, substr(timestamp, 1, 10) || ' 00:00:00.000000', type, COUNT(*), TOTAL(amount) "
+                "FROM transactions WHERE timestamp >= ? GROUP BY 1, 2, 3",
+                (start_text,)
+            )
+            # The range was emptied first, every user-day left in it was written above
+            return connection.execute(
+                "SELECT COUNT(*) FROM (SELECT DISTINCT user_id, day FROM daily_rollups WHERE day >= ?)", (start_text,)
+            ).fetchone()[0]
+
+    def find_branch(self, branch_id):
+        row = self._connection.execute(
+            "SELECT branch_id, name, updated_at FROM branches WHERE branch_id = ?", (branch_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"branch_id": row[0], "name": row[1], "updated_at": _from_text(row[2])}
+
+    def branch_names(self):
+        return dict(self._connection.execute("SELECT branch_id, name FROM branches").fetchall())
+
+    def rename_branch(self, branch_id, name):
+        with self._write() as connection:
+            connection.execute(
+                "INSERT INTO branches (branch_id, name, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (branch_id) DO UPDATE SET name = excluded.name, updated_at = excluded.updated_at",
+                (branch_id, name, _to_text(datetime.utcnow()))
+            )
+            return connection.execute(
+                "UPDATE accounts SET branch_name = ? WHERE branch_id = ? AND branch_name IS NOT ?",
+                (name, branch_id, name)
+            ).rowcount
+
+    def branch_interest_rates(self):
+        return dict(self._connection.execute(
+            "SELECT branch_id, interest_rate FROM branches WHERE interest_rate IS NOT NULL"
+        ).fetchall())
+
+    def set_branch_interest_rate(self, branch_id, rate):
+        self._connection.execute(
+            "INSERT INTO branches (branch_id, interest_rate) VALUES (?, ?) "
+            "ON CONFLICT (branch_id) DO UPDATE SET interest_rate = excluded.interest_rate",
+            (branch_id, rate)
+        )
+
+    def interest_run(self, period):
+        row = self._connection.execute("SELECT document FROM interest_runs WHERE period = ?", (period,)).fetchone()
+        return _run_document(row[0]) if row else None
+
+    def unfinished_interest_runs(self):
+        rows = self._connection.execute("SELECT period, document FROM interest_runs ORDER BY period").fetchall()
+        return [period for period, document in rows if json.loads(document).get("status") == "running"]
+
+    @staticmethod
+    def _update_run(connection, period, update):
+        row = connection.execute("SELECT document FROM interest_runs WHERE period = ?", (period,)).fetchone()
+        run = _run_document(row[0]) if row else {"period": period}
+        update(run)
+        connection.execute(
+            "INSERT INTO interest_runs (period, document) VALUES (?, ?) "
+            "ON CONFLICT (period) DO UPDATE SET document = excluded.document",
+            (period, json.dumps({k: _to_text(v) for k, v in run.items()}))
+        )
+
+    def save_interest_run(self, period, fields):
+        with self._write() as connection:
+            self._update_run(connection, period, lambda run: run.update(fields))
+
+    def accrue_interest_batch(self, period, after, limit, rates, default_rate):
+        with self._write() as transaction:
+            # Keyset over rowids: each batch is a contiguous range starting past the checkpoint
+            rowids = transaction.execute(
+                "SELECT rowid FROM accounts WHERE rowid > ? ORDER BY rowid LIMIT ?", (after or 0, limit)
+            ).fetchall()
+            if not rowids:
+                return None
+            key_range = (after or 0, rowids[-1][0])
+
+            def total():
+                return transaction.execute(
+                    "SELECT COALESCE(SUM(balance), 0) FROM accounts WHERE rowid > ? AND rowid <= ?", key_range
+                ).fetchone()[0]
+
+            factor, parameters = "?", [1 + default_rate]
+            if rates:
+                factor = f"CASE branch_id {'WHEN ? THEN ? ' * len(rates)}ELSE ? END"
+                parameters = [value for branch_id, rate in rates.items() for value in (branch_id, 1 + rate)] + parameters
+            before = total()
+            updated = transaction.execute(
+                f"UPDATE accounts SET balance = ROUND(balance * {factor}, 2) "
+                "WHERE rowid > ? AND rowid <= ? AND balance > 0",
+                parameters + list(key_range)
+            ).rowcount
+            interest = round(total() - before, 2)
+
+            self._insert_documents(transaction, {"interest_ledger": [{
+                "period": period, "first_key": key_range[0], "last_key": key_range[1], "accounts": len(rowids),
+                "updated": updated, "interest": interest, "timestamp": datetime.utcnow(),
+            }]})
+
+            def advance(run):
+                run["after"] = key_range[1]
+                run["accounts"] = run.get("accounts", 0) + len(rowids)
+                run["interest"] = round(run.get("interest", 0.0) + interest, 2)
+                run["batches"] = run.get("batches", 0) + 1
+            self._update_run(transaction, period, advance)
+        return key_range[1], len(rowids), interest
+
+    def all_command_settings(self):
+        settings = {}
+        for guild_id, command, enabled in self._connection.execute("SELECT guild_id, command, enabled FROM guild_commands"):
+            settings.setdefault(guild_id, {})[command] = bool(enabled)
+        return settings
+
+    def guild_command_settings(self, guild_id):
+        rows = self._connection.execute(
+            "SELECT command, enabled FROM guild_commands WHERE guild_id = ?", (guild_id,)
+        ).fetchall()
+        return {command: bool(enabled) for command, enabled in rows} if rows else None
+
+    def set_command_status(self, guild_id, command_name, status):
+        self._connection.execute(
+            "INSERT INTO guild_commands (guild_id, command, enabled) VALUES (?, ?, ?) "
+            "ON CONFLICT (guild_id, command) DO UPDATE SET enabled = excluded.enabled",
+            (guild_id, command_name, int(status))
+        )
+
+    def close(self):
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class _WriteTransaction:
+    """``BEGIN IMMEDIATE`` ... ``COMMIT``, rolled back on error or when ``rollback_requested`` is set."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rollback_requested = False
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self
+
+    def execute(self, *args):
+        return self.connection.execute(*args)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and not self.rollback_requested:
+            self.connection.execute("COMMIT")
+        else:
+            self.connection.execute("ROLLBACK")
+        return False
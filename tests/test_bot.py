@@ -1,6 +1,6 @@
 import unittest
 import asyncio
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 
 class TestMyBot(unittest.TestCase):
@@ -8,8 +8,8 @@ class TestMyBot(unittest.TestCase):
         self.bot = AsyncMock()
 
     def tearDown(self):
-        from db import client
-        client.close()
+        import db
+        db.close()
 
     def test_ping_command(self):
         asyncio.run(self._async_test_ping_command())
@@ -19,6 +19,26 @@ class TestMyBot(unittest.TestCase):
         await self.bot.ping(ctx)
         self.bot.ping.assert_called_once_with(ctx)
 
+    def test_show_upi_id_reads_cached_account(self):
+        asyncio.run(self._async_test_show_upi_id_reads_cached_account())
+
+    async def _async_test_show_upi_id_reads_cached_account(self):
+        import db
+        from cogs.accounts import Account
+        from storage.memory import MemoryStorage
+
+        db.use_storage(MemoryStorage())
+        db.create_account("1", "g1", "alice", "Guild")
+        upi_id = db.set_upi_id("1")
+        self.assertIsNotNone(db.account_cache.get("1"))
+
+        ctx, user = AsyncMock(), MagicMock(id=1)
+        user.name = "alice"
+        # The command does not use the cog instance
+        await Account.get_upi_id.callback(None, ctx, user)
+        embed = ctx.respond.call_args.kwargs["embed"]
+        self.assertIn(upi_id, embed.description)
+
 
     # Add more test methods here as needed
 
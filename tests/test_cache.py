@@ -0,0 +1,71 @@
+import unittest
+
+from resources.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = LRUCache(2, ttl=10, clock=self.clock)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.set("a", 1)
+        self.clock.now = 10
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.expirations, 1)
+        self.assertNotIn("a", self.cache)
+
+    def test_fill_loses_to_a_concurrent_write(self):
+        token = self.cache.reserve("a")
+        # A writer updates the key while the reader is still querying
+        self.cache.update("a", lambda value: value + 1)
+        self.assertFalse(self.cache.fill("a", 1, token))
+        self.assertNotIn("a", self.cache)
+
+        token = self.cache.reserve("a")
+        self.assertTrue(self.cache.fill("a", 1, token))
+        self.assertEqual(self.cache.get("a"), 1)
+
+        stale = self.cache.reserve("a")
+        self.cache.set("a", 2)
+        self.assertFalse(self.cache.fill("a", 1, stale))
+        self.assertEqual(self.cache.get("a"), 2)
+
+    def test_update_only_touches_cached_entries(self):
+        self.cache.set("a", 1)
+        self.cache.update("a", lambda value: value + 1)
+        self.cache.update("b", lambda value: value + 1)
+
+        self.assertEqual(self.cache.get("a"), 2)
+        self.assertNotIn("b", self.cache)
+
+    def test_hit_rate(self):
+        self.cache.set("a", 1)
+        self.cache.get("a")
+        self.cache.get("missing")
+
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.hit_rate, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from types import SimpleNamespace
+
+from resources.counters import GuildCounters
+
+
+def guild(guild_id, member_count):
+    return SimpleNamespace(id=guild_id, member_count=member_count)
+
+
+class TestGuildCounters(unittest.TestCase):
+    def test_tracks_guild_and_member_events(self):
+        counters = GuildCounters()
+        counters.load([guild(1, 10), guild(2, 5)])
+        self.assertEqual((counters.guilds, counters.members), (2, 15))
+
+        counters.add_guild(guild(3, 7))
+        counters.member_joined(1)
+        counters.member_left(2)
+        self.assertEqual((counters.guilds, counters.members), (3, 22))
+
+        counters.remove_guild(guild(1, 0))
+        self.assertEqual((counters.guilds, counters.members), (2, 11))
+
+    def test_ignores_unknown_guilds_and_rejoins(self):
+        counters = GuildCounters()
+        counters.add_guild(guild(1, 3))
+        counters.add_guild(guild(1, 4))
+        counters.member_joined(99)
+        counters.member_left(99)
+        counters.remove_guild(guild(99, 0))
+        self.assertEqual((counters.guilds, counters.members), (1, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from resources.error_reports import ErrorAggregator, TokenBucket, fingerprint, format_digest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def raise_error(error):
+    try:
+        raise error
+    except Exception as e:
+        return e
+
+
+class TestErrorAggregator(unittest.TestCase):
+    def test_groups_by_command_and_type(self):
+        errors = ErrorAggregator(clock=FakeClock())
+        self.assertTrue(errors.add("passbook", raise_error(ValueError("first"))))
+        self.assertFalse(errors.add("passbook", raise_error(ValueError("second"))))
+        self.assertTrue(errors.add("passbook", raise_error(KeyError("x"))))
+        self.assertTrue(errors.add("history", raise_error(ValueError("other"))))
+
+        groups = errors.drain()
+
+        self.assertEqual(len(errors), 0)
+        self.assertEqual(errors.total, 4)
+        self.assertEqual(len(groups), 3)
+        self.assertEqual((groups[0].command, groups[0].count, groups[0].message), ("passbook", 2, "first"))
+        self.assertIn("ValueError: first", groups[0].traceback)
+        self.assertEqual(fingerprint("passbook", ValueError()), ("passbook", "builtins.ValueError"))
+
+    def test_restore_merges_counts(self):
+        errors = ErrorAggregator(clock=FakeClock())
+        errors.add("passbook", raise_error(ValueError("first")))
+        drained = errors.drain()
+        errors.add("passbook", raise_error(ValueError("later")))
+        errors.restore(drained)
+
+        groups = errors.drain()
+
+        self.assertEqual(len(groups), 1)
+        self.assertEqual((groups[0].count, groups[0].message), (2, "first"))
+
+    def test_digest_respects_limit(self):
+        errors = ErrorAggregator(clock=FakeClock())
+        for i in range(50):
+            errors.add(f"command{i}", raise_error(ValueError("x" * 300)))
+        digest = format_digest(errors.drain(), limit=2000)
+        self.assertLessEqual(len(digest), 2000)
+        self.assertTrue(digest.startswith("**50 errors in 50 groups**"))
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_budget_refills_over_time(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=2, clock=clock)
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+
+        clock.now += 1
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+
+        clock.now += 10
+        self.assertTrue(bucket.try_acquire(2))
+        self.assertFalse(bucket.try_acquire())
+
+
+if __name__ == '__main__':
+    unittest.main()
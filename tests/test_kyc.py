@@ -0,0 +1,57 @@
+import unittest
+
+from resources.kyc import KYCSessionManager, KYCState
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestKYCSessionManager(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sessions = KYCSessionManager(timeout=120, verification_delay=0, clock=self.clock)
+
+    def test_one_session_per_user(self):
+        self.assertIsNotNone(self.sessions.start("1", "10"))
+        self.assertIsNone(self.sessions.start("1", "10"))
+
+    def test_verification_state_machine(self):
+        self.sessions.start("1", "10")
+
+        session = self.sessions.begin_verification("1")
+        self.assertIs(session.state, KYCState.VERIFYING)
+        self.assertIsNone(self.sessions.begin_verification("1"))
+
+        self.sessions.retry("1")
+        self.assertIs(session.state, KYCState.AWAITING_DETAILS)
+        self.assertEqual(self.sessions.begin_verification("1").attempts, 2)
+
+        self.assertIs(self.sessions.complete("1").state, KYCState.COMPLETED)
+        self.assertNotIn("1", self.sessions)
+
+    def test_sweep_expires_sessions_past_their_deadline(self):
+        self.sessions.start("1", "10")
+        self.sessions.start("2", "10")
+        self.clock.now = 60
+        self.sessions.begin_verification("2")
+        self.clock.now = 120
+
+        expired = self.sessions.sweep()
+
+        self.assertEqual([session.user_id for session in expired], ["1"])
+        self.assertIs(expired[0].state, KYCState.EXPIRED)
+        self.assertIn("2", self.sessions)
+
+        # A verification whose callback never closed the session expires too
+        self.clock.now = 180
+        self.assertEqual([session.user_id for session in self.sessions.sweep()], ["2"])
+        self.assertIsNotNone(self.sessions.start("2", "10"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from resources.leaderboards import GLOBAL, Leaderboards
+
+
+class TestLeaderboards(unittest.TestCase):
+    def setUp(self):
+        self.leaderboards = Leaderboards()
+        self.leaderboards.load([
+            {"user_id": "1", "username": "alice", "branch_id": "A", "balance": 50},
+            {"user_id": "2", "username": "bob", "branch_id": "A", "balance": 100},
+            {"user_id": "3", "username": "carol", "branch_id": "B", "balance": 75},
+        ])
+
+    def test_pages_are_sorted_by_balance(self):
+        page = self.leaderboards.page(GLOBAL, page=0, per_page=2)
+
+        self.assertEqual([entry["username"] for entry in page], ["bob", "carol"])
+        self.assertEqual(self.leaderboards.page(GLOBAL, page=1, per_page=2)[0]["rank"], 3)
+
+    def test_balance_change_moves_account(self):
+        self.leaderboards.upsert("1", balance=200)
+
+        self.assertEqual(self.leaderboards.rank("1", "A"), 1)
+        self.assertEqual(self.leaderboards.rank("1"), 1)
+        self.assertEqual(self.leaderboards.rank("2"), 2)
+
+    def test_branch_change_moves_account(self):
+        self.leaderboards.upsert("2", branch_id="B")
+
+        self.assertEqual(self.leaderboards.size("A"), 1)
+        self.assertEqual(self.leaderboards.rank("2", "B"), 1)
+        self.assertIsNone(self.leaderboards.rank("2", "A"))
+
+    def test_new_and_removed_accounts(self):
+        self.leaderboards.upsert("4", balance=0, branch_id="B", username="dave")
+        self.leaderboards.remove("3")
+
+        self.assertEqual(self.leaderboards.size(GLOBAL), 3)
+        self.assertEqual(self.leaderboards.page("B")[0]["username"], "dave")
+
+    def test_updates_before_load_are_ignored(self):
+        leaderboards = Leaderboards()
+        leaderboards.upsert("1", balance=10, branch_id="A")
+
+        self.assertEqual(leaderboards.size(GLOBAL), 0)
+
+    def test_updates_during_load_are_replayed(self):
+        leaderboards = Leaderboards()
+        with leaderboards.loading():
+            # The scan read alice's old balance, then a transfer and a new account landed
+            snapshot = [{"user_id": "1", "username": "alice", "branch_id": "A", "balance": 10}]
+            leaderboards.upsert("1", balance=90)
+            leaderboards.upsert("2", balance=20, branch_id="A", username="bob")
+            leaderboards.load(snapshot)
+
+        self.assertEqual([(entry["user_id"], entry["balance"]) for entry in leaderboards.page("A")], [("1", 90), ("2", 20)])
+        leaderboards.upsert("2", balance=100)
+        self.assertEqual(leaderboards.rank("2"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
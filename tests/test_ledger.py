@@ -0,0 +1,61 @@
+import asyncio
+import unittest
+
+from resources.ledger import LedgerWriter
+
+
+class TestLedgerWriter(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+
+    async def write_batch(self, batch):
+        self.batches.append(batch)
+
+    def test_flushes_when_batch_is_full(self):
+        asyncio.run(self._async_test_flushes_when_batch_is_full())
+
+    async def _async_test_flushes_when_batch_is_full(self):
+        writer = LedgerWriter(self.write_batch, batch_size=2, flush_interval=60)
+        await writer.put("transactions", {"n": 1})
+        await writer.put("failed_kyc_attempts", {"n": 2})
+        await asyncio.sleep(0)
+
+        self.assertEqual(self.batches, [{"transactions": [{"n": 1}], "failed_kyc_attempts": [{"n": 2}]}])
+        self.assertEqual(writer.written, 2)
+        await writer.close()
+
+    def test_close_writes_queued_records(self):
+        asyncio.run(self._async_test_close_writes_queued_records())
+
+    async def _async_test_close_writes_queued_records(self):
+        writer = LedgerWriter(self.write_batch, batch_size=100, flush_interval=60)
+        for n in range(3):
+            await writer.put("transactions", {"n": n})
+
+        await writer.close()
+
+        self.assertEqual(sum(len(batch["transactions"]) for batch in self.batches), 3)
+        self.assertEqual(writer.depth, 0)
+
+    def test_failed_batches_are_retried(self):
+        asyncio.run(self._async_test_failed_batches_are_retried())
+
+    async def _async_test_failed_batches_are_retried(self):
+        failures = [RuntimeError("down")]
+
+        async def flaky_write(batch):
+            if failures:
+                raise failures.pop()
+            self.batches.append(batch)
+
+        writer = LedgerWriter(flaky_write, batch_size=100, flush_interval=60)
+        await writer.put("transactions", {"n": 1})
+        await writer.flush()
+
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(writer.dropped, 0)
+        await writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
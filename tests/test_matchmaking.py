@@ -0,0 +1,39 @@
+import asyncio
+import unittest
+
+from resources.matchmaking import MatchmakingQueue
+
+
+class TestMatchmakingQueue(unittest.TestCase):
+    def test_matches_first_waiter_of_same_bucket(self):
+        asyncio.run(self._async_test_matches_first_waiter_of_same_bucket())
+
+    async def _async_test_matches_first_waiter_of_same_bucket(self):
+        queue = MatchmakingQueue()
+        _, first = queue.join("1", ("guild", None))
+        _, other_bucket = queue.join("2", ("other", None))
+
+        partner_id, future = queue.join("3", ("guild", None))
+
+        self.assertEqual(partner_id, "1")
+        self.assertIsNone(future)
+        self.assertEqual(await first, "3")
+        self.assertFalse(other_bucket.done())
+        self.assertEqual(len(queue), 1)
+        self.assertIsNotNone(queue.join("4", ("guild", None))[1])
+
+    def test_leave_resolves_waiter_with_none(self):
+        asyncio.run(self._async_test_leave_resolves_waiter_with_none())
+
+    async def _async_test_leave_resolves_waiter_with_none(self):
+        queue = MatchmakingQueue()
+        _, waiter = queue.join("1")
+
+        self.assertTrue(queue.leave("1"))
+        self.assertIsNone(await waiter)
+        self.assertFalse(queue.leave("1"))
+        self.assertEqual(queue.join("2"), (None, queue._buckets[None]["2"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from resources.metrics import Histogram, MetricsRegistry
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantiles_interpolate_within_buckets(self):
+        histogram = Histogram(buckets=(0.1, 0.2, 0.4))
+        for _ in range(50):
+            histogram.observe(0.05)
+        for _ in range(50):
+            histogram.observe(0.15)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.1)
+        self.assertAlmostEqual(histogram.quantile(0.75), 0.15)
+        self.assertAlmostEqual(histogram.quantile(0.99), 0.198)
+
+    def test_overflow_uses_largest_observation(self):
+        histogram = Histogram(buckets=(0.1,))
+        histogram.observe(0.05)
+        histogram.observe(3.0)
+        self.assertEqual(histogram.quantile(0.99), 3.0)
+        self.assertEqual(Histogram().quantile(0.5), 0.0)
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_render_prometheus_text(self):
+        registry = MetricsRegistry()
+        registry.histogram("command_seconds", "Command time", buckets=(0.5,), command="pass\"book").observe(0.25)
+        registry.gauge("queue_depth", "Queued records", lambda: 3)
+        registry.gauge("broken", "Fails to read", lambda: 1 / 0)
+
+        text = registry.render()
+
+        self.assertIn("# TYPE quantumbank_command_seconds histogram", text)
+        self.assertIn('quantumbank_command_seconds_bucket{command="pass\\"book",le="0.5"} 1', text)
+        self.assertIn('quantumbank_command_seconds_bucket{command="pass\\"book",le="+Inf"} 1', text)
+        self.assertIn('quantumbank_command_seconds_count{command="pass\\"book"} 1', text)
+        self.assertIn("quantumbank_queue_depth 3.0", text)
+        self.assertNotIn("quantumbank_broken", text)
+
+    def test_same_labels_return_same_histogram(self):
+        registry = MetricsRegistry()
+        first = registry.histogram("db_call_seconds", "Time", function="get_account")
+        self.assertIs(first, registry.histogram("db_call_seconds", "Time", function="get_account"))
+        self.assertIsNot(first, registry.histogram("db_call_seconds", "Time", function="transfer"))
+        self.assertEqual(len(registry.histograms("db_call_seconds")), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
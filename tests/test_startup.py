@@ -0,0 +1,42 @@
+import unittest
+
+from resources.startup import StartupReport
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStartupReport(unittest.TestCase):
+    def test_phases_are_timed_and_reported_slowest_first(self):
+        clock = FakeClock()
+        report = StartupReport(clock=clock)
+
+        with report.phase("cog accounts") as phase:
+            clock.now += 0.25
+        report.record("imports", 0.5)
+        clock.now += 0.25
+
+        self.assertEqual(phase.seconds, 0.25)
+        self.assertEqual(report.elapsed(), 0.5)
+        lines = report.format().splitlines()
+        self.assertIn("ready after 500 ms", lines[0])
+        self.assertTrue(lines[1].strip().startswith("imports"))
+        self.assertTrue(lines[2].strip().startswith("cog accounts"))
+
+    def test_failed_phase_is_still_recorded(self):
+        clock = FakeClock()
+        report = StartupReport(clock=clock)
+        with self.assertRaises(RuntimeError):
+            with report.phase("cog broken"):
+                clock.now += 1
+                raise RuntimeError
+        self.assertEqual([(p.name, p.seconds) for p in report.phases], [("cog broken", 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
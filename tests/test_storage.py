@@ -0,0 +1,287 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import db
+from storage.base import DuplicateKey
+from storage.memory import MemoryStorage
+from storage.sqlite import SQLiteStorage
+
+T0 = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def account(user_id, branch_id="g1", balance=0, upi_id=None):
+    return {
+        "user_id": user_id, "username": f"user{user_id}", "branch_id": branch_id, "branch_name": "Guild",
+        "balance": balance, "upi_id": upi_id, "created_at": T0,
+    }
+
+
+def record(user_id, txn_type, minutes, amount=1.0):
+    return {"user_id": user_id, "type": txn_type, "amount": amount, "receiver_id": None,
+            "timestamp": T0 + timedelta(minutes=minutes)}
+
+
+class StorageContract:
+    """Behaviour every storage backend must share, run against each backend below."""
+
+    def make_storage(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.storage = self.make_storage()
+
+    def tearDown(self):
+        self.storage.close()
+
+    def test_accounts(self):
+        self.assertTrue(self.storage.insert_account(account("1", balance=5)))
+        self.assertFalse(self.storage.insert_account(account("1")))
+        self.assertEqual(self.storage.find_account("1", ("user_id", "balance")), {"user_id": "1", "balance": 5})
+        self.assertEqual(self.storage.find_account("1", db.ACCOUNT_PROJECTIONS["profile"])["created_at"], T0)
+        self.assertIsNone(self.storage.find_account("2", ("user_id",)))
+
+        self.storage.set_balance("1", 42)
+        self.assertTrue(self.storage.set_account_branch("1", "g2", "Other"))
+        self.assertFalse(self.storage.set_account_branch("1", "g2", "Other"))
+        self.assertEqual(
+            self.storage.find_account("1", ("balance", "branch_id", "branch_name")),
+            {"balance": 42, "branch_id": "g2", "branch_name": "Other"}
+        )
+
+    def test_top_accounts_by_branch(self):
+        for user_id, branch_id, balance in (("1", "g1", 10), ("2", "g1", 30), ("3", "g2", 50), ("4", "g1", 20)):
+            self.storage.insert_account(account(user_id, branch_id, balance))
+        top = self.storage.top_accounts("g1", 2)
+        self.assertEqual([(entry["user_id"], entry["balance"]) for entry in top], [("2", 30), ("4", 20)])
+
+    def test_transfer_is_guarded_and_atomic(self):
+        self.storage.insert_account(account("1", balance=100))
+        self.storage.insert_account(account("2", balance=0))
+
+        balances = self.storage.transfer("1", "2", 60, record("1", "send", 0, 60), record("2", "receive", 0, 60))
+        self.assertEqual(balances, (40, 60))
+        self.assertIsNone(self.storage.transfer("1", "2", 60, record("1", "send", 1), record("2", "receive", 1)))
+        self.assertIsNone(self.storage.transfer("1", "3", 10, record("1", "send", 2), record("3", "receive", 2)))
+
+        self.assertEqual(self.storage.find_account("1", ("balance",))["balance"], 40)
+        self.assertEqual(len(self.storage.recent_transactions("1", 10)), 1)
+        self.assertEqual(len(self.storage.recent_transactions("2", 10)), 1)
+
+    def test_upi_ids_are_unique(self):
+        self.storage.insert_account(account("1"))
+        self.storage.insert_account(account("2"))
+        self.assertTrue(self.storage.assign_upi_id("1", "1@bank.aaaa"))
+        self.assertFalse(self.storage.assign_upi_id("1", "1@bank.bbbb"))
+        self.assertFalse(self.storage.assign_upi_id("9", "9@bank.aaaa"))
+        with self.assertRaises(DuplicateKey):
+            self.storage.assign_upi_id("2", "1@bank.aaaa")
+        self.assertEqual(self.storage.find_upi_owner("1@bank.aaaa"), "1")
+        self.assertEqual(self.storage.accounts_without_upi_id(), ["2"])
+        self.assertEqual(self.storage.assign_upi_ids([("2", "1@bank.aaaa")]), 0)
+        self.assertEqual(self.storage.assign_upi_ids([("2", "2@bank.aaaa")]), 1)
+
+    def test_insert_documents_is_idempotent(self):
+        documents = [record("1", "send", minute) for minute in range(3)]
+        self.storage.insert_documents({"transactions": documents, "failed_kyc_attempts": [{"reason": "x"}]})
+        self.storage.insert_documents({"transactions": documents})
+        self.assertEqual(len(self.storage.recent_transactions("1", 10)), 3)
+        self.assertTrue(all("_id" in document for document in documents))
+
+    def test_daily_rollups(self):
+        self.storage.insert_account(account("1", balance=100))
+        self.storage.insert_account(account("2"))
+        self.storage.transfer("1", "2", 30, record("1", "send", 0, 30), record("2", "receive", 0, 30))
+        documents = [record("1", "send", 1, 5), record("1", "receive", 2, 7), record("1", "send", 24 * 60, 4)]
+        self.storage.insert_documents({"transactions": documents})
+        # A retried flush must not count the same transactions again
+        self.storage.insert_documents({"transactions": documents})
+
+        day = T0.replace(hour=0)
+        expected = [
+            {"day": day, "types": {"send": {"count": 2, "amount": 35}, "receive": {"count": 1, "amount": 7}}},
+            {"day": day + timedelta(days=1), "types": {"send": {"count": 1, "amount": 4}}},
+        ]
+        self.assertEqual(self.storage.daily_rollups("1", day), expected)
+        self.assertEqual(self.storage.daily_rollups("1", day, day + timedelta(days=1)), expected[:1])
+        self.assertEqual(self.storage.daily_rollups("2", day), [{"day": day, "types": {"receive": {"count": 1, "amount": 30}}}])
+
+        self.assertEqual(self.storage.rebuild_daily_rollups(), 3)
+        self.assertEqual(self.storage.daily_rollups("1", day), expected)
+        self.assertEqual(self.storage.rebuild_daily_rollups(day + timedelta(days=1)), 1)
+        self.assertEqual(self.storage.daily_rollups("1", day), expected)
+        # A start in the middle of a day rebuilds that whole day
+        self.assertEqual(self.storage.rebuild_daily_rollups(T0 + timedelta(minutes=1)), 3)
+        self.assertEqual(self.storage.daily_rollups("1", day), expected)
+
+    def test_transaction_pages(self):
+        self.storage.insert_documents({"transactions": [
+            record("1", "send" if minute % 2 else "receive", minute) for minute in range(7)
+        ] + [record("2", "send", 0)]})
+
+        page, has_more = self.storage.transaction_page("1", 3)
+        self.assertEqual([t["timestamp"].minute for t in page], [6, 5, 4])
+        self.assertTrue(has_more)
+
+        last = page[-1]
+        older, has_more = self.storage.transaction_page("1", 3, before=(last["timestamp"], last["_id"]))
+        self.assertEqual([t["timestamp"].minute for t in older], [3, 2, 1])
+        self.assertTrue(has_more)
+
+        first = older[0]
+        newer, has_more = self.storage.transaction_page("1", 3, after=(first["timestamp"], first["_id"]))
+        self.assertEqual([t["timestamp"].minute for t in newer], [6, 5, 4])
+        self.assertFalse(has_more)
+
+        sends, _ = self.storage.transaction_page("1", 10, txn_type="send", start=T0 + timedelta(minutes=2),
+                                                 end=T0 + timedelta(minutes=6))
+        self.assertEqual([t["timestamp"].minute for t in sends], [5, 3])
+
+    def test_branches_and_command_settings(self):
+        self.storage.insert_account(account("1", "g1"))
+        self.storage.insert_account(account("2", "g1"))
+        self.assertEqual(self.storage.rename_branch("g1", "Renamed"), 2)
+        self.assertEqual(self.storage.rename_branch("g1", "Renamed"), 0)
+        self.assertEqual(self.storage.find_branch("g1")["name"], "Renamed")
+        self.assertEqual(self.storage.branch_names(), {"g1": "Renamed"})
+
+        self.assertIsNone(self.storage.guild_command_settings(123))
+        self.storage.set_command_status(123, "anime", False)
+        self.storage.set_command_status(123, "anime", True)
+        self.storage.set_command_status(123, "passbook", False)
+        self.assertEqual(self.storage.guild_command_settings(123), {"anime": True, "passbook": False})
+        self.assertEqual(self.storage.all_command_settings(), {123: {"anime": True, "passbook": False}})
+
+    def test_interest_batches(self):
+        for user_id, branch_id, balance in (("1", "g1", 100), ("2", "g2", 200), ("3", "g1", 0), ("4", "g2", 50)):
+            self.storage.insert_account(account(user_id, branch_id, balance))
+        self.storage.rename_branch("g2", "Savings")
+        self.storage.set_branch_interest_rate("g2", 0.5)
+        self.assertEqual(self.storage.branch_interest_rates(), {"g2": 0.5})
+        self.assertEqual(self.storage.find_branch("g2")["name"], "Savings")
+
+        after, batches = None, []
+        while (batch := self.storage.accrue_interest_batch("day", after, 3, {"g2": 0.5}, 0.1)) is not None:
+            after = batch[0]
+            batches.append(batch[1:])
+        self.assertEqual(batches, [(3, 110.0), (1, 25.0)])
+        balances = [self.storage.find_account(user_id, ("balance",))["balance"] for user_id in "1234"]
+        self.assertEqual(balances, [110, 300, 0, 75])
+
+        run = self.storage.interest_run("day")
+        self.assertEqual((run["after"], run["accounts"], run["interest"], run["batches"]), (after, 4, 135.0, 2))
+        # Batches paying 0.1 and 0.2 add up to 0.3 exactly, not 0.30000000000000004
+        self.storage.insert_account(account("5", "g3", 1))
+        self.storage.insert_account(account("6", "g3", 2))
+        while (batch := self.storage.accrue_interest_batch("cents", after, 1, {}, 0.1)) is not None:
+            after = batch[0]
+        self.assertEqual(self.storage.interest_run("cents")["interest"], 0.3)
+
+        self.storage.save_interest_run("day", {"status": "completed"})
+        self.assertEqual(self.storage.interest_run("day")["status"], "completed")
+        self.assertIsNone(self.storage.interest_run("other"))
+
+
+class TestMemoryStorage(StorageContract, unittest.TestCase):
+    def make_storage(self):
+        return MemoryStorage()
+
+
+class TestSQLiteStorage(StorageContract, unittest.TestCase):
+    def make_storage(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        return SQLiteStorage(os.path.join(self.directory, "test.sqlite3"))
+
+
+class TestDatabaseFacade(unittest.TestCase):
+    """db.py functions over the memory backend, including their caches."""
+
+    def setUp(self):
+        db.use_storage(MemoryStorage())
+
+    def test_transfer_writes_through_caches(self):
+        db.create_account("1", "g1", "alice", "Guild")
+        db.create_account("2", "g1", "bob", "Guild")
+        db.update_balance("1", 100)
+
+        self.assertEqual(db.transfer("1", "2", 25), (75, 25))
+        self.assertEqual(db.get_account("1").balance, 75)
+        self.assertEqual([account.user_id for account in db.get_leaderboard("g1")], ["1", "2"])
+        self.assertEqual(db.leaderboards.rank("2", "g1"), 2)
+
+        transactions, has_more = db.get_transaction_page("2")
+        self.assertEqual([(t.type, t.amount) for t in transactions], [("received_upi_payment", 25)])
+        self.assertFalse(has_more)
+
+    def test_upi_ids_and_commands(self):
+        db.create_account("1", "g1", "alice", "Guild")
+        upi_id = db.set_upi_id("1")
+        self.assertEqual(db.set_upi_id("1"), upi_id)
+        self.assertEqual(db.resolve_upi_id(upi_id), "1")
+        self.assertIsNone(db.set_upi_id("9"))
+
+        db.toggle_command(5, "anime", False)
+        self.assertEqual(db.load_command_settings(), 1)
+        self.assertFalse(db.get_command_status(5, "anime"))
+        self.assertTrue(db.get_command_status(6, "anime"))
+
+    def test_accrue_interest_resumes_without_double_charging(self):
+        for user_id in "123":
+            db.create_account(user_id, "g1", f"user{user_id}", "Guild")
+            db.update_balance(user_id, 100)
+        self.assertIsNone(db.accrue_interest("day", default_rate=0))
+
+        # A run that crashed after its first batch
+        storage = db.get_storage()
+        storage.save_interest_run("day", {"status": "running", "after": None, "accounts": 0, "interest": 0.0,
+                                          "batches": 0, "rates": {}, "default_rate": 0.01})
+        storage.accrue_interest_batch("day", None, 2, {}, 0.01)
+
+        run = db.accrue_interest("day", batch_size=2, default_rate=0.5)
+        self.assertEqual((run["status"], run["accounts"], run["batches"], run["interest"]), ("completed", 3, 2, 3.0))
+        self.assertEqual([db.get_account(user_id).balance for user_id in "123"], [101, 101, 101])
+        self.assertEqual(db.accrue_interest("day")["interest"], 3.0)
+        self.assertEqual(db.leaderboards.rank("3", "g1"), 3)
+
+    def test_resume_finishes_runs_of_earlier_periods(self):
+        for user_id in "12":
+            db.create_account(user_id, "g1", f"user{user_id}", "Guild")
+            db.update_balance(user_id, 100)
+
+        # Yesterday's run crashed after its first batch, today's never started
+        storage = db.get_storage()
+        storage.save_interest_run("2024-01-01", {"status": "running", "after": None, "accounts": 0, "interest": 0.0,
+                                                 "batches": 0, "rates": {}, "default_rate": 0.1})
+        storage.accrue_interest_batch("2024-01-01", None, 1, {}, 0.1)
+        self.assertEqual(storage.unfinished_interest_runs(), ["2024-01-01"])
+
+        runs = db.resume_interest_runs()
+        self.assertEqual([(run["period"], run["status"], run["accounts"]) for run in runs], [("2024-01-01", "completed", 2)])
+        self.assertEqual([db.get_account(user_id).balance for user_id in "12"], [110, 110])
+        self.assertEqual(storage.unfinished_interest_runs(), [])
+        self.assertEqual(db.resume_interest_runs(), [])
+
+    def test_transaction_summary_reads_rollups(self):
+        db.create_account("1", "g1", "alice", "Guild")
+        db.create_account("2", "g1", "bob", "Guild")
+        db.update_balance("1", 100)
+        db.transfer("1", "2", 25)
+        db.transfer("1", "2", 5)
+        db.transfer("2", "1", 10)
+        old = db.transaction_document("1", "send_upi_payment", 50)
+        old["timestamp"] -= timedelta(days=10)
+        db.insert_documents({"transactions": [old]})
+
+        self.assertEqual(db.get_transaction_summary("1"), {
+            "send_upi_payment": {"count": 2, "amount": 30},
+            "received_upi_payment": {"count": 1, "amount": 10},
+        })
+        self.assertEqual(db.get_transaction_summary("1", 30)["send_upi_payment"], {"count": 3, "amount": 80})
+        self.assertEqual(db.get_transaction_summary("3"), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from resources.telemetry import EventRate, ShardTelemetry, shard_for_guild
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestShardTelemetry(unittest.TestCase):
+    def test_shard_for_guild(self):
+        guild_id = 81384788765712384
+        self.assertEqual(shard_for_guild(guild_id, 1), 0)
+        self.assertEqual(shard_for_guild(guild_id, 4), (guild_id >> 22) % 4)
+        self.assertEqual(shard_for_guild(guild_id, None), 0)
+
+    def test_rate_forgets_events_outside_window(self):
+        clock = FakeClock()
+        rate = EventRate(window=10, clock=clock)
+        for _ in range(20):
+            rate.record()
+        self.assertEqual(rate.rate(), 2.0)
+
+        clock.now += 5
+        rate.record(10)
+        self.assertEqual(rate.rate(), 3.0)
+
+        clock.now += 10
+        self.assertEqual(rate.rate(), 0.0)
+        self.assertEqual(rate.total, 30)
+
+    def test_snapshot_per_shard(self):
+        clock = FakeClock()
+        telemetry = ShardTelemetry(window=10, clock=clock)
+        for _ in range(10):
+            telemetry.record_event(1, "message")
+        telemetry.record_event(1, "interaction")
+        telemetry.record_connection(1, "disconnect")
+        telemetry.record_connection(1, "resume")
+
+        shards = telemetry.snapshot([(1, 0.05), (0, 0.04)])
+
+        self.assertEqual([shard["shard_id"] for shard in shards], [0, 1])
+        self.assertEqual(shards[0]["event_rate"], 0.0)
+        self.assertAlmostEqual(shards[1]["event_rate"], 1.1)
+        self.assertEqual(shards[1]["connections"], {"connect": 0, "disconnect": 1, "resume": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()